@@ -1,44 +1,77 @@
+import importlib
 import sys
-from typing import Iterator, Optional
-from .common import Browser, Version, OS
+from typing import AsyncIterator, Iterable, Iterator, Optional
+from .common import Browser, Channel, Version, OS
+from .inventory import Inventory
 
-match sys.platform:
-    case OS.LINUX:
-        from . import linux
-    case OS.MAC:
-        from . import mac
-    case OS.WINDOWS:
-        from . import windows
+# platform modules are imported on first use, importing the package stays cheap
+PLATFORM_MODULES = ("linux", "mac", "windows")
 
 __all__ = ["Browser",
+           "Channel",
            "browsers",
            "what_is_the_default_browser",
            "do_i_have_installed",
            "give_me_details_of",
-           "get_version_of"]
+           "get_version_of",
+           "get_versions_of",
+           "async_browsers",
+           "async_get_details_of",
+           "async_get_version_of",
+           "Inventory",
+           "snapshot"]
+
+
+# resolve platform modules lazily, e.g. installed_browsers.linux
+def __getattr__(name: str):
+    if name in PLATFORM_MODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # get all installed browsers
-def browsers() -> Iterator[Browser]:
+def browsers(names: Optional[Iterable[str]] = None, channels: Optional[Iterable[str]] = None,
+             with_versions: bool = True, cache: Optional[bool] = None) -> Iterator[Browser]:
     """
     Iterates over installed browsers.\n
     Locally installed browser versions (portable) are not considered.
 
+    Parameters:
+                names: only these browsers are looked up, e.g. ("chrome", "firefox")\n
+                channels: only browsers of these release channels are looked up:
+                stable, beta, dev, nightly, canary\n
+                with_versions: versions are left empty when False, browsers are not run to determine them\n
+                cache: browsers are kept in a cache under $XDG_CACHE_HOME/installed_browsers, shared by processes,
+                and are scanned again only when they or their installation directories change;
+                by default the cache is used when the INSTALLED_BROWSERS_CACHE environment variable is set to 1
     :return: Iterator of dictionary of browser key and information.
     """
     match sys.platform:
         case OS.LINUX:
-            yield from linux.browsers()
+            from . import linux
+            yield from _get_browsers_of(linux, names, channels, with_versions, cache)
         case OS.MAC:
-            yield from mac.browsers()
+            from . import mac
+            yield from _get_browsers_of(mac, names, channels, with_versions, cache)
         case OS.WINDOWS:
-            yield from windows.browsers()
+            from . import windows
+            yield from _get_browsers_of(windows, names, channels, with_versions, cache)
         case _:
             yield Browser(
                 name="exception", description="This operating system is not yet supported.", version="", location=""
             )
 
 
+# get installed browsers of a platform module, from the persistent cache if it is enabled
+def _get_browsers_of(platform_module, names: Optional[Iterable[str]], channels: Optional[Iterable[str]],
+                     with_versions: bool, cache: Optional[bool]) -> Iterator[Browser]:
+    from . import disk_cache
+    if disk_cache.is_enabled(cache):
+        yield from disk_cache.get_browsers(platform_module, names=names, channels=channels, with_versions=with_versions)
+    else:
+        yield from platform_module.browsers(names=names, channels=channels, with_versions=with_versions)
+
+
 # get default browser
 def what_is_the_default_browser():
     """
@@ -48,10 +81,13 @@ def what_is_the_default_browser():
     """
     match sys.platform:
         case OS.LINUX:
+            from . import linux
             return linux.what_is_the_default_browser()
         case OS.MAC:
+            from . import mac
             return mac.what_is_the_default_browser()
         case OS.WINDOWS:
+            from . import windows
             return windows.what_is_the_default_browser()
 
 
@@ -77,10 +113,13 @@ def do_i_have_installed(name: str):
     """
     match sys.platform:
         case OS.LINUX:
+            from . import linux
             return linux.do_i_have_installed(name)
         case OS.MAC:
+            from . import mac
             return mac.do_i_have_installed(name)
         case OS.WINDOWS:
+            from . import windows
             return windows.do_i_have_installed(name)
 
 
@@ -110,12 +149,15 @@ def give_me_details_of(name: str) -> Optional[Browser | str]:
     """
     match sys.platform:
         case OS.LINUX:
+            from . import linux
             for found in (entity for entity in linux.get_details_of(name) if entity is not None):
                 return found
         case OS.MAC:
+            from . import mac
             for found in (entity for entity in mac.get_details_of(name) if entity is not None):
                 return found
         case OS.WINDOWS:
+            from . import windows
             for found in windows.get_details_of(name):
                 # if found:
                 #     return found
@@ -146,13 +188,114 @@ def get_version_of(name: str) -> Optional[Version | str]:
     """
     match sys.platform:
         case OS.LINUX:
+            from . import linux
             for found in (entity for entity in linux.get_version_of(name) if entity is not None):
                 return found
         case OS.MAC:
+            from . import mac
             for found in (entity for entity in mac.get_version_of(name) if entity is not None):
                 return found
         case OS.WINDOWS:
+            from . import windows
             for found in windows.get_version_of(name):
                 for version in found:
                     return version
             return "Browser is not installed."
+
+
+# retrieve versions of several browsers
+def get_versions_of(names: Iterable[str]) -> dict[str, Version | str]:
+    """
+    Retrieve versions of the provided browsers with a single lookup.\n
+    Accepts the same browser names as get_version_of.
+
+    :return: Dictionary of browser name and version, or "Browser is not installed." if it is not installed.
+    """
+    names = [names] if isinstance(names, str) else list(names)
+    versions = {name: "Browser is not installed." for name in names}
+    for browser in browsers(names=names):
+        if isinstance(versions.get(browser["name"]), str):
+            versions[browser["name"]] = Version(version=browser["version"])
+    return versions
+
+
+# scan installed browsers once
+def snapshot() -> Inventory:
+    """
+    Scans installed browsers once and keeps the result.\n
+    The returned inventory answers browsers, what_is_the_default_browser, do_i_have_installed,
+    give_me_details_of and get_version_of from memory until its refresh method is called.
+
+    :return: Inventory of installed browsers with the timestamp of the scan.
+    """
+    return Inventory()
+
+
+# get all installed browsers without blocking the event loop
+async def async_browsers(names: Optional[Iterable[str]] = None, channels: Optional[Iterable[str]] = None,
+                         with_versions: bool = True) -> AsyncIterator[Browser]:
+    """
+    Iterates over installed browsers asynchronously.\n
+    Version probes run as subprocesses of the event loop (linux and mac), registry lookups run in a thread (windows).
+    Accepts the same filters as browsers.
+
+    :return: Asynchronous iterator of dictionary of browser key and information.
+    """
+    import asyncio
+    match sys.platform:
+        case OS.LINUX:
+            from . import linux
+            async for browser in linux.async_browsers(names=names, channels=channels, with_versions=with_versions):
+                yield browser
+        case OS.MAC:
+            from . import mac
+            async for browser in mac.async_browsers(names=names, channels=channels, with_versions=with_versions):
+                yield browser
+        case OS.WINDOWS:
+            found = await asyncio.to_thread(list, browsers(names, channels, with_versions))
+            for browser in found:
+                yield browser
+        case _:
+            yield Browser(
+                name="exception", description="This operating system is not yet supported.", version="", location=""
+            )
+
+
+# retrieve browser details without blocking the event loop
+async def async_get_details_of(name: str) -> Optional[Browser | str]:
+    """
+    Retrieve browser details asynchronously if the provided browser is installed in system.\n
+    Accepts the same browser names as give_me_details_of.
+
+    :return: Dictionary containing browser name, description, desktop version and location.
+    """
+    import asyncio
+    match sys.platform:
+        case OS.LINUX:
+            from . import linux
+            return await linux.async_get_details_of(name)
+        case OS.MAC:
+            from . import mac
+            return await mac.async_get_details_of(name)
+        case OS.WINDOWS:
+            return await asyncio.to_thread(give_me_details_of, name)
+
+
+# retrieve browser version without blocking the event loop
+async def async_get_version_of(name: str) -> Optional[Version | str]:
+    """
+    Retrieve browser version asynchronously if the provided browser is installed in system.\n
+    Accepts the same browser names as get_version_of.
+
+    :return: Browser description and version.
+    """
+    import asyncio
+    match sys.platform:
+        case OS.LINUX:
+            from . import linux
+            return await linux.async_get_version_of(name)
+        case OS.MAC:
+            from . import mac
+            return await mac.async_get_version_of(name)
+        case OS.WINDOWS:
+            return await asyncio.to_thread(get_version_of, name)
@@ -1,4 +1,6 @@
-from typing import TypedDict
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional, TypedDict
 
 
 class OS:
@@ -9,6 +11,25 @@ class OS:
     WIN64 = "64bit"
 
 
+class Channel:
+    STABLE = "stable"
+    BETA = "beta"
+    DEV = "dev"
+    NIGHTLY = "nightly"
+    CANARY = "canary"
+
+
+# dictionary of browser name suffixes and their release channels
+CHANNEL_SUFFIXES = {
+    "beta": Channel.BETA,
+    "dev": Channel.DEV,
+    "developer": Channel.DEV,
+    "snapshot": Channel.DEV,
+    "nightly": Channel.NIGHTLY,
+    "canary": Channel.CANARY,
+}
+
+
 class Browser(TypedDict):
     name: str
     description: str
@@ -18,3 +39,48 @@ class Browser(TypedDict):
 
 class Version(TypedDict):
     version: str
+
+
+# determine release channel of a browser from its name, e.g. "msedge-beta" is beta
+def get_channel(name: str) -> str:
+    return CHANNEL_SUFFIXES.get(name.rsplit("-", 1)[-1], Channel.STABLE)
+
+
+# create a filter of browser names, no names and no channels accept every browser
+def create_filter(names: Optional[Iterable[str]] = None,
+                  channels: Optional[Iterable[str]] = None) -> Callable[[str], bool]:
+    names = None if names is None else frozenset([names] if isinstance(names, str) else names)
+    channels = None if channels is None else frozenset([channels] if isinstance(channels, str) else channels)
+
+    def is_requested(name: str) -> bool:
+        return (names is None or name in names) and (channels is None or get_channel(name) in channels)
+    return is_requested
+
+
+# thread-safe cache keeping the least recently used entries up to maxsize
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[object]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: object) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,218 @@
+import os
+import sys
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+from .common import Browser, OS
+
+# hashlib, json, tempfile and the locking modules are imported where they are needed
+# so that importing the package does not pay for them
+
+# environment variable enabling the persistent cache, e.g. INSTALLED_BROWSERS_CACHE=1
+CACHE_ENVIRONMENT_VARIABLE = "INSTALLED_BROWSERS_CACHE"
+
+# values of the environment variable enabling the persistent cache
+ENABLED_VALUES = ("1", "true", "yes", "on")
+
+# directory of the persistent cache under $XDG_CACHE_HOME
+CACHE_DIR_NAME = "installed_browsers"
+
+# format of cache files, files of another format are scanned again
+CACHE_FORMAT = 2
+
+# lock file serializing processes which scan and write the cache
+LOCK_FILE = ".lock"
+
+
+# check if the persistent cache is enabled, by parameter or by environment variable
+def is_enabled(cache: Optional[bool] = None) -> bool:
+    if cache is not None:
+        return cache
+    return os.environ.get(CACHE_ENVIRONMENT_VARIABLE, "").strip().lower() in ENABLED_VALUES
+
+
+# determine directory of the persistent cache, e.g. ~/.cache/installed_browsers
+def get_cache_dir() -> str:
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache")),
+                        CACHE_DIR_NAME)
+
+
+# get installed browsers of a platform module from the persistent cache
+# the cache is valid as long as the sources and the fingerprints of its browsers did not change
+# the first process scans and writes the cache, processes starting meanwhile wait for it and read it
+def get_browsers(platform_module, names: Optional[Iterable[str]] = None, channels: Optional[Iterable[str]] = None,
+                 with_versions: bool = True) -> list[Browser]:
+    names = _normalize_filter(names)
+    channels = _normalize_filter(channels)
+    cache_dir = get_cache_dir()
+    path = os.path.join(cache_dir, _get_cache_file(platform_module, names, channels, with_versions))
+    found = _load(platform_module, path)
+    if found is not None:
+        return found
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        pass
+    with _lock(cache_dir):
+        found = _load(platform_module, path)
+        if found is None:
+            # sources are taken before the scan, a browser installed meanwhile invalidates the cache
+            sources = platform_module._get_cache_sources()
+            found = list(platform_module.browsers(names=names, channels=channels, with_versions=with_versions))
+            _store(platform_module, path, sources,
+                   [(browser, platform_module._get_cache_fingerprint(browser)) for browser in found])
+            _prune(platform_module, path, sources)
+    return found
+
+
+# remove every cache file of the persistent cache
+def clear_cache() -> None:
+    cache_dir = get_cache_dir()
+    try:
+        entries = os.listdir(cache_dir)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.endswith(".json"):
+            try:
+                os.remove(os.path.join(cache_dir, entry))
+            except OSError:     # pragma: no cover
+                pass
+
+
+# sort browser names and channels, a single name is accepted like by create_filter
+def _normalize_filter(values: Optional[Iterable[str]]) -> Optional[list[str]]:
+    if values is None:
+        return None
+    return sorted(set([values] if isinstance(values, str) else values))
+
+
+# name of the cache file of the browsers() arguments, e.g. browsers-3f2a9c0d1e7b4a65.json
+def _get_cache_file(platform_module, names: Optional[list[str]], channels: Optional[list[str]],
+                    with_versions: bool) -> str:
+    import hashlib
+    import json
+    key = json.dumps([platform_module.__name__, names, channels, with_versions])
+    return f"browsers-{hashlib.sha256(key.encode()).hexdigest()[:16]}.json"
+
+
+# read browsers of a cache file, None if it is missing, of another format or out of date
+def _load(platform_module, path: str) -> Optional[list[Browser]]:
+    import json
+    try:
+        with open(path, encoding="utf-8") as file:
+            content = json.load(file)
+        if content["format"] != CACHE_FORMAT or content["sources"] != _to_json(platform_module._get_cache_sources()):
+            return None
+        found = []
+        for entry in content["browsers"]:
+            browser = Browser(**entry["browser"])
+            fingerprint = platform_module._get_cache_fingerprint(browser)
+            if entry["fingerprint"] != _to_json(fingerprint):
+                return None
+            found.append(browser)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return found
+
+
+# write browsers with their fingerprints to a cache file
+# the file is written next to the cache file and renamed, readers never see a partially written file
+def _store(platform_module, path: str, sources: list, browsers: list[tuple[Browser, Optional[tuple]]]) -> None:
+    import json
+    import tempfile
+    content = {
+        "format": CACHE_FORMAT,
+        "module": platform_module.__name__,
+        "sources": _to_json(sources),
+        "browsers": [{"browser": dict(browser), "fingerprint": _to_json(fingerprint)}
+                     for browser, fingerprint in browsers],
+    }
+    temporary_path = None
+    try:
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(path),
+                                         prefix=os.path.basename(path), suffix=".tmp", delete=False) as file:
+            temporary_path = file.name
+            json.dump(content, file)
+        os.replace(temporary_path, path)
+    except OSError:
+        # the cache is not written, browsers are scanned again next time
+        if temporary_path is not None:
+            try:
+                os.remove(temporary_path)
+            except OSError:     # pragma: no cover
+                pass
+
+
+# remove cache files superseded by a newly written one: files of another format, files of the platform module
+# scanned from other sources, which are never valid again, and temporary files of interrupted writers
+# the cache directory is locked meanwhile, no other process is writing a file
+def _prune(platform_module, path: str, sources: list) -> None:
+    import json
+    cache_dir = os.path.dirname(path)
+    try:
+        entries = os.listdir(cache_dir)
+    except OSError:     # pragma: no cover
+        return
+    for entry in entries:
+        entry_path = os.path.join(cache_dir, entry)
+        if entry.endswith(".tmp"):
+            superseded = True
+        elif entry.endswith(".json") and entry_path != path:
+            try:
+                with open(entry_path, encoding="utf-8") as file:
+                    content = json.load(file)
+                superseded = content["format"] != CACHE_FORMAT or (
+                    content["module"] == platform_module.__name__ and content["sources"] != _to_json(sources)
+                )
+            except (OSError, ValueError, KeyError, TypeError):
+                superseded = True
+        else:
+            continue
+        if superseded:
+            try:
+                os.remove(entry_path)
+            except OSError:     # pragma: no cover
+                pass
+
+
+# convert tuples of sources and fingerprints to lists, as they are read back from json
+def _to_json(value):
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return value
+
+
+# lock the cache directory exclusively, other processes wait until it is unlocked
+# without a lock file, e.g. in a read-only directory, nothing is locked and the cache is not written anyway
+@contextmanager
+def _lock(cache_dir: str) -> Iterator[None]:
+    try:
+        file = open(os.path.join(cache_dir, LOCK_FILE), "a+b")
+    except OSError:
+        yield
+        return
+    with file:
+        match sys.platform:
+            case OS.WINDOWS:    # pragma: no cover
+                import msvcrt
+                file.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK gives up after 10 attempts, it is tried again until the lock is taken
+                        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+                try:
+                    yield
+                finally:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+            case _:
+                import fcntl
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,56 @@
+import time
+from typing import Optional
+
+from .common import Browser, Version
+
+
+# snapshot of installed browsers, every query is answered from a single scan
+class Inventory:
+    def __init__(self):
+        self.timestamp = 0.0
+        self._browsers: dict[str, Browser] = {}
+        self._default_browser: Optional[str] = None
+        self.refresh()
+
+    # scan installed browsers again
+    def refresh(self) -> "Inventory":
+        from . import browsers
+        found = {}
+        for browser in browsers():
+            # the first occurrence wins, just like in give_me_details_of
+            found.setdefault(browser["name"], browser)
+        self._browsers = found
+        self._default_browser = None
+        self.timestamp = time.time()
+        return self
+
+    # get all installed browsers
+    def browsers(self) -> list[Browser]:
+        return list(self._browsers.values())
+
+    # get default browser, it is determined on first use only
+    def what_is_the_default_browser(self) -> Optional[str]:
+        if self._default_browser is None:
+            from . import what_is_the_default_browser
+            self._default_browser = what_is_the_default_browser()
+        return self._default_browser
+
+    # check if the given browser is installed
+    def do_i_have_installed(self, name: str) -> bool:
+        return name in self._browsers
+
+    # retrieve browser details
+    def give_me_details_of(self, name: str) -> Browser | str:
+        return self._browsers.get(name, "Browser is not installed.")
+
+    # retrieve browser version
+    def get_version_of(self, name: str) -> Version | str:
+        if name not in self._browsers:
+            return "Browser is not installed."
+        return Version(version=self._browsers[name]["version"])
+
+    def __contains__(self, name: str) -> bool:
+        return self.do_i_have_installed(name)
+
+    def __len__(self) -> int:
+        return len(self._browsers)
@@ -1,96 +1,300 @@
 import os
 import re
-import subprocess
-from typing import Iterator, Optional
+import threading
+from functools import lru_cache
+from typing import AsyncIterator, Iterable, Iterator, Optional
 
-from xdg.DesktopEntry import DesktopEntry
+from .common import Browser, LRUCache, Version, create_filter
 
-from .common import Browser, Version
+# subprocess, shlex, shutil and concurrent.futures are imported where they are needed
+# so that importing the package does not pay for them
 
 # tuple of possible browsers
 # desktop entry name may be different for different architectures:
 # for example "chromium_chromium.desktop" or "chromium-browser.desktop"
+# flatpak desktop entries are named after the application id, for example "org.mozilla.firefox.desktop"
 POSSIBLE_BROWSERS = (
-    ("chrome", ("google-chrome",)),
-    ("chromium", ("chromium", "chromium_chromium", "chromium-browser")),
-    ("firefox", ("firefox", "firefox_firefox")),
-    ("opera", ("opera",)),
+    ("chrome", ("google-chrome", "com.google.Chrome")),
+    ("chromium", ("chromium", "chromium_chromium", "chromium-browser", "org.chromium.Chromium")),
+    ("firefox", ("firefox", "firefox_firefox", "org.mozilla.firefox")),
+    ("opera", ("opera", "com.opera.Opera")),
     ("opera-beta", ("opera-beta",)),
     ("opera-developer", ("opera-developer",)),
-    ("msedge", ("microsoft-edge",)),
+    ("msedge", ("microsoft-edge", "com.microsoft.Edge")),
     ("msedge-beta", ("microsoft-edge-beta",)),
     ("msedge-dev", ("microsoft-edge-dev",)),
-    ("brave", ("brave-browser", "brave_brave")),
+    ("brave", ("brave-browser", "brave_brave", "com.brave.Browser")),
     ("brave-beta", ("brave-browser-beta",)),
     ("brave-nightly", ("brave-browser-nightly",)),
-    ("vivaldi-stable", ("vivaldi-stable",)),
+    ("vivaldi-stable", ("vivaldi-stable", "com.vivaldi.Vivaldi")),
     ("vivaldi-snapshot", ("vivaldi-snapshot",)),
     ("min", ("min",))
 )
 
 # tuple of browser locations
-# $XDG_DATA_HOME and $XDG_DATA_DIRS are not always set
+# $XDG_DATA_HOME and $XDG_DATA_DIRS are not always set, they are considered in addition when they are
 BROWSER_LOCATIONS = (
     "~/.local/share/applications",
     "/usr/share/applications",
     "/var/lib/snapd/desktop/applications",
+    "~/.local/share/flatpak/exports/share/applications",
+    "/var/lib/flatpak/exports/share/applications",
 )
 
+# mimeapps.list group and key naming the default browser, see the XDG MIME applications specification
+MIMEAPPS_LIST = "mimeapps.list"
+MIMEAPPS_GROUP = "[Default Applications]"
+DEFAULT_BROWSER_KEY = "x-scheme-handler/https"
+
+# alternatives link to the default browser of debian-based distributions
+BROWSER_ALTERNATIVE = "/etc/alternatives/x-www-browser"
+
+# desktop entry file extension
+DESKTOP_EXTENSION = ".desktop"
+
+# desktop entry group and the keys read from it
+DESKTOP_ENTRY_GROUP = "[Desktop Entry]"
+DESKTOP_ENTRY_KEYS = ("Exec", "Name")
+
+# escape sequences of desktop entry string values
+DESKTOP_ENTRY_ESCAPES = {"s": " ", "n": "\n", "t": "\t", "r": "\r", "\\": "\\"}
+
 # set version pattern with dot separation
 VERSION_PATTERN = re.compile(r"\b(\S+\.\S+)\b")
 
+# default number of version probes running at the same time
+MAX_WORKERS = 8
+
+# seconds a browser may take to print its version before it is killed
+PROBE_TIMEOUT = 10.0
+
+# version reported when the browser does not print its version in time
+VERSION_UNKNOWN = "unknown"
+
+# snap commands and installed snaps, the metadata of the current revision is in <snap>/current/meta/snap.yaml
+SNAP_BIN_DIR = "/snap/bin"
+SNAP_DIR = "/snap"
+
+# packaging revision appended to upstream versions, e.g. the "-1" of firefox snap version "124.0.1-1"
+PACKAGE_REVISION_PATTERN = re.compile(r"-\d+$")
+
+# flatpak installations, per user first, the active deployment of an application is in app/<id>/current/active
+FLATPAK_INSTALLATIONS = (
+    "~/.local/share/flatpak",
+    "/var/lib/flatpak",
+)
+
+# appstream files of a flatpak deployment holding its releases, relative to the active deployment
+FLATPAK_APPSTREAM_FILES = (
+    "files/share/metainfo/{}.metainfo.xml",
+    "files/share/metainfo/{}.appdata.xml",
+    "files/share/appdata/{}.appdata.xml",
+)
+
+# version of the first, latest release of an appstream file
+APPSTREAM_RELEASE_PATTERN = re.compile(r"<release\b[^>]*?\bversion=[\"']([^\"']+)[\"']")
+
+# file forwarding markers flatpak adds around the field codes of exported desktop entries
+FLATPAK_FILE_FORWARDING = ("@@", "@@u")
+
+# packages of browser commands, versions of browsers installed from .deb or .rpm come from the package database
+BROWSER_PACKAGES = {
+    "google-chrome": ("google-chrome-stable",),
+    "google-chrome-stable": ("google-chrome-stable",),
+    "chromium": ("chromium",),
+    "chromium-browser": ("chromium-browser", "chromium"),
+    "firefox": ("firefox",),
+    "firefox-esr": ("firefox-esr",),
+    "opera": ("opera-stable",),
+    "opera-beta": ("opera-beta",),
+    "opera-developer": ("opera-developer",),
+    "microsoft-edge": ("microsoft-edge-stable",),
+    "microsoft-edge-stable": ("microsoft-edge-stable",),
+    "microsoft-edge-beta": ("microsoft-edge-beta",),
+    "microsoft-edge-dev": ("microsoft-edge-dev",),
+    "brave-browser": ("brave-browser",),
+    "brave-browser-stable": ("brave-browser",),
+    "brave-browser-beta": ("brave-browser-beta",),
+    "brave-browser-nightly": ("brave-browser-nightly",),
+    "vivaldi": ("vivaldi-stable",),
+    "vivaldi-stable": ("vivaldi-stable",),
+    "vivaldi-snapshot": ("vivaldi-snapshot",),
+    "min": ("min",),
+}
+
+# only commands installed by the package manager are looked up in the package database
+PACKAGE_PREFIXES = ("/usr/bin/", "/usr/lib/", "/opt/")
+
+# dpkg status database and rpm sqlite databases, the first existing rpm database is read
+DPKG_STATUS = "/var/lib/dpkg/status"
+RPM_DATABASES = ("/usr/lib/sysimage/rpm/rpmdb.sqlite", "/var/lib/rpm/rpmdb.sqlite")
+
+# header tags of the package name and version in the rpm database
+RPM_TAG_NAME = 1000
+RPM_TAG_VERSION = 1001
+
+# package versions of transitional packages installing a snap, e.g. firefox 1:1snap1-0ubuntu5 of ubuntu
+TRANSITIONAL_VERSION_PATTERN = re.compile(r"snap", re.IGNORECASE)
+
+# ini files of firefox-family installations with the group and key holding the version
+INI_VERSIONS = (
+    ("application.ini", "[App]", "Version"),
+    ("platform.ini", "[Build]", "Milestone"),
+)
+
+# chromium-family binaries embedding their own version in the read-only data of the executable
+# opera, vivaldi and brave are left out, the chromium version they embed is not their own
+CHROMIUM_BINARIES = ("chrome", "chromium", "chromium-browser", "msedge")
+
+# chromium-family binary run by a wrapper script from its own directory, e.g. "$HERE/chrome" of google-chrome
+WRAPPED_BINARY_PATTERN = re.compile(
+    rb"/(" + b"|".join(re.escape(binary.encode()) for binary in CHROMIUM_BINARIES) + rb")(?![\w.-])"
+)
+
+# maximum number of bytes of a wrapper script searched for the binary it runs
+WRAPPER_SCRIPT_SIZE = 65536
+
+# launchers running browsers packaged as snap or flatpak, their installation holds no browser version
+LAUNCHERS = ("snap", "flatpak")
+
+# section of an ELF executable holding the read-only data
+ELF_RODATA_SECTION = b".rodata"
+
+# chromium version embedded as a string constant, e.g. 124.0.6367.60
+CHROMIUM_VERSION_PATTERN = re.compile(rb"(\d{2,3}\.0\.\d{4,5}\.\d{1,4})\x00")
+
+# literal every chromium version contains after its major version, searched before the pattern is matched
+# a regular expression scanning the whole section is slower than running the browser
+CHROMIUM_VERSION_ANCHOR = b".0."
+
+# bytes which may not precede a chromium version
+CHROMIUM_VERSION_PREFIX = b"0123456789."
+
+# field codes of the Exec key, see the desktop entry specification
+FIELD_CODE_PATTERN = re.compile(r"%[%fFuUdDnNickvm]")
+
+# environment variable assignment of an "env" prefix
+ENVIRONMENT_ASSIGNMENT_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+# maximum number of browser versions kept in memory
+VERSION_CACHE_SIZE = 64
+
+# browser versions by executable identity
+_versions = LRUCache(VERSION_CACHE_SIZE)
+
+# maximum number of parsed desktop entries kept in memory
+DESKTOP_ENTRY_CACHE_SIZE = 64
+
+# desktop entry index together with the application directories and modification times it was built from
+_desktop_entries: tuple[tuple, dict[str, str]] = ((), {})
+
+# versions of browser packages together with the package databases and modification times they were read from
+_package_versions: tuple[tuple, dict[str, str]] = ((), {})
+
+# concurrent probes read the package databases only once
+_package_versions_lock = threading.Lock()
+
+# desktop name of the default browser together with the files and modification times it was determined from
+_default_browser: tuple[tuple, Optional[str]] = ((), None)
+
 
 # get all installed browsers
-def browsers() -> Iterator[Browser]:
-    unique_browsers = set()
-    for browser, desktop_entries in POSSIBLE_BROWSERS:
-        for application_dir in BROWSER_LOCATIONS:
-            for desktop_entry in desktop_entries:
-                path = os.path.join(application_dir, f"{desktop_entry}.desktop")
-                if not os.path.isfile(path):
-                    continue
-                if browser in unique_browsers:
-                    continue    # pragma: no cover
-                entry = DesktopEntry(path)
-                executable_path = entry.getExec()
-                if executable_path.lower().endswith(" %u"):
-                    executable_path = executable_path[:-3].strip()
-                version = subprocess.getoutput(f"{executable_path} --version 2>&1").strip()
-                match = VERSION_PATTERN.search(version)
-                if match:
-                    version = match[0]
-                yield Browser(
-                    name=browser, description=entry.getName(), version=version, location=executable_path
-                )
-                unique_browsers.add(browser)
+# versions are probed concurrently, browsers are yielded as soon as their probe finishes
+# unless ordered is set, in which case the order of POSSIBLE_BROWSERS is kept
+# names and channels are filtered before any desktop entry is read, versions are only probed if requested
+def browsers(max_workers: Optional[int] = None, ordered: bool = False, names: Optional[Iterable[str]] = None,
+             channels: Optional[Iterable[str]] = None, with_versions: bool = True) -> Iterator[Browser]:
+    found = _find_browsers(names, channels)
+    if not found:
+        return
+    if not with_versions:
+        for browser, description, executable_path in found:
+            yield Browser(name=browser, description=description, version="", location=executable_path)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    executor = ThreadPoolExecutor(max_workers=min(max_workers or MAX_WORKERS, len(found)))
+    try:
+        # browsers running the same executable share a single probe
+        probes = {}
+        scheduled = []
+        for browser, description, executable_path in found:
+            key = _get_version_key(executable_path) or executable_path
+            if key not in probes:
+                probes[key] = executor.submit(_get_version, executable_path)
+            scheduled.append((probes[key], (browser, description, executable_path)))
+        if not ordered:
+            records = {}
+            for future, record in scheduled:
+                records.setdefault(future, []).append(record)
+            scheduled = ((future, record) for future in as_completed(records) for record in records[future])
+        for future, (browser, description, executable_path) in scheduled:
+            yield Browser(
+                name=browser, description=description, version=future.result(), location=executable_path
+            )
+    finally:
+        # probes not started yet are dropped when the caller stops iterating early
+        executor.shutdown(cancel_futures=True)
+
+
+# get all installed browsers without blocking the event loop
+# at most max_workers versions are probed at the same time
+async def async_browsers(max_workers: Optional[int] = None, ordered: bool = False,
+                         names: Optional[Iterable[str]] = None, channels: Optional[Iterable[str]] = None,
+                         with_versions: bool = True) -> AsyncIterator[Browser]:
+    import asyncio
+    semaphore = asyncio.Semaphore(max_workers or MAX_WORKERS)
+
+    # browsers running the same executable share a single probe
+    probes = {}
+
+    async def probe(browser: str, description: str, executable_path: str) -> Browser:
+        version = ""
+        if with_versions:
+            key = _get_version_key(executable_path) or executable_path
+            if key not in probes:
+                probes[key] = asyncio.ensure_future(_async_get_version(executable_path, semaphore))
+            version = await probes[key]
+        return Browser(name=browser, description=description, version=version, location=executable_path)
+
+    tasks = [asyncio.ensure_future(probe(*found)) for found in _find_browsers(names, channels)]
+    try:
+        for task in (tasks if ordered else asyncio.as_completed(tasks)):
+            yield await task
+    finally:
+        # probes still running are cancelled and awaited, they kill their browsers before the iteration ends
+        pending = [task for task in (*tasks, *probes.values()) if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
 
 # get default browser
+# mimeapps.list files are read first, then the x-www-browser alternative and only then xdg-settings is run
+# the result is kept until any of the consulted files is modified
 def what_is_the_default_browser() -> Optional[str]:
-    cmd = "xdg-settings get default-web-browser".split()
-    try:
-        default_browser = subprocess.check_output(cmd, stderr=subprocess.DEVNULL).decode().strip()
-    except subprocess.CalledProcessError:   # pragma: no cover
-        default_browser = "No browser is set to default."
-    if not default_browser:
-        default_browser = "No browser is set to default."
+    global _default_browser
+    mimeapps_lists = _get_mimeapps_lists()
+    fingerprint = tuple((path, _get_mtime(path)) for path in (*mimeapps_lists, BROWSER_ALTERNATIVE))
+    if _default_browser[0] == fingerprint:
+        default_browser = _default_browser[1]
     else:
-        default_browser = _get_browser_description(default_browser)
-    return default_browser
+        default_browser = (_find_default_in_mimeapps_lists(mimeapps_lists)
+                           or _find_default_in_alternatives()
+                           or _find_default_with_xdg_settings())
+        _default_browser = (fingerprint, default_browser)
+    if not default_browser:
+        return "No browser is set to default."
+    return _get_browser_description(default_browser)
 
 
 # check if the given browser is installed
 def do_i_have_installed(name):
     for browser, desktop_names in (browser_record for browser_record in POSSIBLE_BROWSERS
                                    if browser_record[0] == name):
-        for desktop_name in desktop_names:
-            for application_dir in BROWSER_LOCATIONS:
-                path = os.path.join(application_dir, f"{desktop_name}.desktop")
-                if not os.path.isfile(path):
-                    continue
-                entry = DesktopEntry(path)
-                if entry:
-                    return True
+        for path in _find_desktop_entries(_get_desktop_entries(), desktop_names):
+            if _read_desktop_entry(path):
+                return True
     return False
 
 
@@ -98,22 +302,18 @@ def do_i_have_installed(name):
 def get_details_of(name) -> Optional[Browser]:
     for browser, desktop_names in (browser_record for browser_record in POSSIBLE_BROWSERS
                                    if browser_record[0] == name):
-        for desktop_name in desktop_names:
-            for application_dir in BROWSER_LOCATIONS:
-                path = os.path.join(application_dir, f"{desktop_name}.desktop")
-                if not os.path.isfile(path):
-                    continue
-                entry = DesktopEntry(path)
-                executable_path = entry.getExec()
-                if executable_path.lower().endswith(" %u"):
-                    executable_path = executable_path[:-3].strip()
-                version = subprocess.getoutput(f"{executable_path} --version 2>&1").strip()
-                match = VERSION_PATTERN.search(version)
-                if match:
-                    version = match[0]
-                yield Browser(
-                    name=browser, description=entry.getName(), version=version, location=executable_path
-                )
+        # desktop entries running the same executable share a single probe
+        probed = {}
+        for path in _find_desktop_entries(_get_desktop_entries(), desktop_names):
+            entry = _read_desktop_entry(path)
+            executable_path = _get_executable_path(entry)
+            key = _get_version_key(executable_path) or executable_path
+            if key not in probed:
+                probed[key] = _get_version(executable_path)
+            version = probed[key]
+            yield Browser(
+                name=browser, description=entry.get("Name", ""), version=version, location=executable_path
+            )
     yield "Browser is not installed."
 
 
@@ -121,29 +321,746 @@ def get_details_of(name) -> Optional[Browser]:
 def get_version_of(name) -> Optional[Version]:
     for browser, desktop_names in (browser_record for browser_record in POSSIBLE_BROWSERS
                                    if browser_record[0] == name):
-        for desktop_name in desktop_names:
-            for application_dir in BROWSER_LOCATIONS:
-                path = os.path.join(application_dir, f"{desktop_name}.desktop")
-                if not os.path.isfile(path):
-                    continue
-                entry = DesktopEntry(path)
-                executable_path = entry.getExec()
-                if executable_path.lower().endswith(" %u"):
-                    executable_path = executable_path[:-3].strip()
-                version = subprocess.getoutput(f"{executable_path} --version 2>&1").strip()
-                match = VERSION_PATTERN.search(version)
-                if match:
-                    version = match[0]
-                yield Version(
-                    version=version
-                )
+        # desktop entries running the same executable share a single probe
+        probed = {}
+        for path in _find_desktop_entries(_get_desktop_entries(), desktop_names):
+            entry = _read_desktop_entry(path)
+            executable_path = _get_executable_path(entry)
+            key = _get_version_key(executable_path) or executable_path
+            if key not in probed:
+                probed[key] = _get_version(executable_path)
+            version = probed[key]
+            yield Version(
+                version=version
+            )
     yield "Browser is not installed."
 
 
+# get details of a browser without blocking the event loop
+async def async_get_details_of(name) -> Browser | str:
+    import asyncio
+    semaphore = asyncio.Semaphore(MAX_WORKERS)
+    for browser, desktop_names in (browser_record for browser_record in POSSIBLE_BROWSERS
+                                   if browser_record[0] == name):
+        for path in _find_desktop_entries(_get_desktop_entries(), desktop_names):
+            entry = _read_desktop_entry(path)
+            executable_path = _get_executable_path(entry)
+            version = await _async_get_version(executable_path, semaphore)
+            return Browser(
+                name=browser, description=entry.get("Name", ""), version=version, location=executable_path
+            )
+    return "Browser is not installed."
+
+
+# retrieve browser version without blocking the event loop
+async def async_get_version_of(name) -> Version | str:
+    details = await async_get_details_of(name)
+    if isinstance(details, str):
+        return details
+    return Version(version=details["version"])
+
+
+# clear cached browser versions and desktop entries
+def clear_cache() -> None:
+    global _desktop_entries, _package_versions, _default_browser
+    _versions.clear()
+    _parse_desktop_entry.cache_clear()
+    _desktop_entries = ((), {})
+    _package_versions = ((), {})
+    _default_browser = ((), None)
+
+
+# sources of browsers kept in the persistent cache: application directories and package databases
+# a browser installed or removed since modifies one of them
+def _get_cache_sources() -> list[tuple[str, Optional[int]]]:
+    return [(path, _get_mtime(path)) for path in (*_get_application_dirs(), DPKG_STATUS, *RPM_DATABASES)]
+
+
+# fingerprint of a browser kept in the persistent cache: the identity of the executable it runs
+def _get_cache_fingerprint(browser: Browser) -> Optional[tuple]:
+    return _get_executable_identity(browser["location"])
+
+
+# find installed browsers with their description and executable path, versions are not determined
+def _find_browsers(names: Optional[Iterable[str]] = None,
+                   channels: Optional[Iterable[str]] = None) -> list[tuple[str, str, str]]:
+    found = []
+    is_requested = create_filter(names, channels)
+    desktop_entries = _get_desktop_entries()
+    for browser, desktop_names in (browser_record for browser_record in POSSIBLE_BROWSERS
+                                   if is_requested(browser_record[0])):
+        for path in _find_desktop_entries(desktop_entries, desktop_names):
+            entry = _read_desktop_entry(path)
+            found.append((browser, entry.get("Name", ""), _get_executable_path(entry)))
+            break
+    return found
+
+
 # determine browser description
 def _get_browser_description(desktop_name):
-    for application_dir in BROWSER_LOCATIONS:
-        path = os.path.join(application_dir, desktop_name)
-        if os.path.isfile(path):
-            entry = DesktopEntry(path)
-            return entry.getName()
+    path = _get_desktop_entries().get(desktop_name.removesuffix(DESKTOP_EXTENSION))
+    if path:
+        return _read_desktop_entry(path).get("Name", "")
+
+
+# determine mimeapps.list files in order of precedence, desktop specific ones win over the generic one
+def _get_mimeapps_lists() -> list[str]:
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    config_dirs = [config_dir for config_dir in (os.environ.get("XDG_CONFIG_DIRS") or "/etc/xdg").split(os.pathsep)
+                   if config_dir]
+    desktops = [desktop.lower() for desktop in os.environ.get("XDG_CURRENT_DESKTOP", "").split(":") if desktop]
+    mimeapps_lists = []
+    for directory in (config_home, *config_dirs, *_get_application_dirs()):
+        mimeapps_lists.extend(os.path.join(directory, f"{desktop}-{MIMEAPPS_LIST}") for desktop in desktops)
+        mimeapps_lists.append(os.path.join(directory, MIMEAPPS_LIST))
+    return list(dict.fromkeys(mimeapps_lists))
+
+
+# determine modification time of a file or link, None if it does not exist
+def _get_mtime(path: str) -> Optional[int]:
+    try:
+        return os.lstat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+# find default browser in mimeapps.list files, the first installed handler of https wins
+def _find_default_in_mimeapps_lists(mimeapps_lists: list[str]) -> Optional[str]:
+    desktop_entries = _get_desktop_entries()
+    for mimeapps_list in mimeapps_lists:
+        handlers = _read_ini_value(mimeapps_list, MIMEAPPS_GROUP, DEFAULT_BROWSER_KEY)
+        for handler in (handlers or "").split(";"):
+            handler = handler.strip().removesuffix(DESKTOP_EXTENSION)
+            if handler in desktop_entries:
+                return handler
+    return None
+
+
+# find desktop entry of the browser the x-www-browser alternative links to
+def _find_default_in_alternatives() -> Optional[str]:
+    import shutil
+    if not os.path.lexists(BROWSER_ALTERNATIVE):
+        return None
+    alternative = os.path.realpath(BROWSER_ALTERNATIVE)
+    desktop_entries = _get_desktop_entries()
+    for browser, desktop_names in POSSIBLE_BROWSERS:
+        for desktop_name in desktop_names:
+            if desktop_name not in desktop_entries:
+                continue
+            executable_path = _get_executable_path(_read_desktop_entry(desktop_entries[desktop_name]))
+            environment, arguments = _get_command(executable_path)
+            resolved = shutil.which(arguments[0]) if arguments else None
+            if resolved and os.path.realpath(resolved) == alternative:
+                return desktop_name
+    return None
+
+
+# ask xdg-settings for the default browser, it runs a shell script detecting the desktop environment
+def _find_default_with_xdg_settings() -> Optional[str]:
+    import subprocess
+    cmd = "xdg-settings get default-web-browser".split()
+    try:
+        default_browser = subprocess.check_output(cmd, stderr=subprocess.DEVNULL).decode().strip()
+    except (subprocess.CalledProcessError, OSError):   # pragma: no cover
+        return None
+    return default_browser.removesuffix(DESKTOP_EXTENSION) or None
+
+
+# determine application directories in order of precedence
+def _get_application_dirs() -> list[str]:
+    application_dirs = []
+    if os.environ.get("XDG_DATA_HOME"):
+        application_dirs.append(os.path.join(os.environ["XDG_DATA_HOME"], "applications"))
+    application_dirs.extend(os.path.expanduser(application_dir) for application_dir in BROWSER_LOCATIONS)
+    for data_dir in os.environ.get("XDG_DATA_DIRS", "").split(os.pathsep):
+        if data_dir:
+            application_dirs.append(os.path.join(data_dir, "applications"))
+    return list(dict.fromkeys(os.path.normpath(application_dir) for application_dir in application_dirs))
+
+
+# index desktop entries of all application directories by desktop name
+# directories are scanned once and scanned again only when their modification time changes
+def _get_desktop_entries() -> dict[str, str]:
+    global _desktop_entries
+    fingerprint = []
+    for application_dir in _get_application_dirs():
+        try:
+            fingerprint.append((application_dir, os.stat(application_dir).st_mtime_ns))
+        except OSError:
+            continue
+    fingerprint = tuple(fingerprint)
+    if _desktop_entries[0] == fingerprint:
+        return _desktop_entries[1]
+
+    index = {}
+    for application_dir, mtime in fingerprint:
+        try:
+            with os.scandir(application_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(DESKTOP_EXTENSION) or not entry.is_file():
+                        continue
+                    # the first application directory wins, just like in the XDG specification
+                    index.setdefault(entry.name.removesuffix(DESKTOP_EXTENSION), entry.path)
+        except OSError:     # pragma: no cover
+            continue
+    _desktop_entries = (fingerprint, index)
+    return index
+
+
+# find desktop entries of the given desktop names
+def _find_desktop_entries(desktop_entries: dict[str, str], desktop_names: tuple[str, ...]) -> Iterator[str]:
+    for desktop_name in desktop_names:
+        path = desktop_entries.get(desktop_name)
+        if path:
+            yield path
+
+
+# read the used keys of a desktop entry
+def _read_desktop_entry(path: str) -> dict[str, str]:
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    return _parse_desktop_entry(path, mtime, _get_locales())
+
+
+# parse the [Desktop Entry] group only, every other group and unused key is skipped
+# the localized name matching the first possible locale wins over the unlocalized one
+@lru_cache(maxsize=DESKTOP_ENTRY_CACHE_SIZE)
+def _parse_desktop_entry(path: str, mtime: int, locales: tuple[str, ...]) -> dict[str, str]:
+    entry = {}
+    localized_name = None
+    in_group = False
+    try:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("["):
+                    if in_group:
+                        break
+                    in_group = line == DESKTOP_ENTRY_GROUP
+                    continue
+                if not in_group:
+                    continue
+                key, separator, value = line.partition("=")
+                if not separator:
+                    continue
+                key = key.strip()
+                if key in DESKTOP_ENTRY_KEYS:
+                    entry[key] = _unescape(value.strip())
+                elif key.startswith("Name[") and key.endswith("]") and key[5:-1] in locales:
+                    rank = locales.index(key[5:-1])
+                    if localized_name is None or rank < localized_name[0]:
+                        localized_name = (rank, _unescape(value.strip()))
+    except OSError:     # pragma: no cover
+        return {}
+    if not in_group:
+        return _parse_legacy_desktop_entry(path)
+    if localized_name is not None:
+        entry["Name"] = localized_name[1]
+    return entry
+
+
+# legacy desktop entries (for example [KDE Desktop Entry]) are left to pyxdg when it is installed
+def _parse_legacy_desktop_entry(path: str) -> dict[str, str]:
+    try:
+        from xdg.DesktopEntry import DesktopEntry
+        from xdg.Exceptions import Error
+    except ImportError:     # pragma: no cover
+        return {}
+    try:
+        entry = DesktopEntry(path)
+    except Error:   # pragma: no cover
+        return {}
+    return {key: value for key, value in (("Exec", entry.getExec()), ("Name", entry.getName())) if value}
+
+
+# determine locales in order of preference, for example de_DE@euro, de_DE, de@euro and de
+def _get_locales() -> tuple[str, ...]:
+    languages = next((os.environ[variable] for variable in ("LANGUAGE", "LC_ALL", "LC_MESSAGES", "LANG")
+                      if os.environ.get(variable)), "")
+    locales = []
+    for language in languages.split(":"):
+        language, _, modifier = language.partition("@")
+        language = language.partition(".")[0]
+        if not language or language in ("C", "POSIX"):
+            continue
+        territory_less = language.partition("_")[0]
+        for locale in (f"{language}@{modifier}" if modifier else None, language,
+                       f"{territory_less}@{modifier}" if modifier else None, territory_less):
+            if locale and locale not in locales:
+                locales.append(locale)
+    return tuple(locales)
+
+
+# replace escape sequences of desktop entry values
+def _unescape(value: str) -> str:
+    if "\\" not in value:
+        return value
+    return re.sub(r"\\(.)", lambda match: DESKTOP_ENTRY_ESCAPES.get(match[1], match[0]), value)
+
+
+# determine executable path from desktop entry, field codes like %u or %F are removed
+# flatpak applications are reported as "flatpak run <application id>"
+def _get_executable_path(entry: dict[str, str]) -> str:
+    import shlex
+    try:
+        arguments = shlex.split(entry.get("Exec", ""))
+    except ValueError:
+        return entry.get("Exec", "")
+    application_id = _get_flatpak_id(arguments)
+    if application_id:
+        return shlex.join(["flatpak", "run", application_id])
+    return shlex.join(_remove_field_codes(arguments))
+
+
+# remove field codes of the Exec key, %% stands for a literal percent sign
+def _remove_field_codes(arguments: list[str]) -> list[str]:
+    cleaned = []
+    for argument in arguments:
+        if FIELD_CODE_PATTERN.fullmatch(argument) or argument in FLATPAK_FILE_FORWARDING:
+            continue
+        cleaned.append(FIELD_CODE_PATTERN.sub(lambda match: "%" if match[0] == "%%" else "", argument))
+    return cleaned
+
+
+# split executable path into environment variables of an "env VARIABLE=value" prefix and the arguments to run
+def _get_command(executable_path: str) -> tuple[dict[str, str], list[str]]:
+    import shlex
+    try:
+        arguments = shlex.split(executable_path)
+    except ValueError:
+        return {}, []
+    environment = {}
+    if arguments and os.path.basename(arguments[0]) == "env":
+        arguments = arguments[1:]
+        while arguments and ENVIRONMENT_ASSIGNMENT_PATTERN.match(arguments[0]):
+            variable, _, value = arguments.pop(0).partition("=")
+            environment[variable] = value
+    return environment, arguments
+
+
+# determine browser version
+# versions are cached as long as the resolved executable is not replaced or modified
+def _get_version(executable_path: str) -> str:
+    key = _get_version_key(executable_path)
+    version = _versions.get(key) if key else None
+    if version is None:
+        version = _get_metadata_version(executable_path) or _probe_version(executable_path)
+        if key and version != VERSION_UNKNOWN:
+            _versions.put(key, version)
+    return version
+
+
+# determine browser version without blocking the event loop
+# metadata is read in a thread, package databases and executables may take a while to read
+async def _async_get_version(executable_path: str, semaphore) -> str:
+    import asyncio
+    key = _get_version_key(executable_path)
+    version = _versions.get(key) if key else None
+    if version is None:
+        version = await asyncio.to_thread(_get_metadata_version, executable_path)
+        if version is None:
+            async with semaphore:
+                version = await _async_probe_version(executable_path)
+        if key and version != VERSION_UNKNOWN:
+            _versions.put(key, version)
+    return version
+
+
+# cache key of a browser version: the identity of the executable it runs
+# aliases like /usr/bin/chromium and /usr/bin/chromium-browser resolve to the same executable
+def _get_version_key(executable_path: str) -> Optional[tuple]:
+    return _get_executable_identity(executable_path)
+
+
+# determine resolved path, device, inode, size and modification time of the executable
+def _get_executable_identity(executable_path: str) -> Optional[tuple[str, int, int, int, int]]:
+    import shutil
+    environment, arguments = _get_command(executable_path)
+    if not arguments:
+        return None
+    # every flatpak application runs /usr/bin/flatpak, it is identified by its active deployment instead
+    deployment = _get_flatpak_deployment(arguments)
+    if deployment:
+        real_path = os.path.realpath(deployment)
+    else:
+        resolved = shutil.which(arguments[0])
+        if not resolved:
+            return None
+        # every snap command links to /usr/bin/snap, a snap is identified by its current revision instead
+        snap = _get_snap_name(resolved)
+        real_path = os.path.realpath(os.path.join(SNAP_DIR, snap, "current") if snap else resolved)
+    try:
+        stat = os.stat(real_path)
+    except OSError:     # pragma: no cover
+        return None
+    return real_path, stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+# determine browser version from metadata, without running the browser
+def _get_metadata_version(executable_path: str) -> Optional[str]:
+    for resolver in (_get_snap_version, _get_flatpak_version, _get_package_version, _get_static_version):
+        version = resolver(executable_path)
+        if version:
+            return version
+    return None
+
+
+# determine snap name of a snap command, e.g. /snap/bin/chromium.chromedriver belongs to chromium
+def _get_snap_name(command: str) -> Optional[str]:
+    if os.path.dirname(command) != SNAP_BIN_DIR:
+        return None
+    return os.path.basename(command).split(".", 1)[0]
+
+
+# read version of the current revision of a snap from its snap.yaml
+def _get_snap_version(executable_path: str) -> Optional[str]:
+    import shutil
+    environment, arguments = _get_command(executable_path)
+    resolved = shutil.which(arguments[0]) if arguments else None
+    snap = _get_snap_name(resolved) if resolved else None
+    if not snap:
+        return None
+    try:
+        with open(os.path.join(SNAP_DIR, snap, "current", "meta", "snap.yaml"), encoding="utf-8") as file:
+            for line in file:
+                key, _, value = line.partition(":")
+                if key == "version":
+                    return PACKAGE_REVISION_PATTERN.sub("", value.strip().strip("'\""))
+    except OSError:
+        pass
+    return None
+
+
+# determine application id of a "flatpak run" command, e.g. "flatpak run --branch=stable org.mozilla.firefox"
+def _get_flatpak_id(arguments: list[str]) -> Optional[str]:
+    if len(arguments) < 2 or os.path.basename(arguments[0]) != "flatpak" or arguments[1] != "run":
+        return None
+    return next((argument for argument in arguments[2:] if not argument.startswith("-")), None)
+
+
+# find active deployment of a flatpak application, per user installations win over system ones
+def _get_flatpak_deployment(arguments: list[str]) -> Optional[str]:
+    application_id = _get_flatpak_id(arguments)
+    if not application_id:
+        return None
+    for installation in FLATPAK_INSTALLATIONS:
+        deployment = os.path.join(os.path.expanduser(installation), "app", application_id, "current", "active")
+        if os.path.isdir(deployment):
+            return deployment
+    return None
+
+
+# read version of a flatpak application from the latest release of its appstream file
+def _get_flatpak_version(executable_path: str) -> Optional[str]:
+    environment, arguments = _get_command(executable_path)
+    deployment = _get_flatpak_deployment(arguments)
+    if not deployment:
+        return None
+    application_id = _get_flatpak_id(arguments)
+    for appstream_file in FLATPAK_APPSTREAM_FILES:
+        try:
+            with open(os.path.join(deployment, appstream_file.format(application_id)), encoding="utf-8") as file:
+                match = APPSTREAM_RELEASE_PATTERN.search(file.read())
+        except OSError:
+            continue
+        if match:
+            return match[1]
+    return None
+
+
+# look up version of the package installing the browser command
+def _get_package_version(executable_path: str) -> Optional[str]:
+    import shutil
+    environment, arguments = _get_command(executable_path)
+    resolved = shutil.which(arguments[0]) if arguments else None
+    if not resolved or not resolved.startswith(PACKAGE_PREFIXES):
+        return None
+    packages = BROWSER_PACKAGES.get(os.path.basename(resolved), ())
+    if not packages:
+        return None
+    package_versions = _get_package_versions()
+    return next((package_versions[package] for package in packages if package in package_versions), None)
+
+
+# index versions of installed browser packages
+# package databases are read once and read again only when their modification time changes
+def _get_package_versions() -> dict[str, str]:
+    global _package_versions
+    databases = [DPKG_STATUS, next((database for database in RPM_DATABASES if os.path.isfile(database)), None)]
+    fingerprint = []
+    for database in databases:
+        try:
+            fingerprint.append((database, os.stat(database).st_mtime_ns))
+        except (OSError, TypeError):
+            continue
+    fingerprint = tuple(fingerprint)
+    with _package_versions_lock:
+        if _package_versions[0] == fingerprint:
+            return _package_versions[1]
+
+        packages = {package for package_names in BROWSER_PACKAGES.values() for package in package_names}
+        index = {}
+        for database, mtime in fingerprint:
+            read = _read_dpkg_status if database == DPKG_STATUS else _read_rpm_database
+            for package, version in read(database, packages):
+                version = _get_upstream_version(version)
+                if version and not TRANSITIONAL_VERSION_PATTERN.search(version):
+                    index.setdefault(package, version)
+        _package_versions = (fingerprint, index)
+        return index
+
+
+# read versions of installed packages from the dpkg status database in a single pass
+def _read_dpkg_status(path: str, packages: set[str]) -> Iterator[tuple[str, str]]:
+    package = version = status = None
+    try:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            for line in file:
+                if line == "\n":
+                    if package in packages and version and status and status.endswith(" installed"):
+                        yield package, version
+                    package = version = status = None
+                elif line.startswith("Package:"):
+                    package = line[8:].strip()
+                elif package in packages:
+                    if line.startswith("Version:"):
+                        version = line[8:].strip()
+                    elif line.startswith("Status:"):
+                        status = line[7:].strip()
+    except OSError:     # pragma: no cover
+        return
+    if package in packages and version and status and status.endswith(" installed"):
+        yield package, version
+
+
+# read versions of installed packages from the rpm sqlite database
+def _read_rpm_database(path: str, packages: set[str]) -> Iterator[tuple[str, str]]:
+    import sqlite3
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error:   # pragma: no cover
+        return
+    try:
+        for blob, in connection.execute("SELECT blob FROM Packages"):
+            tags = _read_rpm_header(blob, (RPM_TAG_NAME, RPM_TAG_VERSION))
+            if tags.get(RPM_TAG_NAME) in packages and tags.get(RPM_TAG_VERSION):
+                yield tags[RPM_TAG_NAME], tags[RPM_TAG_VERSION]
+    except sqlite3.Error:   # pragma: no cover
+        return
+    finally:
+        connection.close()
+
+
+# read string tags of an rpm header blob: index length, data length, index entries and the data store
+def _read_rpm_header(blob: bytes, tags: tuple[int, ...]) -> dict[int, str]:
+    import struct
+    found = {}
+    try:
+        index_length, data_length = struct.unpack_from(">ii", blob, 0)
+        data_start = 8 + index_length * 16
+        for entry in range(index_length):
+            tag, tag_type, offset, count = struct.unpack_from(">iiii", blob, 8 + entry * 16)
+            if tag in tags and 0 <= offset < data_length:
+                start = data_start + offset
+                found[tag] = blob[start:blob.index(b"\0", start)].decode("utf-8", "replace")
+    except (struct.error, ValueError):
+        return {}
+    return found
+
+
+# strip epoch and packaging revision of a package version, e.g. 1:124.0.6367.60-1 is 124.0.6367.60
+def _get_upstream_version(version: str) -> str:
+    version = version.partition(":")[2] or version
+    version = version.rpartition("-")[0] or version
+    return re.split(r"[~+]", version, maxsplit=1)[0]
+
+
+# read version from the installation of the browser: the read-only data of chromium-family binaries
+# or ini files of firefox-family browsers, wrapper scripts are resolved to the sibling binaries they run
+# snap and flatpak launchers are left to their own resolvers
+def _get_static_version(executable_path: str) -> Optional[str]:
+    import shutil
+    environment, arguments = _get_command(executable_path)
+    resolved = shutil.which(arguments[0]) if arguments else None
+    if not resolved or _get_snap_name(resolved):
+        return None
+    real_path = os.path.realpath(resolved)
+    if os.path.basename(real_path) in LAUNCHERS:
+        return None
+    installation_dir = os.path.dirname(real_path)
+    binaries = [real_path] if os.path.basename(real_path) in CHROMIUM_BINARIES else []
+    binaries += [os.path.join(installation_dir, binary) for binary in _get_wrapped_binaries(real_path)]
+    for binary in dict.fromkeys(binaries):
+        version = _read_elf_version(binary)
+        if version:
+            return version
+    if binaries:
+        # a chromium-family browser never takes the version of an ini file of another browser
+        return None
+    for file_name, group, key in INI_VERSIONS:
+        version = _read_ini_value(os.path.join(installation_dir, file_name), group, key)
+        if version:
+            return version
+    return None
+
+
+# determine chromium-family binaries a wrapper script runs, none if the executable is not a script
+def _get_wrapped_binaries(path: str) -> list[str]:
+    try:
+        with open(path, "rb") as file:
+            script = file.read(WRAPPER_SCRIPT_SIZE)
+    except OSError:
+        return []
+    if not script.startswith(b"#!"):
+        return []
+    return list(dict.fromkeys(match[1].decode() for match in WRAPPED_BINARY_PATTERN.finditer(script)))
+
+
+# read a value of an ini file group
+def _read_ini_value(path: str, group: str, key: str) -> Optional[str]:
+    in_group = False
+    try:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            for line in file:
+                line = line.strip()
+                if line.startswith("["):
+                    in_group = line == group
+                    continue
+                name, separator, value = line.partition("=")
+                if in_group and separator and name.strip() == key:
+                    return value.strip() or None
+    except OSError:
+        pass
+    return None
+
+
+# search the read-only data section of an ELF executable for the embedded chromium version
+# the executable is memory-mapped and never run
+def _read_elf_version(path: str) -> Optional[str]:
+    import mmap
+    try:
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            section = _find_elf_section(mapped, ELF_RODATA_SECTION)
+            if not section:
+                return None
+            offset, size = section
+            return _search_chromium_version(mapped, offset, offset + size)
+    except (OSError, ValueError):
+        return None
+
+
+# search a chromium version between start and end: the anchor is found first, the pattern is only matched
+# at the two possible starts of a two or three digit major version before it
+def _search_chromium_version(mapped, start: int, end: int) -> Optional[str]:
+    anchor = mapped.find(CHROMIUM_VERSION_ANCHOR, start, end)
+    while anchor != -1:
+        for candidate in (anchor - 3, anchor - 2):
+            if candidate < start or (candidate > start and mapped[candidate - 1] in CHROMIUM_VERSION_PREFIX):
+                continue
+            match = CHROMIUM_VERSION_PATTERN.match(mapped, candidate, end)
+            if match:
+                return match[1].decode()
+        anchor = mapped.find(CHROMIUM_VERSION_ANCHOR, anchor + 1, end)
+    return None
+
+
+# find offset and size of an ELF section by its name, 32 and 64 bit, little and big endian executables
+def _find_elf_section(mapped, name: bytes) -> Optional[tuple[int, int]]:
+    import struct
+    if mapped[:4] != b"\x7fELF":
+        return None
+    is_64bit = mapped[4] == 2
+    byte_order = "<" if mapped[5] == 1 else ">"
+    try:
+        if is_64bit:
+            section_offset, = struct.unpack_from(f"{byte_order}Q", mapped, 0x28)
+            entry_size, count, names_index = struct.unpack_from(f"{byte_order}HHH", mapped, 0x3A)
+            section_format = f"{byte_order}IIQQQQ"
+        else:
+            section_offset, = struct.unpack_from(f"{byte_order}I", mapped, 0x20)
+            entry_size, count, names_index = struct.unpack_from(f"{byte_order}HHH", mapped, 0x2E)
+            section_format = f"{byte_order}IIIIII"
+        sections = [struct.unpack_from(section_format, mapped, section_offset + index * entry_size)
+                    for index in range(count)]
+        names_offset = sections[names_index][4]
+        for name_offset, section_type, flags, address, offset, size in sections:
+            start = names_offset + name_offset
+            if mapped[start:mapped.find(b"\x00", start)] == name:
+                return offset, size
+    except (struct.error, IndexError):
+        return None
+    return None
+
+
+# run browser to determine its version
+# the browser runs without a shell in its own process group, which is killed when the probe times out
+def _probe_version(executable_path: str) -> str:
+    import subprocess
+    environment, arguments = _get_command(executable_path)
+    if not arguments:
+        return VERSION_UNKNOWN
+    try:
+        process = subprocess.Popen(
+            [*arguments, "--version"], env={**os.environ, **environment}, start_new_session=True,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+    except OSError:
+        return VERSION_UNKNOWN
+    try:
+        output, _ = process.communicate(timeout=PROBE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        _kill_process_group(process.pid)
+        process.kill()
+        process.wait()
+        return VERSION_UNKNOWN
+    finally:
+        if process.stdout:
+            process.stdout.close()
+    return _parse_version(output.decode(errors="replace"))
+
+
+# run browser to determine its version without blocking the event loop
+async def _async_probe_version(executable_path: str) -> str:
+    import asyncio
+    environment, arguments = _get_command(executable_path)
+    if not arguments:
+        return VERSION_UNKNOWN
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *arguments, "--version", env={**os.environ, **environment}, start_new_session=True,
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+    except OSError:
+        return VERSION_UNKNOWN
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), PROBE_TIMEOUT)
+    except BaseException as error:
+        # the probe runs in its own session and outlives a caller cancelling it, e.g. by asyncio.wait_for
+        _kill_process_group(process.pid)
+        await process.wait()
+        if isinstance(error, asyncio.TimeoutError):
+            return VERSION_UNKNOWN
+        raise
+    return _parse_version(output.decode(errors="replace"))
+
+
+# kill a probe together with every process it started
+def _kill_process_group(pid: int) -> None:
+    import signal
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:     # pragma: no cover
+        pass
+
+
+# find version in the output of the browser
+def _parse_version(output: str) -> str:
+    version = output.strip()
+    match = VERSION_PATTERN.search(version)
+    if match:
+        version = match[0]
+    return version
@@ -1,10 +1,11 @@
 import os
-import plistlib
-import subprocess
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import AsyncIterator, Iterable, Iterator, Optional
 
-from .common import Browser, Version
+from .common import Browser, LRUCache, Version, create_filter
+
+# fnmatch, plistlib and subprocess are imported where they are needed
+# so that importing the package does not pay for them
 
 # tuple of possible browsers
 POSSIBLE_BROWSERS = (
@@ -35,95 +36,143 @@ POSSIBLE_BROWSERS = (
     ("duckduckgo", "com.duckduckgo.mobile.ios", "CFBundleShortVersionString")
 )
 
+# spotlight attribute of the bundle identifier of applications
+BUNDLE_ID_ATTRIBUTE = "kMDItemCFBundleIdentifier"
+
+# spotlight is asked for application bundles, the application directories are scanned when it finds nothing
+# without spotlight, for example when indexing is disabled, the application directories are scanned only
+USE_SPOTLIGHT = True
+
+# seconds spotlight may take to answer before the application directories are scanned instead
+SPOTLIGHT_TIMEOUT = 10.0
+
+# directories of application bundles, their subdirectories are scanned one level deep, e.g. /Applications/Utilities
+APPLICATION_DIRS = ("/Applications", "~/Applications")
+
+# preferences of LaunchServices relative to the home directory, url handlers of the user are kept there
+LAUNCH_SERVICES_PREFERENCES = (
+    Path("Library")
+    / "Preferences"
+    / "com.apple.LaunchServices/com.apple.launchservices.secure.plist"
+)
+
+# dictionary of lowercase bundle identifiers of LaunchServices handlers and browser descriptions
+SUPPORTED_BROWSERS = {
+    "": "No browser is set to default.",
+    "com.google.chrome": "Google Chrome",
+    "com.google.chrome.canary": "Google Chrome Canary",
+    "org.chromium.chromium": "Chromium",
+    "org.mozilla.firefox": "Firefox",
+    "org.mozilla.firefoxdeveloperedition": "Firefox Developer Edition",
+    "org.mozilla.nightly": "Firefox Nightly",
+    "com.apple.safari": "Safari",
+    "com.operasoftware.opera": "Opera",
+    "com.operasoftware.operanext": "Opera Beta",
+    "com.operasoftware.operadeveloper": "Opera Developer",
+    "com.microsoft.edgemac": "Microsoft Edge",
+    "com.microsoft.edgemac.beta": "Microsoft Edge Beta",
+    "com.microsoft.edgemac.dev": "Microsoft Edge Dev",
+    "com.microsoft.edgemac.canary": "Microsoft Edge Canary",
+    "com.brave.browser": "Brave Browser",
+    "com.brave.browser.beta": "Brave Browser Beta",
+    "com.brave.browser.nightly": "Brave Browser Nightly",
+    "com.vivaldi.vivaldi": "Vivaldi",
+    "com.vivaldi.vivaldi.snapshot": "Vivaldi Snapshot",
+    "com.electron.min": "Min",
+    "paris.lithium.kosmik": "Kosmik",
+    "org.mozilla.pale moon": "Pale Moon",
+    "company.thebrowser.browser": "Arc",
+    "com.shift.browser": "Shift Browser",
+    "com.duckduckgo.mobile.ios": "DuckDuckGo"
+}
+
+# dictionary of lowercase bundle identifiers, browser names and bundle identifiers
+POSSIBLE_BROWSER_IDS = {
+    bundle_id.lower(): (browser, bundle_id) for browser, bundle_id, version_string in POSSIBLE_BROWSERS
+}
+
+# keys of Info.plist files the module uses, other keys are not kept in memory
+INFO_PLIST_KEYS = frozenset((
+    "CFBundleIdentifier",
+    "CFBundleExecutable",
+    "CFBundleDisplayName",
+    "CFBundleName",
+    "CFBundleShortVersionString",
+    "CFBundleVersion",
+    "KSVersion",
+))
+
+# maximum number of Info.plist files kept in memory, a scan of the application directories reads every one of them
+INFO_PLIST_CACHE_SIZE = 256
+
+# used keys of Info.plist files by path, size and modification time
+_info_plists = LRUCache(INFO_PLIST_CACHE_SIZE)
+
+# url handlers of LaunchServices by scheme together with the preferences and modification time they were read from
+_url_handlers: tuple[tuple, dict[str, str]] = ((), {})
+
+# application bundles found so far by bundle identifier
+_bundles: dict[str, list[str]] = {}
+
+# application bundles with their bundle identifiers by scanned application directories, together with the scanned
+# directories and modification times, a browser which is not installed is not looked for again until one changes
+_scans: dict[tuple[str, ...], tuple[tuple, list[tuple[str, str]]]] = {}
+
 
 # get all installed browsers
-def browsers() -> Iterator[Browser]:
-    for browser, bundle_id, version_string in POSSIBLE_BROWSERS:
-        paths = subprocess.getoutput(f'mdfind "kMDItemCFBundleIdentifier == {bundle_id}"').splitlines()
-        for path in paths:
-            with open(os.path.join(path, "Contents/Info.plist"), "rb") as f:
-                plist = plistlib.load(f)
-                executable_name = plist.get("CFBundleExecutable")
-                executable = os.path.join(path, "Contents/MacOS", executable_name)
-                description = plist.get("CFBundleDisplayName") or plist.get("CFBundleName", browser)
-                version = plist[version_string]
-                yield Browser(
-                    name=browser,
-                    description=description,
-                    version=version,
-                    location=executable if browser != "safari" else path
-                )
+# names and channels are filtered before spotlight is asked, spotlight is asked once for every requested browser
+# with root, the application directories of a mounted volume are scanned instead of asking spotlight
+def browsers(names: Optional[Iterable[str]] = None, channels: Optional[Iterable[str]] = None,
+             with_versions: bool = True, root: Optional[str] = None) -> Iterator[Browser]:
+    is_requested = create_filter(names, channels)
+    requested = [browser_record for browser_record in POSSIBLE_BROWSERS if is_requested(browser_record[0])]
+    bundles = _find_bundles([bundle_id for browser, bundle_id, version_string in requested], root)
+    for browser, bundle_id, version_string in requested:
+        for path in bundles.get(bundle_id, ()):
+            yield _create_browser(browser, path, version_string if with_versions else None)
 
 
-# get default browser
-def what_is_the_default_browser() -> Optional[str]:
-    PREFERENCES = (
-        Path.home()
-        / "Library"
-        / "Preferences"
-        / "com.apple.LaunchServices/com.apple.launchservices.secure.plist"
-    )
+# get all installed browsers without blocking the event loop
+# spotlight is asked once, max_workers is accepted for compatibility with the linux module
+async def async_browsers(max_workers: Optional[int] = None, names: Optional[Iterable[str]] = None,
+                         channels: Optional[Iterable[str]] = None, with_versions: bool = True,
+                         root: Optional[str] = None) -> AsyncIterator[Browser]:
+    is_requested = create_filter(names, channels)
+    requested = [browser_record for browser_record in POSSIBLE_BROWSERS if is_requested(browser_record[0])]
+    bundles = await _async_find_bundles([bundle_id for browser, bundle_id, version_string in requested], root)
+    for browser, bundle_id, version_string in requested:
+        for path in bundles.get(bundle_id, ()):
+            yield _create_browser(browser, path, version_string if with_versions else None)
 
-    SUPPORTED_BROWSERS = {
-        "": "No browser is set to default.",
-        "com.google.chrome": "Google Chrome",
-        "com.google.chrome.canary": "Google Chrome Canary",
-        "org.chromium.chromium": "Chromium",
-        "org.mozilla.firefox": "Firefox",
-        "org.mozilla.firefoxdeveloperedition": "Firefox Developer Edition",
-        "org.mozilla.nightly": "Firefox Nightly",
-        "com.apple.safari": "Safari",
-        "com.operasoftware.opera": "Opera",
-        "com.operasoftware.operanext": "Opera Beta",
-        "com.operasoftware.operadeveloper": "Opera Developer",
-        "com.microsoft.edgemac": "Microsoft Edge",
-        "com.microsoft.edgemac.beta": "Microsoft Edge Beta",
-        "com.microsoft.edgemac.dev": "Microsoft Edge Dev",
-        "com.microsoft.edgemac.canary": "Microsoft Edge Canary",
-        "com.brave.browser": "Brave Browser",
-        "com.brave.browser.beta": "Brave Browser Beta",
-        "com.brave.browser.nightly": "Brave Browser Nightly",
-        "com.vivaldi.vivaldi": "Vivaldi",
-        "com.vivaldi.vivaldi.snapshot": "Vivaldi Snapshot",
-        "com.electron.min": "Min",
-        "paris.lithium.kosmik": "Kosmik",
-        "org.mozilla.pale moon": "Pale Moon",
-        "company.thebrowser.browser": "Arc",
-        "com.shift.browser": "Shift Browser",
-        "com.duckduckgo.mobile.ios": "DuckDuckGo"
-    }
-
-    with PREFERENCES.open("rb") as config_file:
-        configuration = plistlib.load(config_file)
 
-    default_browser = "No browser is set to default."
-    for handler in configuration["LSHandlers"]:
-        if handler.get("LSHandlerURLScheme") == "https":
-            role = handler["LSHandlerRoleAll"]
-            if role not in SUPPORTED_BROWSERS:
-                default_browser = "Default browser is not supported."
-                continue
-            default_browser = SUPPORTED_BROWSERS[role]
-            for name, bundle_id, version_string in (browser_record for browser_record in POSSIBLE_BROWSERS
-                                                    if browser_record[1].lower() == role):
-                # configuration plist is not updated when a default browser is deleted from system
-                # default browser should be checked if it is really installed
-                if not do_i_have_installed(name):
-                    default_browser = "No browser is set to default."
-    return default_browser
+# get default browser
+# the https handler of LaunchServices is confirmed with bundles found before, spotlight is asked otherwise
+def what_is_the_default_browser() -> Optional[str]:
+    role = _get_url_handlers().get("https")
+    if role is None:
+        return "No browser is set to default."
+    if role not in SUPPORTED_BROWSERS:
+        return "Default browser is not supported."
+    browser_record = POSSIBLE_BROWSER_IDS.get(role)
+    # configuration plist is not updated when a default browser is deleted from system
+    # default browser should be checked if it is really installed
+    if browser_record is not None and not _is_installed(*browser_record):
+        return "No browser is set to default."
+    return SUPPORTED_BROWSERS[role]
 
 
 # check if the given browser is installed
+# an application bundle with an executable name is enough, the cached Info.plist is not parsed again
 def do_i_have_installed(name):
     for browser, bundle_id, version_string in (browser_record for browser_record in POSSIBLE_BROWSERS
                                                if browser_record[0] == name):
-        paths = subprocess.getoutput(f'mdfind "kMDItemCFBundleIdentifier == {bundle_id}"').splitlines()
-        for path in paths:
-            with open(os.path.join(path, "Contents/Info.plist"), "rb") as f:
-                plist = plistlib.load(f)
-                executable_name = plist.get("CFBundleExecutable")
-                if executable_name:
-                    return True
+        for path in _find_bundles([bundle_id]).get(bundle_id, ()):
+            try:
+                executable_name = _read_info_plist(path).get("CFBundleExecutable")
+            except (OSError, ValueError):
+                continue
+            if executable_name:
+                return True
     return False
 
 
@@ -131,20 +180,8 @@ def do_i_have_installed(name):
 def get_details_of(name) -> Optional[Browser]:
     for browser, bundle_id, version_string in (browser_record for browser_record in POSSIBLE_BROWSERS
                                                if browser_record[0] == name):
-        paths = subprocess.getoutput(f'mdfind "kMDItemCFBundleIdentifier == {bundle_id}"').splitlines()
-        for path in paths:
-            with open(os.path.join(path, "Contents/Info.plist"), "rb") as f:
-                plist = plistlib.load(f)
-                executable_name = plist.get("CFBundleExecutable")
-                executable = os.path.join(path, "Contents/MacOS", executable_name)
-                description = plist.get("CFBundleDisplayName") or plist.get("CFBundleName", browser)
-                version = plist[version_string]
-                yield Browser(
-                    name=browser,
-                    description=description,
-                    version=version,
-                    location=executable if browser != "safari" else path
-                )
+        for path in _find_bundles([bundle_id]).get(bundle_id, ()):
+            yield _create_browser(browser, path, version_string)
     yield "Browser is not installed."
 
 
@@ -152,12 +189,285 @@ def get_details_of(name) -> Optional[Browser]:
 def get_version_of(name) -> Optional[Version]:
     for browser, bundle_id, version_string in (browser_record for browser_record in POSSIBLE_BROWSERS
                                                if browser_record[0] == name):
-        paths = subprocess.getoutput(f'mdfind "kMDItemCFBundleIdentifier == {bundle_id}"').splitlines()
-        for path in paths:
-            with open(os.path.join(path, "Contents/Info.plist"), "rb") as f:
-                plist = plistlib.load(f)
-                version = plist[version_string]
-                yield Version(
-                    version=version
-                )
+        for path in _find_bundles([bundle_id]).get(bundle_id, ()):
+            plist = _read_info_plist(path)
+            version = plist[version_string]
+            yield Version(
+                version=version
+            )
     yield "Browser is not installed."
+
+
+# clear cached Info.plist files, url handlers, found bundles and scans, they are read again on the next query
+def clear_cache() -> None:
+    global _url_handlers
+    _info_plists.clear()
+    _url_handlers = ((), {})
+    _bundles.clear()
+    _scans.clear()
+
+
+# sources of browsers kept in the persistent cache: application directories and their subdirectories
+# with their modification times, installing a bundle into any of them modifies it
+def _get_cache_sources() -> list[tuple[str, Optional[int]]]:
+    sources = []
+    for application_dir in APPLICATION_DIRS:
+        application_dir = os.path.expanduser(application_dir)
+        sources.append((application_dir, _get_mtime(application_dir)))
+        sources.extend((entry.path, _get_mtime(entry.path)) for entry in _scan_directory(application_dir)
+                       if not entry.name.endswith(".app") and entry.is_dir())
+    return sorted(sources)
+
+
+# fingerprint of a browser kept in the persistent cache: its Info.plist, which is replaced with every update,
+# and the directory holding its bundle, which spotlight may have found outside of the application directories
+def _get_cache_fingerprint(browser: Browser) -> Optional[tuple]:
+    location = browser["location"]
+    bundle = location if location.endswith(".app") else location.split("/Contents/", 1)[0]
+    try:
+        stat = os.stat(os.path.join(bundle, "Contents/Info.plist"))
+    except OSError:
+        return None
+    bundle_dir = os.path.dirname(bundle)
+    return bundle, stat.st_ino, stat.st_size, stat.st_mtime_ns, bundle_dir, _get_mtime(bundle_dir)
+
+
+# get details of a browser without blocking the event loop
+async def async_get_details_of(name) -> Browser | str:
+    for browser, bundle_id, version_string in (browser_record for browser_record in POSSIBLE_BROWSERS
+                                               if browser_record[0] == name):
+        for path in (await _async_find_bundles([bundle_id])).get(bundle_id, ()):
+            return _create_browser(browser, path, version_string)
+    return "Browser is not installed."
+
+
+# retrieve browser version without blocking the event loop
+async def async_get_version_of(name) -> Version | str:
+    details = await async_get_details_of(name)
+    if isinstance(details, str):
+        return details
+    return Version(version=details["version"])
+
+
+# create browser details from application bundle, version is left empty without version string
+def _create_browser(browser: str, path: str, version_string: Optional[str]) -> Browser:
+    plist = _read_info_plist(path)
+    executable_name = plist.get("CFBundleExecutable")
+    executable = os.path.join(path, "Contents/MacOS", executable_name)
+    description = plist.get("CFBundleDisplayName") or plist.get("CFBundleName", browser)
+    version = plist[version_string] if version_string else ""
+    return Browser(
+        name=browser,
+        description=description,
+        version=version,
+        location=executable if browser != "safari" else path
+    )
+
+
+# find application bundles of the given bundle identifiers
+# spotlight is asked with a single query, the application directories are scanned when it finds nothing,
+# e.g. while indexing is disabled or rebuilt, scans are kept until an application directory is modified
+def _find_bundles(bundle_ids: list[str], root: Optional[str] = None) -> dict[str, list[str]]:
+    if not bundle_ids:
+        return {}
+    if root is None and USE_SPOTLIGHT:
+        bundles = _search_spotlight(bundle_ids)
+        if bundles:
+            _bundles.update(bundles)
+            return bundles
+    bundles = _scan_bundles(bundle_ids, root)
+    if root is None:
+        _bundles.update(bundles)
+    return bundles
+
+
+# find application bundles of the given bundle identifiers without blocking the event loop
+async def _async_find_bundles(bundle_ids: list[str], root: Optional[str] = None) -> dict[str, list[str]]:
+    if not bundle_ids:
+        return {}
+    import asyncio
+    if root is None and USE_SPOTLIGHT:
+        bundles = await _async_search_spotlight(bundle_ids)
+        if bundles:
+            _bundles.update(bundles)
+            return bundles
+    bundles = await asyncio.to_thread(_scan_bundles, bundle_ids, root)
+    if root is None:
+        _bundles.update(bundles)
+    return bundles
+
+
+# ask spotlight for application bundles of the given bundle identifiers with a single query
+# None if spotlight is missing, fails or does not answer in time
+def _search_spotlight(bundle_ids: list[str]) -> Optional[dict[str, list[str]]]:
+    import subprocess
+    try:
+        process = subprocess.run(["mdfind", _create_query(bundle_ids)], stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, text=True, timeout=SPOTLIGHT_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if process.returncode != 0:
+        return None
+    return _match_spotlight_bundles(bundle_ids, process.stdout.splitlines())
+
+
+# ask spotlight for application bundles of the given bundle identifiers without blocking the event loop
+async def _async_search_spotlight(bundle_ids: list[str]) -> Optional[dict[str, list[str]]]:
+    import asyncio
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "mdfind", _create_query(bundle_ids),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), SPOTLIGHT_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+    if process.returncode != 0:
+        return None
+    return _match_spotlight_bundles(bundle_ids, output.decode().splitlines())
+
+
+# create spotlight query of applications having any of the bundle identifiers, wildcards are left to spotlight
+def _create_query(bundle_ids: list[str]) -> str:
+    return " || ".join(f'{BUNDLE_ID_ATTRIBUTE} == "{bundle_id}"' for bundle_id in bundle_ids)
+
+
+# map application bundles found by spotlight back to the bundle identifiers they were searched for
+# every bundle found belongs to the bundle identifier if a single one was searched for
+def _match_spotlight_bundles(bundle_ids: list[str], paths: list[str]) -> dict[str, list[str]]:
+    if len(bundle_ids) == 1:
+        return {bundle_ids[0]: paths} if paths else {}
+    return _match_bundles(bundle_ids, paths)
+
+
+# scan the application directories for application bundles of the given bundle identifiers
+# application directories are looked up under root, for example a mounted volume
+# the scan is kept until any of the scanned directories is modified, as installing or removing a bundle does
+def _scan_bundles(bundle_ids: list[str], root: Optional[str] = None) -> dict[str, list[str]]:
+    application_dirs = tuple(os.path.expanduser(application_dir) for application_dir in APPLICATION_DIRS)
+    if root is not None:
+        application_dirs = tuple(os.path.join(root, application_dir.lstrip(os.sep))
+                                 for application_dir in application_dirs)
+    fingerprint, identified = _scans.get(application_dirs, ((), []))
+    if not fingerprint or any(_get_mtime(directory) != mtime for directory, mtime in fingerprint):
+        fingerprint, paths = [], []
+        for application_dir in application_dirs:
+            fingerprint.append((application_dir, _get_mtime(application_dir)))
+            for entry in _scan_directory(application_dir):
+                if entry.name.endswith(".app"):
+                    paths.append(entry.path)
+                elif entry.is_dir():
+                    fingerprint.append((entry.path, _get_mtime(entry.path)))
+                    paths.extend(bundle.path for bundle in _scan_directory(entry.path)
+                                 if bundle.name.endswith(".app"))
+        fingerprint = tuple(fingerprint)
+        identified = _identify_bundles(sorted(paths))
+        _scans[application_dirs] = (fingerprint, identified)
+    return _match_identified_bundles(bundle_ids, identified)
+
+
+# modification time of a directory, None if it is missing
+def _get_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+# list entries of a directory, a missing or unreadable directory has none
+def _scan_directory(path: str) -> list[os.DirEntry]:
+    try:
+        with os.scandir(path) as entries:
+            return list(entries)
+    except OSError:
+        return []
+
+
+# map application bundles back to the bundle identifiers they were searched for
+def _match_bundles(bundle_ids: list[str], paths: list[str]) -> dict[str, list[str]]:
+    return _match_identified_bundles(bundle_ids, _identify_bundles(paths))
+
+
+# read bundle identifiers of application bundles from their Info.plist, unreadable bundles are left out
+def _identify_bundles(paths: list[str]) -> list[tuple[str, str]]:
+    identified = []
+    for path in paths:
+        try:
+            identified.append((path, _read_info_plist(path).get("CFBundleIdentifier", "")))
+        except (OSError, ValueError):
+            continue
+    return identified
+
+
+# map application bundles with their bundle identifiers to the bundle identifiers they were searched for
+def _match_identified_bundles(bundle_ids: list[str], identified: list[tuple[str, str]]) -> dict[str, list[str]]:
+    import fnmatch
+    exact_ids = {bundle_id: bundle_id for bundle_id in bundle_ids if "*" not in bundle_id}
+    patterns = [bundle_id for bundle_id in bundle_ids if "*" in bundle_id]
+    bundles = {}
+    for path, identifier in identified:
+        bundle_id = exact_ids.get(identifier) or next(
+            (pattern for pattern in patterns if fnmatch.fnmatchcase(identifier, pattern)), None
+        )
+        if bundle_id is not None:
+            bundles.setdefault(bundle_id, []).append(path)
+    return bundles
+
+
+# check if a browser is installed, bundles found before are checked first
+def _is_installed(name: str, bundle_id: str) -> bool:
+    for path in _bundles.get(bundle_id, ()):
+        try:
+            if _read_info_plist(path).get("CFBundleExecutable"):
+                return True
+        except (OSError, ValueError):
+            continue
+    return do_i_have_installed(name)
+
+
+# read url handlers of LaunchServices by scheme, the preferences are read again only after they are modified
+def _get_url_handlers() -> dict[str, str]:
+    global _url_handlers
+    preferences = Path.home() / LAUNCH_SERVICES_PREFERENCES
+    try:
+        stat = preferences.stat()
+        fingerprint = (str(preferences), stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        fingerprint = None
+    if fingerprint is not None and _url_handlers[0] == fingerprint:
+        return _url_handlers[1]
+
+    import plistlib
+    with preferences.open("rb") as config_file:
+        configuration = plistlib.load(config_file)
+    handlers = {}
+    for handler in configuration.get("LSHandlers", ()):
+        if "LSHandlerURLScheme" in handler and "LSHandlerRoleAll" in handler:
+            handlers[handler["LSHandlerURLScheme"]] = handler["LSHandlerRoleAll"]
+    if fingerprint is not None:
+        _url_handlers = (fingerprint, handlers)
+    return handlers
+
+
+# read used keys of Info.plist of an application bundle
+# the keys are cached until the file is modified, a file which cannot be checked for modification is not cached
+def _read_info_plist(path: str) -> dict:
+    import plistlib
+    plist_path = os.path.join(path, "Contents/Info.plist")
+    try:
+        stat = os.stat(plist_path)
+        key = (plist_path, stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        key = None
+    plist = _info_plists.get(key) if key is not None else None
+    if plist is None:
+        with open(plist_path, "rb") as f:
+            plist = {name: value for name, value in plistlib.load(f).items() if name in INFO_PLIST_KEYS}
+        if key is not None:
+            _info_plists.put(key, plist)
+    return plist
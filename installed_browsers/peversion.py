@@ -0,0 +1,138 @@
+import os
+from typing import Optional
+
+from .common import LRUCache
+
+# mmap and struct are imported where they are needed
+# so that importing the package does not pay for them
+
+# offset of the PE header offset in the DOS header
+PE_HEADER_OFFSET = 0x3C
+
+# signature of the PE header
+PE_SIGNATURE = b"PE\0\0"
+
+# magic numbers of the optional header and the offset of their data directories
+OPTIONAL_HEADER_DATA_DIRECTORIES = {
+    0x10B: 96,     # PE32
+    0x20B: 112,    # PE32+
+}
+
+# index of the resource table among the data directories
+RESOURCE_DIRECTORY_INDEX = 2
+
+# resource type of version information
+RT_VERSION = 16
+
+# signature of VS_FIXEDFILEINFO
+FIXED_FILE_INFO_SIGNATURE = b"\xbd\x04\xef\xfe"
+
+# maximum number of file versions kept in memory
+VERSION_CACHE_SIZE = 64
+
+# file versions by path, size and modification time, an empty version if the file has no version resource
+_file_versions = LRUCache(VERSION_CACHE_SIZE)
+
+
+# read file version of a windows executable from its version resource, for example 124.0.6367.60
+# the executable is memory-mapped, versions are cached as long as the file is not modified
+def get_file_version(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            key = (path, stat.st_size, stat.st_mtime_ns)
+            version = _file_versions.get(key)
+            if version is None:
+                version = _read_file_version(file) or ""
+                _file_versions.put(key, version)
+    except OSError:
+        return None
+    return version or None
+
+
+# clear cached file versions
+def clear_cache() -> None:
+    _file_versions.clear()
+
+
+# read VS_FIXEDFILEINFO file version of a memory-mapped executable, None if it has none
+def _read_file_version(file) -> Optional[str]:
+    import mmap
+    import struct
+    try:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            version_info = _find_version_resource(mapped)
+            if version_info is None:
+                return None
+            offset, length = version_info
+            signature = mapped.find(FIXED_FILE_INFO_SIGNATURE, offset, offset + length)
+            if signature < 0:
+                return None
+            # dwSignature, dwStrucVersion, dwFileVersionMS, dwFileVersionLS
+            ms, ls = struct.unpack_from("<II", mapped, signature + 8)
+    except (ValueError, struct.error):
+        return None
+    return ".".join(map(str, (ms >> 16, ms & 0xFFFF, ls >> 16, ls & 0xFFFF)))
+
+
+# find file offset and length of the version resource: type RT_VERSION, first name, first language
+def _find_version_resource(mapped) -> Optional[tuple[int, int]]:
+    import struct
+    if mapped[:2] != b"MZ":
+        return None
+    pe_header, = struct.unpack_from("<I", mapped, PE_HEADER_OFFSET)
+    if mapped[pe_header:pe_header + 4] != PE_SIGNATURE:
+        return None
+    section_count, = struct.unpack_from("<H", mapped, pe_header + 6)
+    optional_header_size, = struct.unpack_from("<H", mapped, pe_header + 20)
+    optional_header = pe_header + 24
+    magic, = struct.unpack_from("<H", mapped, optional_header)
+    if magic not in OPTIONAL_HEADER_DATA_DIRECTORIES:
+        return None
+    data_directories = optional_header + OPTIONAL_HEADER_DATA_DIRECTORIES[magic]
+    directory_count, = struct.unpack_from("<I", mapped, data_directories - 4)
+    if directory_count <= RESOURCE_DIRECTORY_INDEX:
+        return None
+    resource_rva, resource_size = struct.unpack_from("<II", mapped, data_directories + RESOURCE_DIRECTORY_INDEX * 8)
+    if not resource_rva:
+        return None
+
+    # virtual address, virtual size and file offset of every section
+    sections = []
+    for index in range(section_count):
+        virtual_size, virtual_address, raw_size, raw_offset = struct.unpack_from(
+            "<IIII", mapped, optional_header + optional_header_size + index * 40 + 8
+        )
+        sections.append((virtual_address, max(virtual_size, raw_size), raw_offset))
+
+    def to_offset(rva: int) -> Optional[int]:
+        for virtual_address, virtual_size, raw_offset in sections:
+            if virtual_address <= rva < virtual_address + virtual_size:
+                return rva - virtual_address + raw_offset
+        return None
+
+    resources = to_offset(resource_rva)
+    if resources is None:
+        return None
+    entry = _find_resource_entry(mapped, resources, RT_VERSION)
+    for _ in range(2):
+        # name and language levels, the first entry is taken
+        if entry is None or not entry & 0x80000000:
+            return None
+        entry = _find_resource_entry(mapped, resources + (entry & 0x7FFFFFFF), None)
+    if entry is None or entry & 0x80000000:
+        return None
+    data_rva, data_size = struct.unpack_from("<II", mapped, resources + entry)
+    data_offset = to_offset(data_rva)
+    return None if data_offset is None else (data_offset, data_size)
+
+
+# find entry of a resource directory by its id, the first entry without id
+def _find_resource_entry(mapped, directory: int, resource_id: Optional[int]) -> Optional[int]:
+    import struct
+    named_count, id_count = struct.unpack_from("<HH", mapped, directory + 12)
+    for index in range(named_count + id_count):
+        name, offset = struct.unpack_from("<II", mapped, directory + 16 + index * 8)
+        if resource_id is None or name == resource_id:
+            return offset
+    return None
@@ -1,9 +1,11 @@
+import ntpath
 import os
 import pathlib
 import platform
-from typing import Iterator, Optional
+import time
+from typing import Callable, Iterable, Iterator, Optional
 
-from .common import Browser, OS, Version
+from .common import Browser, OS, Version, create_filter
 
 try:
     # noinspection PyUnresolvedReferences
@@ -11,11 +13,7 @@ try:
 except ImportError:     # pragma: no cover
     import_error = "Operating system is not Windows, winreg is not imported."
 
-try:
-    # noinspection PyUnresolvedReferences
-    import win32api
-except ImportError:     # pragma: no cover
-    import_error = "Operating system is not Windows, win32api is not imported."
+# peversion and win32api are imported where they are needed so that importing the package does not pay for them
 
 # dictionary of possible browsers
 POSSIBLE_BROWSERS = {
@@ -80,14 +78,70 @@ DUCKDUCKGO = "duckduckgo"
 DUCK_INSTALL = "AppX"
 DESKTOP_BROWSER = "DesktopBrowser"
 
+# registered browsers of a hive
+START_MENU_INTERNET = r"Software\Clients\StartMenuInternet"
+
+# AppX packages of the current user and the package family of the duckduckgo desktop browser
+APPX_PACKAGES = (r"Software\Classes\Local Settings\Software\Microsoft\Windows\CurrentVersion"
+                 r"\AppModel\Repository\Packages")
+DUCKDUCKGO_PACKAGE = f"DuckDuckGo.{DESKTOP_BROWSER}_"
+
+# registry keys of installed applications and of the updaters of chrome, edge and brave
+UNINSTALL = r"Software\Microsoft\Windows\CurrentVersion\Uninstall"
+GOOGLE_CLIENTS = r"Software\Google\Update\Clients"
+EDGE_CLIENTS = r"Software\Microsoft\EdgeUpdate\Clients"
+BRAVE_CLIENTS = r"Software\BraveSoftware\Update\Clients"
+
+# registry keys and values browsers keep their version in, checked in order before the executable is read
+# BLBeacon is written by the browser itself, Clients by its updater and Uninstall by its installer
+REGISTRY_VERSIONS = {
+    "chrome": ((r"Software\Google\Chrome\BLBeacon", "version"),
+               (rf"{GOOGLE_CLIENTS}\{{8A69D345-D564-463c-AFF1-A69D9E530F96}}", "pv"),
+               (rf"{UNINSTALL}\Google Chrome", "DisplayVersion")),
+    "chrome-canary": ((r"Software\Google\Chrome SxS\BLBeacon", "version"),
+                      (rf"{GOOGLE_CLIENTS}\{{4EA16AC7-FD5A-47C3-875B-DBF4A2008C20}}", "pv"),
+                      (rf"{UNINSTALL}\Google Chrome SxS", "DisplayVersion")),
+    "chromium": ((r"Software\Chromium\BLBeacon", "version"),
+                 (rf"{UNINSTALL}\Chromium", "DisplayVersion")),
+    "msedge": ((r"Software\Microsoft\Edge\BLBeacon", "version"),
+               (rf"{EDGE_CLIENTS}\{{56EB18F8-B008-4CBD-B6D2-8C97FE7E9062}}", "pv"),
+               (rf"{UNINSTALL}\Microsoft Edge", "DisplayVersion")),
+    "msedge-beta": ((r"Software\Microsoft\Edge Beta\BLBeacon", "version"),
+                    (rf"{EDGE_CLIENTS}\{{2CD8A007-E189-409D-A2C8-9AF4EF3C72AA}}", "pv"),
+                    (rf"{UNINSTALL}\Microsoft Edge Beta", "DisplayVersion")),
+    "msedge-dev": ((r"Software\Microsoft\Edge Dev\BLBeacon", "version"),
+                   (rf"{EDGE_CLIENTS}\{{0D50BFEC-CD6A-4F9A-964C-C7416E3ACB10}}", "pv"),
+                   (rf"{UNINSTALL}\Microsoft Edge Dev", "DisplayVersion")),
+    "msedge-canary": ((r"Software\Microsoft\Edge SxS\BLBeacon", "version"),
+                      (rf"{EDGE_CLIENTS}\{{65C35B14-6C1D-4122-AC46-7148CC9D6497}}", "pv")),
+    "brave": ((r"Software\BraveSoftware\Brave-Browser\BLBeacon", "version"),
+              (rf"{BRAVE_CLIENTS}\{{AFE6A462-C574-4B8A-AF43-4CC60DF4563B}}", "pv"),
+              (rf"{UNINSTALL}\BraveSoftware Brave-Browser", "DisplayVersion")),
+    "brave-beta": ((r"Software\BraveSoftware\Brave-Browser-Beta\BLBeacon", "version"),
+                   (rf"{UNINSTALL}\BraveSoftware Brave-Browser-Beta", "DisplayVersion")),
+    "brave-nightly": ((r"Software\BraveSoftware\Brave-Browser-Nightly\BLBeacon", "version"),
+                      (rf"{UNINSTALL}\BraveSoftware Brave-Browser-Nightly", "DisplayVersion")),
+}
+
+# seconds the registry snapshot answers queries before the registry is read again
+SNAPSHOT_TTL = 60.0
+
+# registry view of the local machine hive, determined on first use
+_registry_view: Optional[int] = None
+
+# registered browsers by description, the time they were read and the versions of their executables by location
+_snapshot: tuple[float, Optional[dict[str, list[Browser]]], dict[str, str]] = (0.0, None, {})
+
+# duckduckgo browsers without versions and the time they were searched for
+_duckduckgo: tuple[float, Optional[list[Browser]]] = (0.0, None)
+
 
 # get all installed browsers
-def browsers() -> Iterator[Browser]:
-    match platform.architecture()[0]:
-        case OS.WIN32:    # pragma: no cover
-            yield from _get_unique_browsers(winreg.KEY_WOW64_32KEY)
-        case OS.WIN64:
-            yield from _get_unique_browsers(winreg.KEY_WOW64_64KEY)
+# names and channels are filtered before any executable is read for its version
+def browsers(names: Optional[Iterable[str]] = None, channels: Optional[Iterable[str]] = None,
+             with_versions: bool = True) -> Iterator[Browser]:
+    is_requested = create_filter(names, channels)
+    yield from _get_unique_browsers(_get_registry_view(), is_requested, with_versions)
 
 
 # get default browser
@@ -115,72 +169,97 @@ def what_is_the_default_browser() -> Optional[str]:
 
 # check if the given browser is installed
 def do_i_have_installed(name):
-    for browser in (browser_record for browser_record in POSSIBLE_BROWSER_NAMES
-                    if name == browser_record):
-        browser_name = POSSIBLE_BROWSER_NAMES[browser]
-
-        if name == DUCKDUCKGO:
-            return _get_duckduckgo_from_registry()
-
-        match platform.architecture()[0]:
-            case OS.WIN32:  # pragma: no cover
-                is_browser_installed = _get_browser_from_registry(
-                    winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | winreg.KEY_WOW64_32KEY, browser_name)
-            case OS.WIN64:
-                is_browser_installed = _get_browser_from_registry(
-                    winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | winreg.KEY_WOW64_64KEY, browser_name)
-        if not is_browser_installed:
-            is_browser_installed = _get_browser_from_registry(
-                winreg.HKEY_CURRENT_USER, winreg.KEY_READ, browser_name)
-        return is_browser_installed
-    return False
+    return POSSIBLE_BROWSER_NAMES.get(name) in _get_snapshot()
 
 
 # get details of a browser
 def get_details_of(name) -> Optional[Browser | str]:
-    for browser in (browser_record for browser_record in POSSIBLE_BROWSER_NAMES
-                    if name == browser_record):
-        browser_name = POSSIBLE_BROWSER_NAMES[browser]
-
-        if name == DUCKDUCKGO:
-            yield _get_duckduckgo_details_from_registry()
-            # return
-
-        yield _get_browser_details_from_registry(winreg.HKEY_CURRENT_USER, winreg.KEY_READ, browser_name)
-        match platform.architecture()[0]:   # pragma: no cover
-            case OS.WIN32:
-                yield _get_browser_details_from_registry(
-                    winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | winreg.KEY_WOW64_32KEY, browser_name)
-            case OS.WIN64:
-                yield _get_browser_details_from_registry(
-                    winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | winreg.KEY_WOW64_64KEY, browser_name)
+    registered = _get_snapshot().get(POSSIBLE_BROWSER_NAMES.get(name), ())
+    yield (Browser(**{**browser, "version": _get_snapshot_version(browser)}) for browser in registered)
     return "Browser is not installed."
 
 
 # retrieve browser version
 def get_version_of(name) -> Optional[Version | str]:
-    for browser in (browser_record for browser_record in POSSIBLE_BROWSER_NAMES
-                    if name == browser_record):
-        browser_name = POSSIBLE_BROWSER_NAMES[browser]
+    registered = _get_snapshot().get(POSSIBLE_BROWSER_NAMES.get(name), ())
+    yield (Version(version=_get_snapshot_version(browser)) for browser in registered)
+    return "Browser is not installed."
 
-        if name == DUCKDUCKGO:
-            yield _get_duckduckgo_version_from_registry()
 
-        yield _get_browser_version_from_registry(winreg.HKEY_CURRENT_USER, winreg.KEY_READ, browser_name)
+# clear the registry snapshot and cached file versions, the registry is read again on the next query
+def clear_cache() -> None:
+    global _snapshot, _registry_view, _duckduckgo
+    _snapshot = (0.0, None, {})
+    _registry_view = None
+    _duckduckgo = (0.0, None)
+    from . import peversion
+    peversion.clear_cache()
+
+
+# sources of browsers kept in the persistent cache: last write times of the registry keys browsers are registered in
+def _get_cache_sources() -> list[tuple[int, str, Optional[int]]]:
+    sources = []
+    for tree, access, registry_path in ((winreg.HKEY_CURRENT_USER, winreg.KEY_READ, START_MENU_INTERNET),
+                                        (winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | _get_registry_view(),
+                                         START_MENU_INTERNET),
+                                        (winreg.HKEY_CURRENT_USER, winreg.KEY_READ, APPX_PACKAGES)):
+        try:
+            with winreg.OpenKey(tree, registry_path, access=access) as key:
+                sources.append((tree, registry_path, winreg.QueryInfoKey(key)[2]))
+        except OSError:
+            sources.append((tree, registry_path, None))
+    return sources
+
+
+# fingerprint of a browser kept in the persistent cache: its executable
+def _get_cache_fingerprint(browser: Browser) -> Optional[tuple]:
+    try:
+        stat = os.stat(browser["location"])
+    except OSError:
+        return None
+    return browser["location"], stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+# determine registry view of the local machine hive, platform.architecture is evaluated once only
+def _get_registry_view() -> int:
+    global _registry_view
+    if _registry_view is None:
         match platform.architecture()[0]:
             case OS.WIN32:  # pragma: no cover
-                yield _get_browser_version_from_registry(
-                    winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | winreg.KEY_WOW64_32KEY, browser_name)
-            case OS.WIN64:
-                yield _get_browser_version_from_registry(
-                    winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | winreg.KEY_WOW64_64KEY, browser_name)
-    return "Browser is not installed."
+                _registry_view = winreg.KEY_WOW64_32KEY
+            case _:
+                _registry_view = winreg.KEY_WOW64_64KEY
+    return _registry_view
+
+
+# index browsers registered in both hives by description
+# the index answers every query until it is SNAPSHOT_TTL seconds old or the cache is cleared
+def _get_snapshot() -> dict[str, list[Browser]]:
+    global _snapshot
+    taken, index, versions = _snapshot
+    if index is not None and time.monotonic() - taken < SNAPSHOT_TTL:
+        return index
+    index = {}
+    for browser in _get_unique_browsers(_get_registry_view(), with_versions=False):
+        index.setdefault(browser["description"], []).append(browser)
+    _snapshot = (time.monotonic(), index, {})
+    return index
+
+
+# determine version of a browser of the snapshot, the version of every executable is determined once per snapshot
+def _get_snapshot_version(browser: Browser) -> str:
+    versions = _snapshot[2]
+    key = _normalize_location(browser["location"])
+    if key not in versions:
+        versions[key] = _get_browser_version(browser)
+    return versions[key]
 
 
 # get browsers from registry
-def _get_browsers_from_registry(tree: int, access: int) -> Iterator[Browser]:
+def _get_browsers_from_registry(tree: int, access: int, is_requested: Callable[[str], bool] = create_filter(),
+                                with_versions: bool = True) -> Iterator[Browser]:
     try:
-        with winreg.OpenKey(tree, r"Software\Clients\StartMenuInternet", access=access) as hkey:
+        with winreg.OpenKey(tree, START_MENU_INTERNET, access=access) as hkey:
             i = 0
             while True:
                 try:
@@ -194,6 +273,9 @@ def _get_browsers_from_registry(tree: int, access: int) -> Iterator[Browser]:
                         description = subkey
                 except OSError:  # pragma: no cover
                     description = subkey
+                name = POSSIBLE_BROWSERS.get(description, "unknown")
+                if not is_requested(name):
+                    continue
                 try:
                     cmd = winreg.QueryValue(hkey, rf"{subkey}\shell\open\command")
                     cmd = cmd.strip('"')
@@ -201,108 +283,54 @@ def _get_browsers_from_registry(tree: int, access: int) -> Iterator[Browser]:
                 except (OSError, AttributeError, TypeError, ValueError):  # pragma: no cover
                     continue
                 yield Browser(
-                    name=POSSIBLE_BROWSERS.get(description, "unknown"),
+                    name=name,
                     description=description,
-                    version=_create_browser_version(cmd),
+                    version=_create_browser_version(cmd) if with_versions else "",
                     location=cmd
                 )
     except FileNotFoundError:  # pragma: no cover
         pass
 
 
-# get a single browser from registry
-def _get_browser_from_registry(tree: int, access: int, name: str):
-    try:
-        with winreg.OpenKey(tree, r"Software\Clients\StartMenuInternet", access=access) as hkey:
-            browser_found = False
-            i = 0
-            while True:
-                try:
-                    subkey = winreg.EnumKey(hkey, i)
-                    i += 1
-                except OSError:  # pragma: no cover
-                    break
-                try:
-                    description = winreg.QueryValue(hkey, subkey)
-                    if not description or not isinstance(description, str):  # pragma: no cover
-                        description = subkey
-                except OSError:  # pragma: no cover
-                    description = subkey
-                if description == name:
-                    browser_found = True
-                    break
-            return browser_found
-    except FileNotFoundError:   # pragma: no cover
-        pass
-
-
-# get browser details from registry
-def _get_browser_details_from_registry(tree: int, access: int, name: str) -> Optional[Browser | str]:
-    try:
-        with winreg.OpenKey(tree, r"Software\Clients\StartMenuInternet", access=access) as hkey:
-            i = 0
-            while True:
-                try:
-                    subkey = winreg.EnumKey(hkey, i)
-                    i += 1
-                except OSError:  # pragma: no cover
-                    break
-                try:
-                    description = winreg.QueryValue(hkey, subkey)
-                    if not description or not isinstance(description, str):  # pragma: no cover
-                        description = subkey
-                except OSError:  # pragma: no cover
-                    description = subkey
-                if description == name:
-                    try:
-                        cmd = winreg.QueryValue(hkey, rf"{subkey}\shell\open\command")
-                        cmd = cmd.strip('"')
-                        os.stat(cmd)
-                    except (OSError, AttributeError, TypeError, ValueError):  # pragma: no cover
-                        continue
-                    yield Browser(
-                        name=POSSIBLE_BROWSERS.get(description, "unknown"),
-                        description=description,
-                        version=_create_browser_version(cmd),
-                        location=cmd
-                    )
-    except FileNotFoundError:   # pragma: no cover
-        pass
-
-
-# get browser version from registry
-def _get_browser_version_from_registry(tree: int, access: int, name: str) -> Optional[Version | str]:
-    try:
-        with winreg.OpenKey(tree, r"Software\Clients\StartMenuInternet", access=access) as hkey:
-            i = 0
-            while True:
-                try:
-                    subkey = winreg.EnumKey(hkey, i)
-                    i += 1
-                except OSError:     # pragma: no cover
-                    break
-                try:
-                    description = winreg.QueryValue(hkey, subkey)
-                    if not description or not isinstance(description, str):  # pragma: no cover
-                        description = subkey
-                except OSError:  # pragma: no cover
-                    description = subkey
-                if description == name:
-                    try:
-                        cmd = winreg.QueryValue(hkey, rf"{subkey}\shell\open\command")
-                        cmd = cmd.strip('"')
-                        os.stat(cmd)
-                    except (OSError, AttributeError, TypeError, ValueError):  # pragma: no cover
-                        continue
-                    yield Version(
-                        version=_create_browser_version(cmd),
-                    )
-    except FileNotFoundError:   # pragma: no cover
-        pass
+# determine browser version from the registry, the executable is only read when the registry does not know it
+def _get_browser_version(browser: Browser) -> str:
+    return _get_registry_version(browser) or _create_browser_version(browser["location"])
+
+
+# read browser version from the registry values of REGISTRY_VERSIONS
+# every key is looked up in the current user hive first, then in both views of the local machine hive
+# a version is only taken if the installation of the executable holds a directory of that version next to it,
+# a per-user and a system installation at different locations do not take each other's version
+def _get_registry_version(browser: Browser) -> Optional[str]:
+    installation_dir = os.path.dirname(browser["location"])
+    hives = [(winreg.HKEY_CURRENT_USER, winreg.KEY_READ),
+             (winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | _get_registry_view())]
+    if _get_registry_view() != winreg.KEY_WOW64_32KEY:
+        # updaters of chrome, edge and brave are 32 bit applications
+        hives.append((winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | winreg.KEY_WOW64_32KEY))
+    for registry_path, value_name in REGISTRY_VERSIONS.get(browser["name"], ()):
+        for tree, access in hives:
+            try:
+                with winreg.OpenKey(tree, registry_path, access=access) as key:
+                    version = winreg.QueryValueEx(key, value_name)[0]
+            except OSError:
+                continue
+            if not isinstance(version, str) or not version.replace(DOT, "").isdigit():
+                continue
+            if os.path.isdir(os.path.join(installation_dir, version)):
+                return version
+    return None
 
 
 # determine browser version
+# the version resource is read by peversion, win32api is only used when it cannot be read that way
 def _create_browser_version(path: str) -> str:
+    from . import peversion
+    version = peversion.get_file_version(path)
+    if version:
+        return version
+    # noinspection PyUnresolvedReferences
+    import win32api
     info = win32api.GetFileVersionInfo(path, "\\")
     ms = info["FileVersionMS"]
     ls = info["FileVersionLS"]
@@ -335,42 +363,45 @@ def _setup_firefox_versions(browser_id: str) -> str:
 
 
 # get only unique browsers
-def _get_unique_browsers(winreg_key) -> Iterator[Browser]:
-    # get browsers from local machine
-    browsers_local_machine = _get_browsers_from_registry(winreg.HKEY_LOCAL_MACHINE,
-                                                         winreg.KEY_READ | winreg_key)
-
-    # get browsers from current user
-    browsers_current_user = _get_browsers_from_registry(winreg.HKEY_CURRENT_USER, winreg.KEY_READ)
-
-    # get browsers available in both places
-    duplicates = []
-    for browser_current_user in browsers_current_user:  # pragma: no cover
-        yield browser_current_user
-
-        for browser_local_machine in _get_browsers_from_registry(winreg.HKEY_LOCAL_MACHINE,
-                                                                 winreg.KEY_READ | winreg_key):
-            if browser_current_user == browser_local_machine:
-                duplicates.append(browser_local_machine)
+# every hive is enumerated once, browsers of the current user win over the same ones of the local machine
+# the version of an executable is read once, even if several registry entries point to it
+def _get_unique_browsers(winreg_key, is_requested: Callable[[str], bool] = create_filter(),
+                         with_versions: bool = True) -> Iterator[Browser]:
+    found = set()
+    versions = {}
+    for tree, access in ((winreg.HKEY_CURRENT_USER, winreg.KEY_READ),
+                         (winreg.HKEY_LOCAL_MACHINE, winreg.KEY_READ | winreg_key)):
+        for browser in _get_browsers_from_registry(tree, access, is_requested, with_versions=False):
+            key = _get_browser_key(browser)
+            if key in found:
                 continue
-
-    # filter for unique browsers
-    for browser_local_machine in browsers_local_machine:    # pragma: no cover
-        for duplicate in duplicates:
-            if duplicate == browser_local_machine:
-                browser_local_machine.clear()
-                break
-            elif browser_local_machine not in duplicates:
-                yield browser_local_machine
-                break
+            found.add(key)
+            if with_versions:
+                description, location = key
+                if location not in versions:
+                    versions[location] = _get_browser_version(browser)
+                browser["version"] = versions[location]
+            yield browser
 
     # get duckduckgo and filter for unique occurrence
-    for duckduckgo in _search_for_duckduckgo():
-        if duckduckgo not in duplicates:
-            duplicates.append(duckduckgo)
+    if not is_requested(DUCKDUCKGO):
+        return
+    for duckduckgo in _search_for_duckduckgo(with_versions):
+        if _get_browser_key(duckduckgo) not in found:
+            found.add(_get_browser_key(duckduckgo))
             yield duckduckgo
 
 
+# key of a browser registered in several places, description and location are compared case-insensitively
+def _get_browser_key(browser: Browser) -> tuple[str, str]:
+    return browser["description"].casefold(), _normalize_location(browser["location"])
+
+
+# normalize location of an executable, paths are case-insensitive
+def _normalize_location(location: str) -> str:
+    return ntpath.normcase(ntpath.normpath(location))
+
+
 # search for duckduckgo browser
 def _search_for_default_duckduckgo(browser_id: str) -> str:
     registry_path = fr'Software\Classes\{browser_id}\Application'
@@ -379,145 +410,70 @@ def _search_for_default_duckduckgo(browser_id: str) -> str:
     return DEFAULT_BROWSER_DETAILS.get(default_browser.lower(), "unknown")
 
 
-def _search_for_duckduckgo() -> Iterator[Browser]:
-    try:
-        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes") as hkey:
-            i = 0
-            while True:
-                try:
-                    subkey = winreg.EnumKey(hkey, i)
-                    i += 1
-                except OSError:  # pragma: no cover
-                    break
-                try:
-                    description = winreg.QueryValue(hkey, subkey)
-                    if not description or not isinstance(description, str):  # pragma: no cover
-                        description = subkey
-                    if description.startswith(DUCK_INSTALL):
-                        registry_path = fr'Software\Classes\{description}\Application'
-                        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, registry_path) as key:
-                            browser = winreg.QueryValueEx(key, "AppUserModelID")[0]
-                            if DESKTOP_BROWSER in browser:
-                                description = winreg.QueryValueEx(key, "ApplicationName")[0]
-                                try:
-                                    cmd = winreg.QueryValue(hkey, rf"{subkey}\shell\open\command")
-                                    cmd = cmd.strip('"')
-                                    os.stat(cmd)
-                                except (OSError, AttributeError, TypeError, ValueError):  # pragma: no cover
-                                    continue
-                                yield Browser(
-                                    name=POSSIBLE_BROWSERS.get(description, "unknown"),
-                                    description=description,
-                                    version=_create_browser_version(cmd),
-                                    location=cmd
-                                )
-                except OSError:  # pragma: no cover
-                    description = subkey
-    except FileNotFoundError:  # pragma: no cover
-         pass
-
-
-# get duckduckgo from registry
-def _get_duckduckgo_from_registry():
-    try:
-        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes") as hkey:
-            browser_found = False
-            i = 0
-            while True:
-                try:
-                    subkey = winreg.EnumKey(hkey, i)
-                    i += 1
-                except OSError:  # pragma: no cover
-                    break
-                try:
-                    description = winreg.QueryValue(hkey, subkey)
-                    if not description or not isinstance(description, str):  # pragma: no cover
-                        description = subkey
-                    if description.startswith(DUCK_INSTALL):
-                        registry_path = fr'Software\Classes\{description}\Application'
-                        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, registry_path) as key:
-                            browser = winreg.QueryValueEx(key, "AppUserModelID")[0]
-                            if DESKTOP_BROWSER in browser:
-                                browser_found = True
-                                break
-                except FileNotFoundError:  # pragma: no cover
-                    pass
-            return browser_found
-    except FileNotFoundError:  # pragma: no cover
-         pass
+# search for duckduckgo browser among the AppX packages of the current user
+# only the packages of the duckduckgo desktop browser are opened, HKCU\Software\Classes is not enumerated
+# the result is kept for SNAPSHOT_TTL seconds or until the cache is cleared
+def _search_for_duckduckgo(with_versions: bool = True) -> Iterator[Browser]:
+    global _duckduckgo
+    taken, found = _duckduckgo
+    if found is None or time.monotonic() - taken >= SNAPSHOT_TTL:
+        found = list(_find_duckduckgo())
+        _duckduckgo = (time.monotonic(), found)
+    for browser in found:
+        yield Browser(**{**browser, "version": _create_browser_version(browser["location"]) if with_versions else ""})
 
 
-# get duckduckgo details from registry
-def _get_duckduckgo_details_from_registry() -> Optional[Browser | str]:
+# find duckduckgo through the https association of its AppX package
+def _find_duckduckgo() -> Iterator[Browser]:
     try:
-        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes") as hkey:
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, APPX_PACKAGES) as hkey:
             i = 0
             while True:
                 try:
-                    subkey = winreg.EnumKey(hkey, i)
+                    package = winreg.EnumKey(hkey, i)
                     i += 1
-                except OSError:  # pragma: no cover
+                except OSError:
                     break
+                if not package.startswith(DUCKDUCKGO_PACKAGE):
+                    continue
+                prog_id = _get_appx_prog_id(hkey, package)
+                if not prog_id:     # pragma: no cover
+                    continue
                 try:
-                    description = winreg.QueryValue(hkey, subkey)
-                    if not description or not isinstance(description, str):  # pragma: no cover
-                        description = subkey
-                    if description.startswith(DUCK_INSTALL):
-                        registry_path = fr'Software\Classes\{description}\Application'
-                        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, registry_path) as key:
-                            browser = winreg.QueryValueEx(key, "AppUserModelID")[0]
-                            if DESKTOP_BROWSER in browser:
-                                description = winreg.QueryValueEx(key, "ApplicationName")[0]
-                                try:
-                                    cmd = winreg.QueryValue(hkey, rf"{subkey}\shell\open\command")
-                                    cmd = cmd.strip('"')
-                                    os.stat(cmd)
-                                except (OSError, AttributeError, TypeError, ValueError):  # pragma: no cover
-                                    continue
-                                yield Browser(
-                                    name=POSSIBLE_BROWSERS.get(description, "unknown"),
-                                    description=description,
-                                    version=_create_browser_version(cmd),
-                                    location=cmd
-                                )
-
-                except OSError:  # pragma: no cover
-                    description = subkey
+                    with winreg.OpenKey(winreg.HKEY_CURRENT_USER, fr'Software\Classes\{prog_id}\Application') as key:
+                        if DESKTOP_BROWSER not in winreg.QueryValueEx(key, "AppUserModelID")[0]:
+                            continue
+                        description = winreg.QueryValueEx(key, "ApplicationName")[0]
+                    cmd = winreg.QueryValue(winreg.HKEY_CURRENT_USER, fr'Software\Classes\{prog_id}\shell\open\command')
+                    cmd = cmd.strip('"')
+                    os.stat(cmd)
+                except (OSError, AttributeError, TypeError, ValueError):  # pragma: no cover
+                    continue
+                yield Browser(
+                    name=POSSIBLE_BROWSERS.get(description, "unknown"),
+                    description=description,
+                    version="",
+                    location=cmd
+                )
     except FileNotFoundError:  # pragma: no cover
-         pass
+        pass
 
 
-# get duckduckgo version from registry
-def _get_duckduckgo_version_from_registry() -> Optional[Version | str]:
+# determine ProgId an AppX package registers for https, applications of the package are checked in turn
+def _get_appx_prog_id(packages_key, package: str) -> Optional[str]:
     try:
-        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes") as hkey:
+        with winreg.OpenKey(packages_key, package) as hkey:
             i = 0
             while True:
                 try:
-                    subkey = winreg.EnumKey(hkey, i)
+                    application = winreg.EnumKey(hkey, i)
                     i += 1
-                except OSError:  # pragma: no cover
-                    break
+                except OSError:
+                    return None
                 try:
-                    description = winreg.QueryValue(hkey, subkey)
-                    if not description or not isinstance(description, str):  # pragma: no cover
-                        description = subkey
-                    if description.startswith(DUCK_INSTALL):
-                        registry_path = fr'Software\Classes\{description}\Application'
-                        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, registry_path) as key:
-                            browser = winreg.QueryValueEx(key, "AppUserModelID")[0]
-                            if DESKTOP_BROWSER in browser:
-                                try:
-                                    cmd = winreg.QueryValue(hkey, rf"{subkey}\shell\open\command")
-                                    cmd = cmd.strip('"')
-                                    os.stat(cmd)
-                                except (OSError, AttributeError, TypeError, ValueError):  # pragma: no cover
-                                    continue
-                                yield Version(
-                                    version=_create_browser_version(cmd)
-                                )
-
-                except OSError:  # pragma: no cover
-                    description = subkey
-    except FileNotFoundError:  # pragma: no cover
-         pass
\ No newline at end of file
+                    with winreg.OpenKey(hkey, rf"{application}\Capabilities\URLAssociations") as key:
+                        return winreg.QueryValueEx(key, "https")[0]
+                except OSError:
+                    continue
+    except OSError:  # pragma: no cover
+        return None
@@ -1,5 +1,12 @@
+import asyncio
 import builtins
+import json
+import os
+import plistlib
+import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Dict
 from unittest.mock import ANY, mock_open
@@ -9,7 +16,7 @@ from unittest.mock import patch
 import pytest
 
 import installed_browsers
-from installed_browsers.common import OS
+from installed_browsers.common import OS, Channel, get_channel
 
 """
 These tests are based on the existing browsers of GitHub Actions virtual environments.
@@ -29,15 +36,10 @@ BROWSER_NOT_INSTALLED = "Browser is not installed."
 DEFAULT_BROWSER_NOT_SUPPORTED = "Default browser is not supported."
 DUMMY_DEFAULT_BROWSER = "dummy.browser"
 OPERATING_SYSTEM_NOT_SUPPORTED = "This operating system is not yet supported."
-
-# winreg should be mocked for linux and mac
-match sys.platform:
-    case OS.LINUX | OS.MAC:
-        MockWinreg = Mock()
-        MockWinreg.QueryValueEx.return_value = dict(dummy="dummy")
-    case OS.WINDOWS:
-        import winreg
-        MockWinreg = winreg
+IMPORT_TIME_BUDGET_US = 20000
+HEAVY_MODULES = ("subprocess", "concurrent.futures", "shutil", "logging", "plistlib", "xdg", "win32api")
+PLATFORM_MODULES = {OS.LINUX: "linux", OS.MAC: "mac", OS.WINDOWS: "windows"}
+WINDOWS_USER_CHOICE = r"Software\Microsoft\Windows\Shell\Associations\UrlAssociations\https\UserChoice"
 
 # check if given browser is installed in system
 @pytest.mark.parametrize(
@@ -63,9 +65,7 @@ class TestBrowserInstallation:
         else:
             assert browser not in available_browsers
 
-    @patch.dict("sys.modules", winreg=MockWinreg)
-    @patch("winreg.QueryValue")
-    def test_browser_is_installed_or_not(self, mock_winreg_qv, browser: str, description: str):
+    def test_browser_is_installed_or_not(self, browser: str, description: str, request):
         match sys.platform:
             case OS.LINUX | OS.MAC:
                 available_browsers = [individual_browser["name"] for individual_browser in
@@ -75,7 +75,11 @@ class TestBrowserInstallation:
                 else:
                     assert not installed_browsers.do_i_have_installed(browser)
             case OS.WINDOWS:
-                mock_winreg_qv.return_value = description
+                fake_winreg = request.getfixturevalue("fake_winreg")
+                location = request.getfixturevalue("tmp_path") / f"{browser}.exe"
+                location.touch()
+                _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, description, description,
+                                          location)
                 if browser in installed_browsers.windows.POSSIBLE_BROWSER_NAMES:
                     assert installed_browsers.do_i_have_installed(browser)
                 else:
@@ -96,53 +100,54 @@ class TestDuckDuckGoWindowsInstallation:
     def test_installed_browsers(self, browser: str, description: str):
         with patch("installed_browsers.windows._search_for_duckduckgo") as mock_search_for_duckduckgo:
             mock_search_for_duckduckgo.return_value = [{"name": browser, "description": description,
-                                                        "version": ANY, "location": ANY}]
+                                                        "version": ANY, "location": r"C:\DuckDuckGo.exe"}]
             available_browsers = [individual_browser["name"] for individual_browser in installed_browsers.browsers()]
             if browser in available_browsers:
                 assert browser in available_browsers
             else:
                 assert browser not in available_browsers
 
-    @patch.dict("sys.modules", winreg=MockWinreg)
-    @patch("winreg.OpenKey")
-    @patch("winreg.QueryValue")
-    @patch("winreg.QueryValueEx")
-    @patch("winreg.EnumKey")
-    def test_browser_is_installed_or_not(self, mock_winreg_ek, mock_winreg_qve, mock_winreg_qv, mock_winreg_ok, browser: str, description: str):
+    def test_browser_is_installed_or_not(self, browser: str, description: str, request):
         match sys.platform:
             case OS.WINDOWS:
-                mock_winreg_ok.return_value = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes")
-                mock_winreg_qv.return_value = description
-                mock_winreg_qve.return_value = [DESKTOP_BROWSER]
-                mock_winreg_ek.return_value = description
+                fake_winreg = request.getfixturevalue("fake_winreg")
+                location = request.getfixturevalue("tmp_path") / "DuckDuckGo.exe"
+                location.touch()
+                _register_windows_duckduckgo(fake_winreg, location)
                 if browser in installed_browsers.windows.POSSIBLE_BROWSER_NAMES:
                     assert installed_browsers.do_i_have_installed(browser)
                 else:
                     assert not installed_browsers.do_i_have_installed(browser)
 
-    @patch.dict("sys.modules", winreg=MockWinreg)
-    @patch("winreg.QueryValueEx")
-    @patch("winreg.QueryValue")
-    @patch('winreg.OpenKey')
-    @patch('winreg.EnumKey')
-    @patch('win32api.GetFileVersionInfo')
-    @patch('os.stat')
-    def test_search_for_duckduckgo(self, mock_os_stat, mock_win32api_fileversion, mock_winreg_ek, mock_winreg_ok,
-                                   mock_winreg_qv, mock_winreg_qve, browser: str, description: str):
+    def test_search_for_duckduckgo(self, browser: str, description: str, request):
         match sys.platform:
             case OS.WINDOWS:
-                location = (r"C:\Program Files\WindowsApps\DuckDuckGo.DesktopBrowser_0.134.4.0_x64__ya2fgkz3nks94"
-                            r"\WindowsBrowser\DuckDuckGo.exe")
-                mock_winreg_qve.side_effect = [[DESKTOP_BROWSER], [DEFAULT_BROWSER_WINDOWS_DUCK]]
-                mock_winreg_qv.side_effect = ['AppX', location, location]
-                mock_winreg_ok.return_value = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes")
-                mock_winreg_ek.side_effect = ['AppX', OSError]
-                mock_win32api_fileversion.return_value = {'FileVersionMS': 65536, 'FileVersionLS': 0}
-                mock_os_stat.return_value = True
+                location = _create_pe_executable(
+                    request.getfixturevalue("tmp_path") / "WindowsBrowser" / "DuckDuckGo.exe", "0.134.4.0"
+                )
+                _register_windows_duckduckgo(request.getfixturevalue("fake_winreg"), location)
+                found = list(installed_browsers.windows._search_for_duckduckgo())
+                assert len(found) == 1
+                assert found == [{"name": browser, "description": DEFAULT_BROWSER_WINDOWS_DUCK,
+                                  "version": "0.134.4.0", "location": str(location)}]
+
 
-                for duckduckgo in installed_browsers.windows._search_for_duckduckgo():
-                    assert duckduckgo == {"name": browser, "description": DEFAULT_BROWSER_WINDOWS_DUCK,
-                                          "version": ANY, "location": ANY}
+# importing the package and its platform module stays within the import time budget
+def test_import_time_budget():
+    module = f"installed_browsers.{PLATFORM_MODULES.get(sys.platform, 'common')}"
+    environment = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    # the first import writes the bytecode, compiling the sources is not part of the budget
+    subprocess.run([sys.executable, "-c", f"import {module}"],
+                   check=True, env=environment, cwd=Path(__file__).parent.parent)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True, env=environment,
+                            cwd=Path(__file__).parent.parent)
+    # import time: self [us] | cumulative | imported package
+    own_time = sum(int(line.split("|")[0].split(":")[1]) for line in result.stderr.splitlines()
+                   if line.split("|")[-1].strip().startswith("installed_browsers"))
+    imported = {line.split("|")[-1].strip() for line in result.stderr.splitlines()}
+    assert own_time < IMPORT_TIME_BUDGET_US
+    assert not imported.intersection(HEAVY_MODULES)
 
 
 # only linux, mac and windows operating systems are supported
@@ -194,24 +199,24 @@ def test_os_is_not_supported():
 )
 @patch("plistlib.load")
 @patch("subprocess.check_output")
-@patch("os.path.isfile")
-@patch("xdg.DesktopEntry.DesktopEntry.getName")
-@patch("subprocess.getoutput")
-@patch.dict("sys.modules", winreg=MockWinreg)
-@patch('winreg.QueryValueEx')
-@patch('winreg.QueryValue')
-def test_default_browser(mock_winreg_qv, mock_winreg_qve, mock_subprocess_get,
-                         mock_desktopentry, mock_isfile, mock_subprocess_check, mock_load, browser):
+@patch("subprocess.run")
+def test_default_browser(mock_subprocess_run, mock_subprocess_check, mock_load, browser, request):
     match sys.platform:
         case OS.LINUX:
-            mock_subprocess_check.return_value = browser
-            mock_isfile.return_value = True
-            mock_desktopentry.return_value = DEFAULT_BROWSER_LINUX
+            linux_applications = request.getfixturevalue("linux_applications")
+            (linux_applications / browser.decode()).write_text("[Desktop Entry]\nName=Firefox\nExec=firefox %u\n")
+            (linux_applications / "mimeapps.list").write_text(
+                f"[Default Applications]\nx-scheme-handler/https={browser.decode()};\n"
+            )
             assert installed_browsers.what_is_the_default_browser() == DEFAULT_BROWSER_LINUX
+            mock_subprocess_check.assert_not_called()
         case OS.MAC:
+            request.getfixturevalue("mac_cache")
             if DEFAULT_BROWSER_MAC.lower() in str(browser):
                 mock_load.side_effect = [browser, {'CFBundleExecutable': 'firefox'}]
-                mock_subprocess_get.return_value = '/Applications/Firefox.app'
+                mock_subprocess_run.return_value = subprocess.CompletedProcess(
+                    [], 0, stdout='/Applications/Firefox.app'
+                )
                 # with patch("builtins.open", mock_open(), create=True):
                 # with patch.object(Path, "open"):
                 with patch.object(Path, "open"):
@@ -223,22 +228,21 @@ def test_default_browser(mock_winreg_qv, mock_winreg_qve, mock_subprocess_get,
                     with patch.object(builtins, "open"):
                         assert installed_browsers.what_is_the_default_browser() == DEFAULT_BROWSER_NOT_SUPPORTED
         case OS.WINDOWS:
-            if browser == DEFAULT_BROWSER_WINDOWS_FIREFOX:
-                mock_winreg_qve.return_value = ["FirefoxURL-308046B0AF4A39CB"]
-                mock_winreg_qv.return_value = DEFAULT_BROWSER_WINDOWS_FIREFOX
-                assert installed_browsers.what_is_the_default_browser() == DEFAULT_BROWSER_WINDOWS_FIREFOX
-            elif browser == DEFAULT_BROWSER_WINDOWS_CHROME_CANARY:
-                mock_winreg_qve.return_value = ["ChromeSSHTM.308046B0AF4A39CB"]
-                mock_winreg_qv.return_value = DEFAULT_BROWSER_WINDOWS_CHROME_CANARY
-                assert installed_browsers.what_is_the_default_browser() == DEFAULT_BROWSER_WINDOWS_CHROME_CANARY
-            elif browser == DEFAULT_BROWSER_WINDOWS_EDGE:
-                mock_winreg_qve.return_value = ["MSEdgeHTM"]
-                mock_winreg_qv.return_value = DEFAULT_BROWSER_WINDOWS_EDGE
-                assert installed_browsers.what_is_the_default_browser() == DEFAULT_BROWSER_WINDOWS_EDGE
-            elif browser == DEFAULT_BROWSER_WINDOWS_MIN:
-                mock_winreg_qve.return_value = ["Min"]
-                mock_winreg_qv.return_value = DEFAULT_BROWSER_WINDOWS_MIN
-                assert installed_browsers.what_is_the_default_browser() == DEFAULT_BROWSER_WINDOWS_MIN
+            fake_winreg = request.getfixturevalue("fake_winreg")
+            prog_ids = {
+                DEFAULT_BROWSER_WINDOWS_FIREFOX: "FirefoxURL-308046B0AF4A39CB",
+                DEFAULT_BROWSER_WINDOWS_CHROME_CANARY: "ChromeSSHTM.308046B0AF4A39CB",
+                DEFAULT_BROWSER_WINDOWS_EDGE: "MSEdgeHTM",
+                DEFAULT_BROWSER_WINDOWS_MIN: "Min",
+            }
+            if browser in prog_ids:
+                location = request.getfixturevalue("tmp_path") / "browser.exe"
+                location.touch()
+                _register_windows_browser(fake_winreg, fake_winreg.HKEY_CURRENT_USER, browser, browser, location)
+                fake_winreg.add(fake_winreg.HKEY_CURRENT_USER, WINDOWS_USER_CHOICE, ProgId=prog_ids[browser])
+                fake_winreg.add(fake_winreg.HKEY_LOCAL_MACHINE, rf"Software\Classes\{prog_ids[browser]}\DefaultIcon",
+                                r"C:\Program Files\Mozilla Firefox\firefox.exe,0")
+                assert installed_browsers.what_is_the_default_browser() == browser
 
 
 # check default duckduckgo
@@ -251,18 +255,15 @@ def test_default_browser(mock_winreg_qv, mock_winreg_qve, mock_subprocess_get,
         ),
     ),
 )
-@patch.dict("sys.modules", winreg=MockWinreg)
-@patch('winreg.QueryValueEx')
-@patch('winreg.QueryValue')
-@patch('winreg.OpenKey')
-def test_default_duckduckgo(mock_winreg_ok, mock_winreg_qv, mock_winreg_qve, browser):
+def test_default_duckduckgo(browser, request):
     match sys.platform:
         case OS.WINDOWS:
-            if browser == DEFAULT_BROWSER_WINDOWS_DUCK:
-                mock_winreg_qve.side_effect = [['AppX'], [DEFAULT_BROWSER_WINDOWS_DUCK]]
-                mock_winreg_qv.return_value = DEFAULT_BROWSER_WINDOWS_DUCK
-                mock_winreg_ok.return_value = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes")
-                assert installed_browsers.what_is_the_default_browser() == DEFAULT_BROWSER_WINDOWS_DUCK
+            fake_winreg = request.getfixturevalue("fake_winreg")
+            location = request.getfixturevalue("tmp_path") / "DuckDuckGo.exe"
+            location.touch()
+            prog_id = _register_windows_duckduckgo(fake_winreg, location)
+            fake_winreg.add(fake_winreg.HKEY_CURRENT_USER, WINDOWS_USER_CHOICE, ProgId=prog_id)
+            assert installed_browsers.what_is_the_default_browser() == DEFAULT_BROWSER_WINDOWS_DUCK
 
 
 # check missing default browser
@@ -295,21 +296,20 @@ def test_default_duckduckgo(mock_winreg_ok, mock_winreg_qv, mock_winreg_qve, bro
 )
 @patch("plistlib.load")
 @patch("subprocess.check_output")
-@patch.dict("sys.modules", winreg=MockWinreg)
-@patch('winreg.QueryValueEx')
-@patch('winreg.QueryValue')
-def test_no_default_browser(mock_winreg_qv, mock_winreg_qve, mock_check_output, mock_load, browser):
+def test_no_default_browser(mock_check_output, mock_load, browser, request):
     match sys.platform:
         case OS.LINUX:
+            request.getfixturevalue("linux_applications")
             mock_check_output.return_value = browser
         case OS.MAC:
+            request.getfixturevalue("mac_cache")
             mock_load.side_effect = [browser, {'CFBundleExecutable': ''}]
-            with patch.object(Path, "open"):
+            with patch.object(Path, "open"), patch.object(installed_browsers.mac, "APPLICATION_DIRS", ()):
                 assert installed_browsers.what_is_the_default_browser() == NO_DEFAULT_BROWSER
                 return
         case OS.WINDOWS:
-            mock_winreg_qve.return_value = browser
-            mock_winreg_qv.return_value = ""
+            fake_winreg = request.getfixturevalue("fake_winreg")
+            fake_winreg.add(fake_winreg.HKEY_CURRENT_USER, WINDOWS_USER_CHOICE, ProgId=browser[0])
     assert installed_browsers.what_is_the_default_browser() == NO_DEFAULT_BROWSER
 
 
@@ -450,9 +450,7 @@ def test_no_default_browser(mock_winreg_qv, mock_winreg_qve, mock_check_output,
         ),
     ),
 )
-@patch.dict("sys.modules", winreg=MockWinreg)
-@patch("winreg.QueryValue")
-def test_get_browser_details(mock_winreg_qv, browser: str, details: Dict):
+def test_get_browser_details(browser: str, details: Dict, request):
     match sys.platform:
         case OS.LINUX | OS.MAC:
             available_browsers = [individual_browser["name"] for individual_browser in installed_browsers.browsers()]
@@ -461,8 +459,10 @@ def test_get_browser_details(mock_winreg_qv, browser: str, details: Dict):
             else:
                 assert installed_browsers.give_me_details_of(browser) == BROWSER_NOT_INSTALLED
         case OS.WINDOWS:
-            mock_winreg_qv.side_effect = [details["description"], details["location"]]
+            fake_winreg = request.getfixturevalue("fake_winreg")
             if browser in installed_browsers.windows.POSSIBLE_BROWSER_NAMES:
+                _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, details["description"],
+                                          details["description"], details["location"])
                 assert installed_browsers.give_me_details_of(browser) == details
             else:
                 assert installed_browsers.give_me_details_of(browser) == BROWSER_NOT_INSTALLED
@@ -477,9 +477,8 @@ def test_get_browser_details(mock_winreg_qv, browser: str, details: Dict):
             {
                 "name": "duckduckgo",
                 "description": "DuckDuckGo",
-                "version": ANY,
-                "location": r"C:\Program Files\WindowsApps\DuckDuckGo.DesktopBrowser_0.134.4.0_x64__ya2fgkz3nks94"
-                            r"\WindowsBrowser\DuckDuckGo.exe",
+                "version": "0.134.4.0",
+                "location": ANY,
             },
             marks=pytest.mark.skipif(sys.platform != "win32", reason="windows-only"),
             id="duckduckgo_windows",
@@ -487,25 +486,14 @@ def test_get_browser_details(mock_winreg_qv, browser: str, details: Dict):
         ),
     ),
 )
-@patch.dict("sys.modules", winreg=MockWinreg)
-@patch("winreg.QueryValueEx")
-@patch("winreg.QueryValue")
-@patch('winreg.OpenKey')
-@patch('winreg.EnumKey')
-@patch('win32api.GetFileVersionInfo')
-@patch('os.stat')
-def test_get_duckduckgo_details(mock_os_stat, mock_win32api_fileversion, mock_winreg_ek, mock_winreg_ok, mock_winreg_qv,
-                                mock_winreg_qve, browser: str, details: Dict):
+def test_get_duckduckgo_details(browser: str, details: Dict, request):
     match sys.platform:
         case OS.WINDOWS:
-            mock_winreg_qve.side_effect = [[DESKTOP_BROWSER], [DEFAULT_BROWSER_WINDOWS_DUCK]]
-            mock_winreg_qv.side_effect = ['AppX', details["location"], details["location"]]
-            mock_winreg_ok.return_value = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes")
-            mock_winreg_ek.side_effect = ['AppX', OSError]
-            mock_win32api_fileversion.return_value = {'FileVersionMS': 65536, 'FileVersionLS': 0}
-            mock_os_stat.return_value = True
+            location = _create_pe_executable(request.getfixturevalue("tmp_path") / "WindowsBrowser" / "DuckDuckGo.exe",
+                                             "0.134.4.0")
+            _register_windows_duckduckgo(request.getfixturevalue("fake_winreg"), location)
             if browser in installed_browsers.windows.POSSIBLE_BROWSER_NAMES:
-                assert installed_browsers.give_me_details_of(browser) == details
+                assert installed_browsers.give_me_details_of(browser) == {**details, "location": str(location)}
             else:
                 assert installed_browsers.give_me_details_of(browser) == BROWSER_NOT_INSTALLED
 
@@ -636,9 +624,8 @@ def test_get_duckduckgo_details(mock_os_stat, mock_win32api_fileversion, mock_wi
     ),
 )
 class TestBrowserVersion:
-    @patch.dict("sys.modules", winreg=MockWinreg)
-    @patch("winreg.QueryValue")
-    def test_version_of_browser(self, mock_winreg_qv, browser: str, description: str, version: Dict, location: str):
+    def test_version_of_browser(self, browser: str, description: str, version: Dict, location: str,
+                                request):
         match sys.platform:
             case OS.LINUX | OS.MAC:
                 available_browsers = [individual_browser["name"] for individual_browser
@@ -646,25 +633,26 @@ class TestBrowserVersion:
                 if browser in available_browsers:
                     assert installed_browsers.get_version_of(browser) == version
             case OS.WINDOWS:
-                mock_winreg_qv.side_effect = [description, location]
+                fake_winreg = request.getfixturevalue("fake_winreg")
                 if browser in installed_browsers.windows.POSSIBLE_BROWSER_NAMES:
+                    _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, description, description,
+                                              location)
                     assert installed_browsers.get_version_of(browser) == version
                 else:
                     assert installed_browsers.get_version_of(browser) == BROWSER_NOT_INSTALLED
 
-    @patch("subprocess.getoutput")
-    @patch("os.path.isfile")
-    @patch.dict("sys.modules", winreg=MockWinreg)
-    @patch("winreg.QueryValue")
-    def test_version_not_determined(self, mock_winreg_qv, mock_file, mock_output, browser: str,
-                                    description: str, version: Dict, location: str) -> None:
+    @patch("subprocess.run")
+    def test_version_not_determined(self, mock_output, browser: str,
+                                    description: str, version: Dict, location: str, request) -> None:
         match sys.platform:
             case OS.LINUX:
-                mock_file.return_value = False
+                request.getfixturevalue("linux_applications")
             case OS.MAC:
-                mock_output.return_value = ""
+                mock_output.return_value = subprocess.CompletedProcess([], 0, stdout="")
+                monkeypatch = request.getfixturevalue("monkeypatch")
+                monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", ())
             case OS.WINDOWS:
-                mock_winreg_qv.return_value = "dummy"
+                request.getfixturevalue("fake_winreg")
         assert installed_browsers.get_version_of(browser) == BROWSER_NOT_INSTALLED
 
 
@@ -676,35 +664,1674 @@ class TestBrowserVersion:
             "duckduckgo",
             "AppX",
             {
-                "version": ANY,
+                "version": "0.134.4.0",
             },
-            r"C:\Program Files\WindowsApps\DuckDuckGo.DesktopBrowser_0.134.4.0_x64__ya2fgkz3nks94"
-            r"\WindowsBrowser\DuckDuckGo.exe",
+            "DuckDuckGo.exe",
             marks=pytest.mark.skipif(sys.platform != "win32", reason="windows-only"),
             id="duckduckgo_windows",
         ),
     ),
 )
 class TestDuckDuckGoWindowsVersion:
-    @patch.dict("sys.modules", winreg=MockWinreg)
-    @patch("winreg.OpenKey")
-    @patch("winreg.QueryValue")
-    @patch("winreg.QueryValueEx")
-    @patch("winreg.EnumKey")
-    @patch('win32api.GetFileVersionInfo')
-    @patch('os.stat')
-    def test_version_of_browser(self, mock_os_stat, mock_win32api_fileversion, mock_winreg_ek, mock_winreg_qve,
-                                mock_winreg_qv, mock_winreg_ok, browser: str, description: str, version: Dict,
-                                location: str):
+    def test_version_of_browser(self, browser: str, description: str, version: Dict, location: str, request):
         match sys.platform:
             case OS.WINDOWS:
-                mock_winreg_qv.side_effect = [description, location]
-                mock_winreg_ok.return_value = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Classes")
-                mock_winreg_qve.return_value = [DESKTOP_BROWSER]
-                mock_winreg_ek.side_effect = [description, OSError]
-                mock_win32api_fileversion.return_value = {'FileVersionMS': 65536, 'FileVersionLS': 0}
-                mock_os_stat.return_value = True
+                executable = _create_pe_executable(request.getfixturevalue("tmp_path") / location, version["version"])
+                _register_windows_duckduckgo(request.getfixturevalue("fake_winreg"), executable)
                 if browser in installed_browsers.windows.POSSIBLE_BROWSER_NAMES:
                     assert installed_browsers.get_version_of(browser) == version
                 else:
                     assert installed_browsers.get_version_of(browser) == BROWSER_NOT_INSTALLED
+
+
+# create a desktop entry with an executable answering to --version
+def _create_linux_browser(application_dir: Path, desktop_name: str, description: str, version: str) -> Path:
+    application_dir.mkdir(parents=True, exist_ok=True)
+    executable = application_dir.parent / "bin" / desktop_name
+    executable.parent.mkdir(parents=True, exist_ok=True)
+    executable.write_text(f"#!/bin/sh\necho '{description} {version}'\n")
+    executable.chmod(0o755)
+    (application_dir / f"{desktop_name}.desktop").write_text(
+        f"[Desktop Entry]\nType=Application\nName={description}\nExec={executable} %U\n"
+    )
+    return executable
+
+
+# isolated linux application directory
+@pytest.fixture
+def linux_applications(tmp_path, monkeypatch):
+    application_dir = tmp_path / "applications"
+    application_dir.mkdir()
+    monkeypatch.setattr(installed_browsers.linux, "BROWSER_LOCATIONS", (str(application_dir),))
+    monkeypatch.delenv("XDG_DATA_HOME", raising=False)
+    monkeypatch.delenv("XDG_DATA_DIRS", raising=False)
+    monkeypatch.delenv("XDG_CURRENT_DESKTOP", raising=False)
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setenv("XDG_CONFIG_DIRS", str(tmp_path / "xdg"))
+    monkeypatch.setattr(installed_browsers.linux, "BROWSER_ALTERNATIVE",
+                        str(tmp_path / "alternatives" / "x-www-browser"))
+    installed_browsers.linux.clear_cache()
+    yield application_dir
+    installed_browsers.linux.clear_cache()
+
+
+# check that version probes of linux browsers run concurrently
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxParallelProbes:
+    @pytest.fixture(autouse=True)
+    def applications(self, linux_applications):
+        _create_linux_browser(linux_applications, "google-chrome", "Google Chrome", "123.0.6312.58")
+        _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        _create_linux_browser(linux_applications, "min", "Min", "1.32.1")
+
+    def test_browsers_are_probed(self):
+        found = {browser["name"]: browser["version"] for browser in installed_browsers.linux.browsers()}
+        assert found == {"chrome": "123.0.6312.58", "firefox": "124.0", "min": "1.32.1"}
+
+    def test_catalog_order_is_kept(self):
+        found = [browser["name"] for browser in installed_browsers.linux.browsers(ordered=True)]
+        assert found == ["chrome", "firefox", "min"]
+
+    def test_probes_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def probe(executable_path):
+            barrier.wait()
+            return "1.0"
+
+        with patch("installed_browsers.linux._get_version", side_effect=probe):
+            assert len(list(installed_browsers.linux.browsers(max_workers=3))) == 3
+
+
+# check that linux browser versions are served from memory until the executable changes
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxVersionCache:
+    @pytest.fixture(autouse=True)
+    def executable(self, linux_applications):
+        return _create_linux_browser(linux_applications, "google-chrome", "Google Chrome", "123.0.6312.58")
+
+    def test_version_is_probed_once(self):
+        with patch("installed_browsers.linux._probe_version", return_value="123.0.6312.58") as mock_probe:
+            list(installed_browsers.linux.browsers())
+            list(installed_browsers.linux.get_details_of("chrome"))
+            list(installed_browsers.linux.get_version_of("chrome"))
+            assert mock_probe.call_count == 1
+
+    def test_modified_executable_is_probed_again(self, executable):
+        assert installed_browsers.get_version_of("chrome") == {"version": "123.0.6312.58"}
+        executable.write_text("#!/bin/sh\necho 'Google Chrome 124.0.6367.60'\n")
+        assert installed_browsers.get_version_of("chrome") == {"version": "124.0.6367.60"}
+
+    def test_cache_can_be_cleared(self):
+        with patch("installed_browsers.linux._probe_version", return_value="123.0.6312.58") as mock_probe:
+            list(installed_browsers.linux.get_version_of("chrome"))
+            installed_browsers.linux.clear_cache()
+            list(installed_browsers.linux.get_version_of("chrome"))
+            assert mock_probe.call_count == 2
+
+
+# check that linux desktop entries are found through a single directory index
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxDesktopEntryIndex:
+    def test_xdg_data_dirs_are_indexed(self, linux_applications, tmp_path, monkeypatch):
+        _create_linux_browser(tmp_path / "data" / "applications", "min", "Min", "1.32.1")
+        monkeypatch.setenv("XDG_DATA_DIRS", str(tmp_path / "data"))
+        assert installed_browsers.do_i_have_installed("min")
+
+    def test_xdg_data_home_takes_precedence(self, linux_applications, tmp_path, monkeypatch):
+        _create_linux_browser(linux_applications, "min", "Min", "1.32.1")
+        _create_linux_browser(tmp_path / "home" / "applications", "min", "Min Home", "1.32.1")
+        monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "home"))
+        assert installed_browsers.give_me_details_of("min")["description"] == "Min Home"
+
+    def test_directories_are_scanned_once(self, linux_applications):
+        _create_linux_browser(linux_applications, "min", "Min", "1.32.1")
+        with patch("os.scandir", wraps=os.scandir) as mock_scandir:
+            for name, desktop_names in installed_browsers.linux.POSSIBLE_BROWSERS:
+                installed_browsers.do_i_have_installed(name)
+            assert mock_scandir.call_count == 1
+
+    def test_new_desktop_entry_is_found(self, linux_applications):
+        assert not installed_browsers.do_i_have_installed("min")
+        _create_linux_browser(linux_applications, "min", "Min", "1.32.1")
+        os.utime(linux_applications, ns=(0, 0))
+        assert installed_browsers.do_i_have_installed("min")
+
+
+# check that only the [Desktop Entry] group of linux desktop entries is read
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxDesktopEntryParser:
+    @pytest.fixture
+    def desktop_entry(self, linux_applications):
+        path = linux_applications / "firefox.desktop"
+        path.write_text(
+            "# comment\n"
+            "[Desktop Entry]\n"
+            "Name=Firefox Web Browser\n"
+            "Name[de]=Firefox-Webbrowser\n"
+            "Name[de_AT]=Firefox Webbrowser\n"
+            "Comment=Browse the World Wide Web\n"
+            "Exec=firefox %u\n"
+            "\n"
+            "[Desktop Action new-window]\n"
+            "Name=Open a New Window\n"
+            "Exec=firefox -new-window\n"
+        )
+        return str(path)
+
+    def test_requested_keys_are_read(self, desktop_entry, monkeypatch):
+        monkeypatch.setenv("LANGUAGE", "C")
+        assert installed_browsers.linux._read_desktop_entry(desktop_entry) == {
+            "Name": "Firefox Web Browser", "Exec": "firefox %u"
+        }
+
+    @pytest.mark.parametrize(
+        ("language", "description"),
+        (
+            pytest.param("de_DE.UTF-8", "Firefox-Webbrowser", id="language"),
+            pytest.param("de_AT.UTF-8", "Firefox Webbrowser", id="language_and_territory"),
+            pytest.param("fr_FR.UTF-8", "Firefox Web Browser", id="not_translated"),
+        ),
+    )
+    def test_name_is_localized(self, desktop_entry, monkeypatch, language, description):
+        monkeypatch.delenv("LANGUAGE", raising=False)
+        monkeypatch.delenv("LC_ALL", raising=False)
+        monkeypatch.delenv("LC_MESSAGES", raising=False)
+        monkeypatch.setenv("LANG", language)
+        assert installed_browsers.linux._read_desktop_entry(desktop_entry)["Name"] == description
+
+    def test_values_are_unescaped(self, linux_applications):
+        path = linux_applications / "min.desktop"
+        path.write_text("[Desktop Entry]\nName=Min\\sBrowser\nExec=min\n")
+        assert installed_browsers.linux._read_desktop_entry(str(path))["Name"] == "Min Browser"
+
+    def test_legacy_desktop_entry_is_read_by_pyxdg(self, linux_applications):
+        pytest.importorskip("xdg")
+        path = linux_applications / "min.desktop"
+        path.write_text("[KDE Desktop Entry]\nName=Min\nExec=min\n")
+        assert installed_browsers.linux._read_desktop_entry(str(path)) == {"Name": "Min", "Exec": "min"}
+
+
+# check the asyncio api of linux
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxAsyncio:
+    @pytest.fixture(autouse=True)
+    def applications(self, linux_applications):
+        _create_linux_browser(linux_applications, "google-chrome", "Google Chrome", "123.0.6312.58")
+        _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+
+    def test_async_browsers(self):
+        async def collect():
+            return [browser async for browser in installed_browsers.async_browsers()]
+
+        found = asyncio.run(collect())
+        assert sorted(found, key=lambda browser: browser["name"]) == sorted(
+            installed_browsers.browsers(), key=lambda browser: browser["name"]
+        )
+
+    def test_async_catalog_order_is_kept(self):
+        async def collect():
+            return [browser["name"] async for browser in installed_browsers.linux.async_browsers(ordered=True)]
+
+        assert asyncio.run(collect()) == ["chrome", "firefox"]
+
+    def test_async_details_and_version(self):
+        details = asyncio.run(installed_browsers.async_get_details_of("firefox"))
+        assert details == {"name": "firefox", "description": "Firefox", "version": "124.0", "location": ANY}
+        assert asyncio.run(installed_browsers.async_get_version_of("firefox")) == {"version": "124.0"}
+        assert asyncio.run(installed_browsers.async_get_version_of("min")) == BROWSER_NOT_INSTALLED
+
+    def test_async_probe_runs_in_event_loop(self):
+        with patch("asyncio.create_subprocess_exec", wraps=asyncio.create_subprocess_exec) as mock_exec:
+            assert asyncio.run(installed_browsers.async_get_version_of("chrome")) == {"version": "123.0.6312.58"}
+            assert mock_exec.call_args.args[-1] == "--version"
+
+
+# create an application bundle with Info.plist
+def _create_mac_application(applications_dir: Path, name: str, info: Dict) -> Path:
+    bundle = applications_dir / f"{name}.app"
+    (bundle / "Contents" / "MacOS").mkdir(parents=True)
+    with open(bundle / "Contents" / "Info.plist", "wb") as file:
+        plistlib.dump(info, file)
+    return bundle
+
+
+# mac caches are not kept across tests, mocked contents of real files are forgotten
+@pytest.fixture
+def mac_cache():
+    installed_browsers.mac.clear_cache()
+    yield
+    installed_browsers.mac.clear_cache()
+
+
+# fake spotlight on PATH, application bundles are searched in the Applications directory
+# every query is logged to mdfind.log next to it, application directories of the machine are never scanned
+@pytest.fixture
+def fake_mdfind(tmp_path, monkeypatch):
+    applications = tmp_path / "Applications"
+    applications.mkdir()
+    monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", ())
+    mdfind = tmp_path / "bin" / "mdfind"
+    mdfind.parent.mkdir()
+    mdfind.write_text(f"""#!{sys.executable}
+import fnmatch, plistlib, re, sys
+from pathlib import Path
+with open({str(tmp_path / "mdfind.log")!r}, "a") as log:
+    log.write(sys.argv[1] + "\\n")
+patterns = re.findall(r'kMDItemCFBundleIdentifier == "([^"]*)"', sys.argv[1])
+for bundle in sorted(Path({str(applications)!r}).glob("*.app")):
+    identifier = plistlib.loads((bundle / "Contents" / "Info.plist").read_bytes()).get("CFBundleIdentifier", "")
+    if any(fnmatch.fnmatchcase(identifier, pattern) for pattern in patterns):
+        print(bundle)
+""")
+    mdfind.chmod(0o755)
+    monkeypatch.setenv("PATH", str(mdfind.parent), prepend=os.pathsep)
+    return applications
+
+
+# queries the fake spotlight was asked
+def _get_mdfind_queries(applications: Path) -> list[str]:
+    log = applications.parent / "mdfind.log"
+    return log.read_text().splitlines() if log.exists() else []
+
+
+# check the asyncio api of mac with a fake spotlight
+@pytest.mark.skipif(sys.platform == "win32", reason="unix-only")
+def test_mac_async_browsers(fake_mdfind):
+    bundle = _create_mac_application(fake_mdfind, "Firefox", {
+        "CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox", "CFBundleName": "Firefox",
+        "CFBundleShortVersionString": "124.0"
+    })
+
+    async def collect():
+        return [browser async for browser in installed_browsers.mac.async_browsers()]
+
+    assert asyncio.run(collect()) == [{"name": "firefox", "description": "Firefox", "version": "124.0",
+                                       "location": str(bundle / "Contents" / "MacOS" / "firefox")}]
+    assert len(_get_mdfind_queries(fake_mdfind)) == 1
+    assert asyncio.run(installed_browsers.mac.async_get_version_of("firefox")) == {"version": "124.0"}
+    assert asyncio.run(installed_browsers.mac.async_get_version_of("chrome")) == BROWSER_NOT_INSTALLED
+
+
+# check that mac browsers are found with a single spotlight query
+@pytest.mark.skipif(sys.platform == "win32", reason="unix-only")
+class TestMacSpotlight:
+    @pytest.fixture
+    def applications(self, fake_mdfind, mac_cache):
+        for name, info in (
+            ("Google Chrome", {"CFBundleIdentifier": "com.google.Chrome", "CFBundleExecutable": "Google Chrome",
+                               "CFBundleName": "Google Chrome", "KSVersion": "124.0.6367.60"}),
+            ("Firefox", {"CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox",
+                         "CFBundleName": "Firefox", "CFBundleShortVersionString": "125.0.1"}),
+            ("Pale Moon", {"CFBundleIdentifier": "org.mozilla.palemoon", "CFBundleExecutable": "palemoon",
+                           "CFBundleName": "Pale Moon", "CFBundleShortVersionString": "33.0.2"}),
+            ("TextEdit", {"CFBundleIdentifier": "com.apple.TextEdit", "CFBundleExecutable": "TextEdit"}),
+        ):
+            _create_mac_application(fake_mdfind, name, info)
+        return fake_mdfind
+
+    def test_single_query(self, applications):
+        assert [(browser["name"], browser["version"]) for browser in installed_browsers.mac.browsers()] == [
+            ("chrome", "124.0.6367.60"), ("firefox", "125.0.1"), ("pale-moon", "33.0.2")
+        ]
+        queries = _get_mdfind_queries(applications)
+        assert len(queries) == 1
+        assert all(f'kMDItemCFBundleIdentifier == "{bundle_id}"' in queries[0]
+                   for browser, bundle_id, version_string in installed_browsers.mac.POSSIBLE_BROWSERS)
+
+    def test_filtered_query(self, applications):
+        assert [browser["name"] for browser in installed_browsers.mac.browsers(names=["firefox", "safari"])] == [
+            "firefox"
+        ]
+        assert _get_mdfind_queries(applications) == [
+            'kMDItemCFBundleIdentifier == "org.mozilla.firefox" || kMDItemCFBundleIdentifier == "com.apple.Safari"'
+        ]
+        assert list(installed_browsers.mac.browsers(names=["unknown"])) == []
+        assert len(_get_mdfind_queries(applications)) == 1
+
+    def test_single_browser(self, applications):
+        assert installed_browsers.mac.do_i_have_installed("pale-moon")
+        assert not installed_browsers.mac.do_i_have_installed("safari")
+        assert list(installed_browsers.mac.get_version_of("firefox"))[0] == {"version": "125.0.1"}
+        assert len(_get_mdfind_queries(applications)) == 3
+
+    def test_spotlight_is_missing(self, applications, tmp_path, monkeypatch):
+        # the application directories are scanned instead, never those of the machine running the tests
+        bundle = _create_mac_application(tmp_path / "Scanned", "Firefox", {
+            "CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox", "CFBundleName": "Firefox",
+            "CFBundleShortVersionString": "125.0.1"
+        })
+        monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", (str(tmp_path / "Scanned"),))
+        monkeypatch.setenv("PATH", str(applications / "missing"))
+        assert [browser["location"] for browser in installed_browsers.mac.browsers()] == [
+            str(bundle / "Contents" / "MacOS" / "firefox")
+        ]
+        assert installed_browsers.mac.do_i_have_installed("firefox")
+        assert not installed_browsers.mac.do_i_have_installed("chrome")
+
+
+# check that mac application directories are scanned when spotlight cannot help
+@pytest.mark.skipif(sys.platform == "win32", reason="unix-only")
+class TestMacApplicationScan:
+    @pytest.fixture
+    def volume(self, fake_mdfind, mac_cache, tmp_path, monkeypatch):
+        volume = tmp_path / "Volume"
+        monkeypatch.setenv("HOME", "/Users/tester")
+        monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", ("/Applications", "~/Applications"))
+        _create_mac_application(volume / "Applications", "Firefox", {
+            "CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox", "CFBundleName": "Firefox",
+            "CFBundleShortVersionString": "125.0.1"
+        })
+        _create_mac_application(volume / "Applications" / "Browsers", "Google Chrome", {
+            "CFBundleIdentifier": "com.google.Chrome", "CFBundleExecutable": "Google Chrome",
+            "CFBundleName": "Google Chrome", "KSVersion": "124.0.6367.60"
+        })
+        _create_mac_application(volume / "Applications" / "Browsers" / "Nightly", "Firefox Nightly", {
+            "CFBundleIdentifier": "org.mozilla.nightly", "CFBundleExecutable": "firefox", "CFBundleName": "Nightly",
+            "CFBundleShortVersionString": "127.0a1"
+        })
+        _create_mac_application(volume / "Users" / "tester" / "Applications", "Brave Browser", {
+            "CFBundleIdentifier": "com.brave.Browser", "CFBundleExecutable": "Brave Browser",
+            "CFBundleName": "Brave Browser", "CFBundleVersion": "124.1.65.114"
+        })
+        (volume / "Applications" / "Notes.txt").touch()
+        return volume
+
+    def test_scan_mounted_volume(self, volume, fake_mdfind):
+        found = {browser["name"]: browser for browser in installed_browsers.mac.browsers(root=str(volume))}
+        assert {name: browser["version"] for name, browser in found.items()} == {
+            "chrome": "124.0.6367.60", "firefox": "125.0.1", "brave": "124.1.65.114"
+        }
+        assert found["brave"]["location"] == str(
+            volume / "Users" / "tester" / "Applications" / "Brave Browser.app" / "Contents" / "MacOS" / "Brave Browser"
+        )
+        assert _get_mdfind_queries(fake_mdfind) == []
+
+    def test_scan_without_spotlight(self, volume, fake_mdfind, monkeypatch):
+        monkeypatch.setattr(installed_browsers.mac, "USE_SPOTLIGHT", False)
+        monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", (str(volume / "Applications"),))
+        assert [browser["name"] for browser in installed_browsers.mac.browsers()] == ["chrome", "firefox"]
+        assert installed_browsers.mac.do_i_have_installed("chrome")
+        assert _get_mdfind_queries(fake_mdfind) == []
+
+    @pytest.mark.parametrize("spotlight", ("failing", "stalled"))
+    def test_scan_after_spotlight(self, volume, fake_mdfind, monkeypatch, spotlight):
+        monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", (str(volume / "Applications"),))
+        mdfind = fake_mdfind.parent / "bin" / "mdfind"
+        if spotlight == "stalled":
+            mdfind.write_text("#!/bin/sh\nexec sleep 10\n")
+            monkeypatch.setattr(installed_browsers.mac, "SPOTLIGHT_TIMEOUT", 0.2)
+        else:
+            mdfind.write_text("#!/bin/sh\nexit 1\n")
+        started = time.monotonic()
+        assert [browser["name"] for browser in installed_browsers.mac.browsers()] == ["chrome", "firefox"]
+        assert asyncio.run(installed_browsers.mac.async_get_version_of("firefox")) == {"version": "125.0.1"}
+        assert time.monotonic() - started < 5
+
+    def test_empty_answer_is_scanned(self, volume, fake_mdfind, monkeypatch):
+        # spotlight answers nothing while indexing is disabled or rebuilt
+        monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", (str(volume / "Applications"),))
+        (fake_mdfind.parent / "bin" / "mdfind").write_text("#!/bin/sh\nexit 0\n")
+        assert [browser["name"] for browser in installed_browsers.mac.browsers()] == ["chrome", "firefox"]
+        assert installed_browsers.mac.do_i_have_installed("chrome")
+        assert list(installed_browsers.mac.get_version_of("firefox"))[0] == {"version": "125.0.1"}
+        assert asyncio.run(installed_browsers.mac.async_get_version_of("firefox")) == {"version": "125.0.1"}
+        assert not installed_browsers.mac.do_i_have_installed("safari")
+
+    def test_other_directories_are_scanned(self, volume, fake_mdfind, monkeypatch):
+        monkeypatch.setattr(installed_browsers.mac, "USE_SPOTLIGHT", False)
+        monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", (str(volume / "Missing"),))
+        assert not installed_browsers.mac.do_i_have_installed("firefox")
+        monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", (str(volume / "Applications"),))
+        assert installed_browsers.mac.do_i_have_installed("firefox")
+
+    def test_scan_is_kept_until_modified(self, volume, fake_mdfind, monkeypatch):
+        monkeypatch.setattr(installed_browsers.mac, "USE_SPOTLIGHT", False)
+        monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", (str(volume / "Applications"),))
+        read_info_plist = installed_browsers.mac._read_info_plist
+        with patch("installed_browsers.mac._read_info_plist", wraps=read_info_plist) as mock_read:
+            assert not installed_browsers.mac.do_i_have_installed("safari")
+            scanned = mock_read.call_count
+            assert not installed_browsers.mac.do_i_have_installed("safari")
+            assert not installed_browsers.mac.do_i_have_installed("opera")
+            assert mock_read.call_count == scanned
+        # a bundle installed one directory deeper modifies the subdirectory and is found
+        _create_mac_application(volume / "Applications" / "Browsers", "Safari", {
+            "CFBundleIdentifier": "com.apple.Safari", "CFBundleExecutable": "Safari", "CFBundleName": "Safari",
+            "CFBundleShortVersionString": "17.4"
+        })
+        _touch_later(volume / "Applications" / "Browsers")
+        assert installed_browsers.mac.do_i_have_installed("safari")
+
+
+# check that Info.plist files are parsed once and only their used keys are kept
+@pytest.mark.skipif(sys.platform == "win32", reason="unix-only")
+class TestMacInfoPlistCache:
+    @pytest.fixture
+    def firefox(self, fake_mdfind, mac_cache):
+        return _create_mac_application(fake_mdfind, "Firefox", {
+            "CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox", "CFBundleName": "Firefox",
+            "CFBundleShortVersionString": "125.0.1", "CFBundleDocumentTypes": [{"CFBundleTypeName": "HTML"}] * 100
+        })
+
+    def test_parsed_once(self, firefox):
+        with patch("plistlib.load", wraps=plistlib.load) as mock_load:
+            assert [browser["version"] for browser in installed_browsers.mac.browsers()] == ["125.0.1"]
+            assert installed_browsers.mac.do_i_have_installed("firefox")
+            assert list(installed_browsers.mac.get_details_of("firefox"))[0]["description"] == "Firefox"
+            assert list(installed_browsers.mac.get_version_of("firefox"))[0] == {"version": "125.0.1"}
+            assert mock_load.call_count == 1
+        assert installed_browsers.mac._read_info_plist(str(firefox)) == {
+            "CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox", "CFBundleName": "Firefox",
+            "CFBundleShortVersionString": "125.0.1"
+        }
+
+    def test_parsed_again_when_modified(self, firefox):
+        assert list(installed_browsers.mac.get_version_of("firefox"))[0] == {"version": "125.0.1"}
+        info = firefox / "Contents" / "Info.plist"
+        with open(info, "wb") as file:
+            plistlib.dump({"CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox",
+                           "CFBundleShortVersionString": "125.0.2"}, file)
+        os.utime(info, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        assert list(installed_browsers.mac.get_version_of("firefox"))[0] == {"version": "125.0.2"}
+
+    def test_bundle_without_executable(self, fake_mdfind, mac_cache):
+        _create_mac_application(fake_mdfind, "Safari", {"CFBundleIdentifier": "com.apple.Safari"})
+        assert not installed_browsers.mac.do_i_have_installed("safari")
+
+
+# check that the default mac browser is read from memoized LaunchServices preferences
+@pytest.mark.skipif(sys.platform == "win32", reason="unix-only")
+class TestMacDefaultBrowser:
+    @pytest.fixture
+    def preferences(self, fake_mdfind, mac_cache, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        _create_mac_application(fake_mdfind, "Firefox", {
+            "CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox", "CFBundleName": "Firefox",
+            "CFBundleShortVersionString": "125.0.1"
+        })
+        preferences = tmp_path / "home" / installed_browsers.mac.LAUNCH_SERVICES_PREFERENCES
+        preferences.parent.mkdir(parents=True)
+        self._set_https_handler(preferences, "org.mozilla.firefox")
+        return preferences
+
+    @staticmethod
+    def _set_https_handler(preferences: Path, role: str):
+        with open(preferences, "wb") as file:
+            plistlib.dump({"LSHandlers": [
+                {"LSHandlerContentType": "public.html", "LSHandlerRoleAll": "com.apple.safari"},
+                {"LSHandlerURLScheme": "https", "LSHandlerRoleAll": role,
+                 "LSHandlerPreferredVersions": {"LSHandlerRoleAll": "-"}},
+            ]}, file)
+
+    def test_preferences_are_read_once(self, preferences, fake_mdfind):
+        with patch("plistlib.load", wraps=plistlib.load) as mock_load:
+            assert installed_browsers.mac.what_is_the_default_browser() == DEFAULT_BROWSER_MAC
+            assert installed_browsers.mac.what_is_the_default_browser() == DEFAULT_BROWSER_MAC
+            assert [os.path.basename(call.args[0].name) for call in mock_load.call_args_list] == [
+                preferences.name, "Info.plist"
+            ]
+        self._set_https_handler(preferences, DUMMY_DEFAULT_BROWSER)
+        os.utime(preferences, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        assert installed_browsers.mac.what_is_the_default_browser() == DEFAULT_BROWSER_NOT_SUPPORTED
+
+    def test_found_bundles_are_reused(self, preferences, fake_mdfind):
+        assert [browser["name"] for browser in installed_browsers.mac.browsers()] == ["firefox"]
+        assert installed_browsers.mac.what_is_the_default_browser() == DEFAULT_BROWSER_MAC
+        assert len(_get_mdfind_queries(fake_mdfind)) == 1
+
+    def test_deleted_default_browser(self, preferences, fake_mdfind):
+        import shutil
+        assert [browser["name"] for browser in installed_browsers.mac.browsers()] == ["firefox"]
+        shutil.rmtree(fake_mdfind / "Firefox.app")
+        assert installed_browsers.mac.what_is_the_default_browser() == NO_DEFAULT_BROWSER
+        assert len(_get_mdfind_queries(fake_mdfind)) == 2
+
+
+# check that linux browsers are probed without a shell and within a timeout
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxProbe:
+    @pytest.mark.parametrize(
+        ("command", "executable_path"),
+        (
+            pytest.param("/usr/bin/google-chrome-stable %U", "/usr/bin/google-chrome-stable", id="url_list"),
+            pytest.param("firefox %u", "firefox", id="url"),
+            pytest.param("min --name=%c %F --icon %i", "min --name= --icon", id="inline_field_codes"),
+            pytest.param("opera --discount=100%%", "opera --discount=100%", id="percent"),
+            pytest.param('"/opt/my browser/browser" %U', "'/opt/my browser/browser'", id="quoted"),
+        ),
+    )
+    def test_field_codes_are_removed(self, command, executable_path):
+        assert installed_browsers.linux._get_executable_path({"Exec": command}) == executable_path
+
+    def test_env_prefix_is_applied(self, linux_applications):
+        executable = _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        executable.write_text("#!/bin/sh\necho \"Mozilla Firefox $FIREFOX_VERSION\"\n")
+        (linux_applications / "firefox.desktop").write_text(
+            f"[Desktop Entry]\nName=Firefox\nExec=env FIREFOX_VERSION=125.0 MOZ_ENABLE_WAYLAND=1 {executable} %u\n"
+        )
+        assert installed_browsers.get_version_of("firefox") == {"version": "125.0"}
+
+    def test_no_shell_is_used(self, linux_applications):
+        _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        with patch("subprocess.Popen", wraps=subprocess.Popen) as mock_popen:
+            assert installed_browsers.get_version_of("firefox") == {"version": "124.0"}
+            arguments = mock_popen.call_args.args[0]
+            assert arguments[-1] == "--version" and os.path.basename(arguments[0]) == "firefox"
+            assert not mock_popen.call_args.kwargs.get("shell")
+
+    def test_missing_executable_is_unknown(self, linux_applications):
+        (linux_applications / "firefox.desktop").write_text("[Desktop Entry]\nName=Firefox\nExec=/nowhere/firefox\n")
+        assert installed_browsers.get_version_of("firefox") == {"version": "unknown"}
+
+    @pytest.mark.parametrize("asynchronous", (False, True), ids=("sync", "async"))
+    def test_hanging_probe_is_killed(self, linux_applications, tmp_path, monkeypatch, asynchronous):
+        executable = _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        child = tmp_path / "child.pid"
+        executable.write_text(f"#!/bin/sh\nsleep 60 &\necho $! > {child}\nwait\n")
+        monkeypatch.setattr(installed_browsers.linux, "PROBE_TIMEOUT", 0.5)
+        if asynchronous:
+            version = asyncio.run(installed_browsers.async_get_version_of("firefox"))
+        else:
+            version = installed_browsers.get_version_of("firefox")
+        assert version == {"version": "unknown"}
+        # the whole process group is killed, the child does not survive the probe
+        self._assert_killed(int(child.read_text()))
+
+    @pytest.mark.parametrize("cancelled_by", ("wait_for", "early_stop"))
+    def test_cancelled_probe_is_killed(self, linux_applications, tmp_path, cancelled_by):
+        _create_linux_browser(linux_applications, "google-chrome", "Google Chrome", "123.0.6312.58")
+        executable = _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        child = tmp_path / "child.pid"
+        executable.write_text(f"#!/bin/sh\nsleep 60 &\necho $! > {child}\nwait\n")
+
+        async def cancel():
+            if cancelled_by == "wait_for":
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(installed_browsers.async_get_version_of("firefox"), 1.0)
+            else:
+                found = installed_browsers.linux.async_browsers()
+                assert (await found.__anext__())["name"] == "chrome"
+                while not child.exists():
+                    await asyncio.sleep(0.1)
+                await found.aclose()
+
+        asyncio.run(cancel())
+        self._assert_killed(int(child.read_text()))
+
+    @staticmethod
+    def _assert_killed(pid: int):
+        for _ in range(50):
+            if not Path(f"/proc/{pid}").exists() or "Z" in Path(f"/proc/{pid}/stat").read_text().split()[2]:
+                break
+            time.sleep(0.1)
+        else:
+            pytest.fail("child of the probe is still running")
+
+
+# check that the inventory answers every query from a single scan
+class TestInventory:
+    FOUND = [
+        {"name": "chrome", "description": "Google Chrome", "version": "123.0.6312.58", "location": "chrome"},
+        {"name": "firefox", "description": "Firefox", "version": "124.0", "location": "firefox"},
+    ]
+
+    @pytest.fixture
+    def mock_browsers(self):
+        with patch("installed_browsers.browsers", side_effect=lambda: iter(self.FOUND)) as mock_browsers:
+            yield mock_browsers
+
+    def test_queries_are_answered_from_one_scan(self, mock_browsers):
+        inventory = installed_browsers.snapshot()
+        assert inventory.do_i_have_installed("chrome")
+        assert not inventory.do_i_have_installed("dummy_browser")
+        assert "firefox" in inventory and len(inventory) == 2
+        assert inventory.give_me_details_of("firefox") == self.FOUND[1]
+        assert inventory.give_me_details_of("dummy_browser") == BROWSER_NOT_INSTALLED
+        assert inventory.get_version_of("chrome") == {"version": "123.0.6312.58"}
+        assert inventory.get_version_of("dummy_browser") == BROWSER_NOT_INSTALLED
+        assert inventory.browsers() == self.FOUND
+        assert mock_browsers.call_count == 1
+
+    def test_default_browser_is_determined_once(self, mock_browsers):
+        inventory = installed_browsers.snapshot()
+        with patch("installed_browsers.what_is_the_default_browser", return_value="Firefox") as mock_default:
+            assert inventory.what_is_the_default_browser() == "Firefox"
+            assert inventory.what_is_the_default_browser() == "Firefox"
+            assert mock_default.call_count == 1
+
+    def test_refresh(self, mock_browsers):
+        inventory = installed_browsers.snapshot()
+        timestamp = inventory.timestamp
+        self.FOUND = self.FOUND[:1]
+        assert inventory.refresh() is inventory
+        assert not inventory.do_i_have_installed("firefox")
+        assert inventory.timestamp >= timestamp
+        assert mock_browsers.call_count == 2
+
+
+# check release channels of browser names
+@pytest.mark.parametrize(
+    ("browser", "channel"),
+    (
+        pytest.param("chrome", Channel.STABLE, id="chrome"),
+        pytest.param("opera-stable", Channel.STABLE, id="opera-stable"),
+        pytest.param("pale-moon", Channel.STABLE, id="pale-moon"),
+        pytest.param("msedge-beta", Channel.BETA, id="msedge-beta"),
+        pytest.param("msedge-dev", Channel.DEV, id="msedge-dev"),
+        pytest.param("opera-developer", Channel.DEV, id="opera-developer"),
+        pytest.param("vivaldi-snapshot", Channel.DEV, id="vivaldi-snapshot"),
+        pytest.param("brave-nightly", Channel.NIGHTLY, id="brave-nightly"),
+        pytest.param("chrome-canary", Channel.CANARY, id="chrome-canary"),
+    ),
+)
+def test_browser_channel(browser, channel):
+    assert get_channel(browser) == channel
+
+
+# check that linux browsers are filtered before they are probed
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxFilters:
+    @pytest.fixture(autouse=True)
+    def applications(self, linux_applications):
+        _create_linux_browser(linux_applications, "google-chrome", "Google Chrome", "123.0.6312.58")
+        _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        _create_linux_browser(linux_applications, "microsoft-edge-beta", "Microsoft Edge Beta", "124.0.2478.10")
+
+    def test_names(self):
+        with patch("installed_browsers.linux._read_desktop_entry",
+                   wraps=installed_browsers.linux._read_desktop_entry) as mock_read:
+            found = [browser["name"] for browser in installed_browsers.browsers(names=["firefox"])]
+            assert found == ["firefox"]
+            assert mock_read.call_count == 1
+
+    def test_channels(self):
+        found = {browser["name"] for browser in installed_browsers.browsers(channels=[Channel.BETA, Channel.DEV])}
+        assert found == {"msedge-beta"}
+        found = {browser["name"] for browser in installed_browsers.browsers(channels=Channel.STABLE)}
+        assert found == {"chrome", "firefox"}
+
+    def test_without_versions(self):
+        with patch("installed_browsers.linux._probe_version") as mock_probe:
+            found = list(installed_browsers.browsers(with_versions=False))
+            assert {browser["version"] for browser in found} == {""}
+            assert len(found) == 3
+            mock_probe.assert_not_called()
+
+    def test_get_versions_of(self):
+        with patch("installed_browsers.linux._probe_version", return_value="124.0") as mock_probe:
+            assert installed_browsers.get_versions_of(["firefox", "min"]) == {
+                "firefox": {"version": "124.0"}, "min": BROWSER_NOT_INSTALLED
+            }
+            assert mock_probe.call_count == 1
+            # a single name is accepted like by the filters of browsers
+            assert installed_browsers.get_versions_of("firefox") == {"firefox": {"version": "124.0"}}
+
+
+# check that linux browsers resolving to the same executable are probed once
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxProbeDeduplication:
+    @pytest.fixture(autouse=True)
+    def applications(self, linux_applications):
+        executable = _create_linux_browser(linux_applications, "chromium", "Chromium", "124.0.6367.60")
+        alias = executable.parent / "chromium-browser"
+        alias.symlink_to(executable)
+        (linux_applications / "chromium-browser.desktop").write_text(
+            f"[Desktop Entry]\nName=Chromium Web Browser\nExec={alias} %U\n"
+        )
+        (linux_applications / "brave-browser.desktop").write_text(
+            f"[Desktop Entry]\nName=Brave\nExec=env BRAVE=1 {alias} %U\n"
+        )
+        _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+
+    def test_details_of_aliases(self):
+        with patch("installed_browsers.linux._probe_version", return_value="124.0.6367.60") as mock_probe:
+            details = [entity for entity in installed_browsers.linux.get_details_of("chromium")
+                       if isinstance(entity, dict)]
+            assert [browser["description"] for browser in details] == ["Chromium", "Chromium Web Browser"]
+            assert mock_probe.call_count == 1
+
+    @pytest.mark.parametrize("ordered", (False, True), ids=("as_completed", "ordered"))
+    def test_browsers_sharing_executable(self, ordered):
+        with patch("installed_browsers.linux._probe_version", return_value="124.0") as mock_probe:
+            found = [browser["name"] for browser in installed_browsers.linux.browsers(ordered=ordered)]
+            assert sorted(found) == ["brave", "chromium", "firefox"]
+            if ordered:
+                assert found == ["chromium", "firefox", "brave"]
+            assert mock_probe.call_count == 2
+
+    def test_async_browsers_sharing_executable(self):
+        async def collect():
+            return [browser async for browser in installed_browsers.linux.async_browsers()]
+
+        with patch("installed_browsers.linux._async_probe_version", return_value="124.0") as mock_probe:
+            assert len(asyncio.run(collect())) == 3
+            assert mock_probe.call_count == 2
+
+
+# check that snap versions are read from snap metadata without running the snap
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxSnap:
+    @pytest.fixture(autouse=True)
+    def snaps(self, linux_applications, tmp_path, monkeypatch):
+        snap_dir = tmp_path / "snap"
+        (snap_dir / "bin").mkdir(parents=True)
+        # every snap command links to the snap launcher
+        launcher = tmp_path / "usr" / "bin" / "snap"
+        launcher.parent.mkdir(parents=True)
+        launcher.write_text("#!/bin/sh\necho 'snap 2.61'\n")
+        launcher.chmod(0o755)
+        for snap, desktop_name, description, version in (
+            ("firefox", "firefox_firefox", "Firefox", "'124.0.1-1'"),
+            ("chromium", "chromium_chromium", "Chromium", "124.0.6367.60"),
+        ):
+            (snap_dir / "bin" / snap).symlink_to(launcher)
+            revision = snap_dir / snap / "4259"
+            (revision / "meta").mkdir(parents=True)
+            (revision / "meta" / "snap.yaml").write_text(f"name: {snap}\nversion: {version}\nsummary: {description}\n")
+            (snap_dir / snap / "current").symlink_to("4259")
+            (linux_applications / f"{desktop_name}.desktop").write_text(
+                f"[Desktop Entry]\nName={description}\nExec=env BAMF_DESKTOP_FILE_HINT={desktop_name}.desktop "
+                f"{snap_dir / 'bin' / snap} %u\n"
+            )
+        monkeypatch.setattr(installed_browsers.linux, "SNAP_DIR", str(snap_dir))
+        monkeypatch.setattr(installed_browsers.linux, "SNAP_BIN_DIR", str(snap_dir / "bin"))
+        return snap_dir
+
+    def test_snap_is_not_run(self):
+        with patch("installed_browsers.linux._probe_version") as mock_probe:
+            found = {browser["name"]: browser["version"] for browser in installed_browsers.browsers()}
+            assert found == {"firefox": "124.0.1", "chromium": "124.0.6367.60"}
+            mock_probe.assert_not_called()
+
+    def test_async_snap_is_not_run(self):
+        with patch("installed_browsers.linux._async_probe_version") as mock_probe:
+            assert asyncio.run(installed_browsers.async_get_version_of("chromium")) == {"version": "124.0.6367.60"}
+            mock_probe.assert_not_called()
+
+    def test_refreshed_snap_is_read_again(self, snaps):
+        assert installed_browsers.get_version_of("firefox") == {"version": "124.0.1"}
+        revision = snaps / "firefox" / "4300"
+        (revision / "meta").mkdir(parents=True)
+        (revision / "meta" / "snap.yaml").write_text("name: firefox\nversion: 125.0-2\n")
+        (snaps / "firefox" / "current").unlink()
+        (snaps / "firefox" / "current").symlink_to("4300")
+        assert installed_browsers.get_version_of("firefox") == {"version": "125.0"}
+
+    def test_missing_metadata_falls_back_to_probe(self, snaps):
+        (snaps / "firefox" / "current" / "meta" / "snap.yaml").unlink()
+        assert installed_browsers.get_version_of("firefox") == {"version": "2.61"}
+
+
+# check that flatpak browsers are found and their versions are read from their appstream files
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxFlatpak:
+    @pytest.fixture(autouse=True)
+    def installation(self, linux_applications, tmp_path, monkeypatch):
+        installation = tmp_path / "flatpak"
+        exports = installation / "exports" / "share" / "applications"
+        exports.mkdir(parents=True)
+        for application_id, description, appstream_file, version in (
+                ("org.mozilla.firefox", "Firefox", "metainfo/org.mozilla.firefox.metainfo.xml", "124.0.1"),
+                ("com.google.Chrome", "Google Chrome", "appdata/com.google.Chrome.appdata.xml", "123.0.6312.58")):
+            deployment = installation / "app" / application_id / "x86_64" / "stable" / "3f2a"
+            (deployment / "files" / "share" / appstream_file).parent.mkdir(parents=True)
+            (deployment / "files" / "share" / appstream_file).write_text(
+                f'<?xml version="1.0" encoding="UTF-8"?>\n<component type="desktop-application">\n'
+                f'  <id>{application_id}</id>\n  <releases>\n    <release version="{version}" date="2024-03-22"/>\n'
+                f'    <release version="1.0" date="2020-01-01"/>\n  </releases>\n</component>\n'
+            )
+            (installation / "app" / application_id / "current").symlink_to("x86_64/stable")
+            (installation / "app" / application_id / "x86_64" / "stable" / "active").symlink_to("3f2a")
+            (exports / f"{application_id}.desktop").write_text(
+                f"[Desktop Entry]\nName={description}\nExec=/usr/bin/flatpak run --branch=stable --arch=x86_64 "
+                f"--command=browser --file-forwarding {application_id} @@u %U @@\n"
+            )
+        monkeypatch.setattr(installed_browsers.linux, "BROWSER_LOCATIONS", (str(linux_applications), str(exports)))
+        monkeypatch.setattr(installed_browsers.linux, "FLATPAK_INSTALLATIONS", (str(installation),))
+        return installation
+
+    def test_flatpak_is_not_run(self):
+        with patch("installed_browsers.linux._probe_version") as mock_probe:
+            assert sorted(installed_browsers.browsers(), key=lambda browser: browser["name"]) == [
+                {"name": "chrome", "description": "Google Chrome", "version": "123.0.6312.58",
+                 "location": "flatpak run com.google.Chrome"},
+                {"name": "firefox", "description": "Firefox", "version": "124.0.1",
+                 "location": "flatpak run org.mozilla.firefox"},
+            ]
+            mock_probe.assert_not_called()
+
+    def test_async_flatpak_is_not_run(self):
+        with patch("installed_browsers.linux._async_probe_version") as mock_probe:
+            assert asyncio.run(installed_browsers.async_get_version_of("firefox")) == {"version": "124.0.1"}
+            mock_probe.assert_not_called()
+
+    def test_updated_flatpak_is_read_again(self, installation):
+        assert installed_browsers.get_version_of("firefox") == {"version": "124.0.1"}
+        active = installation / "app" / "org.mozilla.firefox" / "x86_64" / "stable" / "active"
+        appstream_file = installation / "app" / "org.mozilla.firefox" / "x86_64" / "stable" / "5b1c" / "files" / \
+            "share" / "metainfo" / "org.mozilla.firefox.metainfo.xml"
+        appstream_file.parent.mkdir(parents=True)
+        appstream_file.write_text('<component><releases><release version="125.0"/></releases></component>')
+        active.unlink()
+        active.symlink_to("5b1c")
+        assert installed_browsers.get_version_of("firefox") == {"version": "125.0"}
+
+    def test_missing_deployment_falls_back_to_probe(self, installation):
+        (installation / "app" / "org.mozilla.firefox" / "current").unlink()
+        with patch("installed_browsers.linux._probe_version", return_value="124.0") as mock_probe:
+            assert installed_browsers.get_version_of("firefox") == {"version": "124.0"}
+            mock_probe.assert_called_once_with("flatpak run org.mozilla.firefox")
+
+
+# create an rpm header blob with string tags, as stored in the rpm sqlite database
+def _create_rpm_header(tags: Dict[int, str]) -> bytes:
+    import struct
+    index, data = b"", b""
+    for tag, value in tags.items():
+        index += struct.pack(">iiii", tag, 6, len(data), 1)
+        data += value.encode() + b"\0"
+    return struct.pack(">ii", len(tags), len(data)) + index + data
+
+
+# check that versions of browsers installed from packages are read from the package database
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxPackageDatabase:
+    DPKG_STATUS = (
+        "Package: google-chrome-stable\nStatus: install ok installed\nArchitecture: amd64\n"
+        "Version: 123.0.6312.58-1\nDescription: The web browser from Google\n continued description\n\n"
+        "Package: firefox\nStatus: install ok installed\nVersion: 1:1snap1-0ubuntu5\n\n"
+        "Package: microsoft-edge-beta\nStatus: deinstall ok config-files\nVersion: 124.0.2478.10-1\n\n"
+        "Package: vivaldi-stable\nStatus: install ok installed\nVersion: 6.6.3271.53-1"
+    )
+
+    @pytest.fixture(autouse=True)
+    def databases(self, linux_applications, tmp_path, monkeypatch):
+        for desktop_name, description in (("google-chrome", "Google Chrome"), ("firefox", "Firefox"),
+                                          ("microsoft-edge-beta", "Microsoft Edge Beta"),
+                                          ("vivaldi-stable", "Vivaldi"), ("brave-browser", "Brave")):
+            _create_linux_browser(linux_applications, desktop_name, description, "0.0.1")
+        status = tmp_path / "status"
+        status.write_text(self.DPKG_STATUS)
+        monkeypatch.setattr(installed_browsers.linux, "DPKG_STATUS", str(status))
+        monkeypatch.setattr(installed_browsers.linux, "RPM_DATABASES", (str(tmp_path / "rpmdb.sqlite"),))
+        monkeypatch.setattr(installed_browsers.linux, "PACKAGE_PREFIXES", (str(tmp_path / "bin"),))
+        return tmp_path
+
+    def test_versions_are_read_from_dpkg(self):
+        found = {browser["name"]: browser["version"] for browser in installed_browsers.browsers()}
+        # transitional snap packages and removed packages are probed
+        assert found == {"chrome": "123.0.6312.58", "firefox": "0.0.1", "msedge-beta": "0.0.1",
+                         "vivaldi-stable": "6.6.3271.53", "brave": "0.0.1"}
+
+    def test_versions_are_read_from_rpm(self, databases):
+        import sqlite3
+        with sqlite3.connect(databases / "rpmdb.sqlite") as connection:
+            connection.execute("CREATE TABLE Packages (hnum INTEGER PRIMARY KEY AUTOINCREMENT, blob BLOB NOT NULL)")
+            for name, version in (("brave-browser", "1.64.113"), ("bash", "5.2.26")):
+                connection.execute("INSERT INTO Packages (blob) VALUES (?)",
+                                   (_create_rpm_header({1000: name, 1001: version, 1002: "1"}),))
+        connection.close()
+        assert installed_browsers.get_version_of("brave") == {"version": "1.64.113"}
+        assert installed_browsers.get_version_of("chrome") == {"version": "123.0.6312.58"}
+
+    def test_database_is_read_once(self, databases):
+        with patch("installed_browsers.linux._read_dpkg_status",
+                   wraps=installed_browsers.linux._read_dpkg_status) as mock_read:
+            installed_browsers.linux.clear_cache()
+            list(installed_browsers.browsers())
+            assert installed_browsers.get_version_of("chrome") == {"version": "123.0.6312.58"}
+            assert mock_read.call_count == 1
+            # an upgrade modifies the database, it is read again
+            (databases / "status").write_text(self.DPKG_STATUS.replace("123.0.6312.58-1", "124.0.6367.60-1"))
+            os.utime(databases / "status", ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+            (databases / "bin" / "google-chrome").write_text("#!/bin/sh\necho 'Google Chrome 0.0.2'\n")
+            assert installed_browsers.get_version_of("chrome") == {"version": "124.0.6367.60"}
+            assert mock_read.call_count == 2
+
+    @pytest.mark.parametrize(
+        ("version", "upstream_version"),
+        (
+            pytest.param("123.0.6312.58-1", "123.0.6312.58", id="revision"),
+            pytest.param("1:124.0.1-0ubuntu1", "124.0.1", id="epoch"),
+            pytest.param("124.0.1~build1-1", "124.0.1", id="tilde"),
+            pytest.param("124.0+build1-0ubuntu0.22.04.1", "124.0", id="plus"),
+            pytest.param("1.64.113", "1.64.113", id="upstream"),
+        ),
+    )
+    def test_upstream_version(self, version, upstream_version):
+        assert installed_browsers.linux._get_upstream_version(version) == upstream_version
+
+
+# create a 64 bit little endian ELF executable with a .rodata section
+def _create_elf_executable(path: Path, rodata: bytes) -> Path:
+    import struct
+    section_names = b"\0.rodata\0.shstrtab\0"
+    names_offset = 64 + len(rodata)
+    section_offset = names_offset + len(section_names)
+    header = b"\x7fELF" + bytes((2, 1, 1)) + bytes(9) + struct.pack(
+        "<HHIQQQIHHHHHH", 2, 62, 1, 0, 0, section_offset, 0, 64, 0, 0, 64, 3, 2
+    )
+    sections = bytes(64) + struct.pack("<IIQQQQIIQQ", 1, 1, 2, 0, 64, len(rodata), 0, 0, 1, 0) + \
+        struct.pack("<IIQQQQIIQQ", 9, 3, 0, 0, names_offset, len(section_names), 0, 0, 1, 0)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(header + rodata + section_names + sections)
+    path.chmod(0o755)
+    return path
+
+
+# check that versions are read from the installation of a browser without running it
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxStaticVersion:
+    @pytest.fixture(autouse=True)
+    def mock_probe(self, linux_applications):
+        with patch("installed_browsers.linux._probe_version", return_value="unknown") as mock_probe:
+            yield mock_probe
+
+    def test_application_ini(self, linux_applications, tmp_path, mock_probe):
+        executable = _create_linux_browser(linux_applications, "firefox", "Firefox", "0.0.1")
+        (executable.parent / "application.ini").write_text(
+            "[App]\nVendor=Mozilla\nName=Firefox\nVersion=124.0.1\nBuildID=20240321230221\n"
+        )
+        assert installed_browsers.get_version_of("firefox") == {"version": "124.0.1"}
+        mock_probe.assert_not_called()
+
+    def test_platform_ini(self, linux_applications, tmp_path, mock_probe):
+        installation_dir = tmp_path / "lib" / "firefox-esr"
+        installation_dir.mkdir(parents=True)
+        (installation_dir / "platform.ini").write_text("[Build]\nBuildID=20240318000000\nMilestone=115.9.1\n")
+        executable = _create_linux_browser(linux_applications, "firefox", "Firefox", "0.0.1")
+        executable.rename(installation_dir / "firefox-esr")
+        executable.symlink_to(installation_dir / "firefox-esr")
+        assert installed_browsers.get_version_of("firefox") == {"version": "115.9.1"}
+        mock_probe.assert_not_called()
+
+    def test_elf_rodata(self, linux_applications, tmp_path, mock_probe):
+        # the browser is a wrapper script, the version is embedded in its sibling binary
+        installation_dir = tmp_path / "opt" / "google" / "chrome"
+        _create_elf_executable(installation_dir / "chrome",
+                               b"\0V8 12.4.254.15\0Chrome/%s\0" + b"124.0.6367.60\0" + b"1.2.3.4\0")
+        wrapper = _create_linux_browser(linux_applications, "google-chrome", "Google Chrome", "0.0.1")
+        wrapper.write_text('#!/bin/bash\nHERE="$(dirname "$(readlink -f "$0")")"\nexec -a "$0" "$HERE/chrome" "$@"\n')
+        wrapper.rename(installation_dir / "google-chrome")
+        wrapper.symlink_to(installation_dir / "google-chrome")
+        assert installed_browsers.get_version_of("chrome") == {"version": "124.0.6367.60"}
+        mock_probe.assert_not_called()
+
+    def test_sibling_of_another_browser_is_ignored(self, linux_applications, tmp_path, mock_probe):
+        executable = _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        chromium = _create_elf_executable(executable.parent / "chromium", b"\0Chromium\0" b"124.0.6367.60\0")
+        (linux_applications / "chromium.desktop").write_text(f"[Desktop Entry]\nName=Chromium\nExec={chromium}\n")
+        mock_probe.return_value = "124.0"
+        assert installed_browsers.get_version_of("firefox") == {"version": "124.0"}
+        assert installed_browsers.get_version_of("chromium") == {"version": "124.0.6367.60"}
+
+    @pytest.mark.parametrize("launcher", ("snap", "flatpak"))
+    def test_launcher_is_not_read(self, linux_applications, tmp_path, mock_probe, launcher):
+        executable = _create_elf_executable(tmp_path / "bin" / launcher, b"\0Chromium\0" b"124.0.6367.60\0")
+        (executable.parent / "application.ini").write_text("[App]\nVersion=124.0.1\n")
+        assert installed_browsers.linux._get_static_version(f"{executable} run org.chromium.Chromium") is None
+
+    def test_only_whole_versions_are_read(self, linux_applications, tmp_path, mock_probe):
+        rodata = b"\0".join((b"", b"1.0.0", b"v8.0.1234", b"9124.0.6367.60", b"1.24.0.6367.60", b"124.0.6367.60.1",
+                              b"Chromium 124.0.6367.60", b""))
+        chromium = _create_elf_executable(tmp_path / "chromium" / "chromium", rodata)
+        assert installed_browsers.linux._get_static_version(str(chromium)) == "124.0.6367.60"
+
+    def test_async_metadata_is_read_in_thread(self, linux_applications):
+        _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        threads = []
+
+        def read_metadata(executable_path):
+            threads.append(threading.current_thread())
+            return "124.0.1"
+
+        with patch("installed_browsers.linux._get_metadata_version", side_effect=read_metadata):
+            assert asyncio.run(installed_browsers.async_get_version_of("firefox")) == {"version": "124.0.1"}
+        assert threads and threading.main_thread() not in threads
+
+    def test_version_outside_rodata_is_ignored(self, linux_applications, tmp_path, mock_probe):
+        executable = _create_elf_executable(tmp_path / "chromium" / "chromium", b"\0Chromium\0")
+        with open(executable, "ab") as file:
+            file.write(b"124.0.6367.60\0")
+        (linux_applications / "chromium.desktop").write_text(f"[Desktop Entry]\nName=Chromium\nExec={executable}\n")
+        assert installed_browsers.get_version_of("chromium") == {"version": "unknown"}
+        mock_probe.assert_called_once()
+
+
+# check that the default linux browser is determined without running xdg-settings
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxDefaultBrowser:
+    @pytest.fixture(autouse=True)
+    def applications(self, linux_applications, tmp_path):
+        _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+        _create_linux_browser(linux_applications, "google-chrome", "Google Chrome", "123.0.6312.58")
+        (tmp_path / "config").mkdir()
+        (tmp_path / "xdg").mkdir()
+
+    @pytest.fixture
+    def mock_xdg_settings(self):
+        with patch("subprocess.check_output", return_value=b"firefox.desktop\n") as mock_check_output:
+            yield mock_check_output
+
+    def test_user_mimeapps_list_wins(self, tmp_path, linux_applications, mock_xdg_settings):
+        (linux_applications / "mimeapps.list").write_text(
+            "[Default Applications]\nx-scheme-handler/https=firefox.desktop\n"
+        )
+        (tmp_path / "config" / "mimeapps.list").write_text(
+            "[Added Associations]\nx-scheme-handler/https=firefox.desktop;\n\n"
+            "[Default Applications]\ntext/html=firefox.desktop\n"
+            "x-scheme-handler/https=missing.desktop;google-chrome.desktop;\n"
+        )
+        assert installed_browsers.what_is_the_default_browser() == "Google Chrome"
+        mock_xdg_settings.assert_not_called()
+
+    def test_desktop_specific_mimeapps_list_wins(self, tmp_path, monkeypatch, mock_xdg_settings):
+        monkeypatch.setenv("XDG_CURRENT_DESKTOP", "ubuntu:GNOME")
+        (tmp_path / "config" / "mimeapps.list").write_text(
+            "[Default Applications]\nx-scheme-handler/https=firefox.desktop\n"
+        )
+        (tmp_path / "xdg" / "gnome-mimeapps.list").write_text(
+            "[Default Applications]\nx-scheme-handler/https=google-chrome.desktop\n"
+        )
+        assert installed_browsers.what_is_the_default_browser() == "Firefox"
+        (tmp_path / "config" / "gnome-mimeapps.list").write_text(
+            "[Default Applications]\nx-scheme-handler/https=google-chrome.desktop\n"
+        )
+        assert installed_browsers.what_is_the_default_browser() == "Google Chrome"
+        mock_xdg_settings.assert_not_called()
+
+    def test_alternatives(self, tmp_path, mock_xdg_settings):
+        alternative = tmp_path / "alternatives" / "x-www-browser"
+        alternative.parent.mkdir()
+        alternative.symlink_to(tmp_path / "bin" / "google-chrome")
+        assert installed_browsers.what_is_the_default_browser() == "Google Chrome"
+        mock_xdg_settings.assert_not_called()
+
+    def test_xdg_settings_is_the_last_resort(self, mock_xdg_settings):
+        assert installed_browsers.what_is_the_default_browser() == "Firefox"
+        mock_xdg_settings.assert_called_once()
+
+    def test_default_is_kept_until_a_file_changes(self, tmp_path, mock_xdg_settings):
+        mimeapps_list = tmp_path / "config" / "mimeapps.list"
+        mimeapps_list.write_text("[Default Applications]\nx-scheme-handler/https=firefox.desktop\n")
+        with patch("installed_browsers.linux._find_default_in_mimeapps_lists",
+                   wraps=installed_browsers.linux._find_default_in_mimeapps_lists) as mock_find:
+            assert installed_browsers.what_is_the_default_browser() == "Firefox"
+            assert installed_browsers.what_is_the_default_browser() == "Firefox"
+            assert mock_find.call_count == 1
+            mimeapps_list.write_text("[Default Applications]\nx-scheme-handler/https=google-chrome.desktop\n")
+            os.utime(mimeapps_list, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+            assert installed_browsers.what_is_the_default_browser() == "Google Chrome"
+            assert mock_find.call_count == 2
+
+
+# in-memory registry behaving like winreg, registry calls are counted
+class FakeWinreg:
+    HKEY_CURRENT_USER = 0x80000001
+    HKEY_LOCAL_MACHINE = 0x80000002
+    KEY_READ = 0x20019
+    KEY_WOW64_32KEY = 0x0200
+    KEY_WOW64_64KEY = 0x0100
+    REG_SZ = 1
+
+    class Key:
+        def __init__(self, node: Dict):
+            self.node = node
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def Close(self):
+            pass
+
+    def __init__(self):
+        from collections import Counter
+        self.hives = {self.HKEY_CURRENT_USER: self._create_node(), self.HKEY_LOCAL_MACHINE: self._create_node()}
+        self.calls = Counter()
+
+    @staticmethod
+    def _create_node() -> Dict:
+        return {"keys": {}, "values": {}}
+
+    # add a key with its default value and named values, keys are case-insensitive like in the registry
+    # the last write time of a key changes when a subkey is created or a value is set
+    def add(self, hive: int, path: str, default: str = None, **values):
+        node = self.hives[hive]
+        for part in path.split("\\"):
+            name = next((name for name in node["keys"] if name.casefold() == part.casefold()), None)
+            if name is None:
+                name = part
+                node["modified"] = time.time_ns()
+            node = node["keys"].setdefault(name, self._create_node())
+        if default is not None:
+            node["values"][""] = default
+        node["values"].update(values)
+        if default is not None or values:
+            node["modified"] = time.time_ns()
+
+    # delete a key together with its subkeys
+    def delete(self, hive: int, path: str):
+        parent, _, name = path.rpartition("\\")
+        self._find(hive, parent)["keys"].pop(name)
+
+    def _find(self, key, sub_key: str) -> Dict:
+        node = self.hives[key] if isinstance(key, int) else key.node
+        for part in (sub_key or "").split("\\"):
+            if not part:
+                continue
+            name = next((name for name in node["keys"] if name.casefold() == part.casefold()), None)
+            if name is None:
+                raise FileNotFoundError(2, "The system cannot find the file specified")
+            node = node["keys"][name]
+        return node
+
+    def OpenKey(self, key, sub_key, reserved=0, access=KEY_READ):
+        self.calls["OpenKey", sub_key] += 1
+        return self.Key(self._find(key, sub_key))
+
+    OpenKeyEx = OpenKey
+
+    def CloseKey(self, key):
+        pass
+
+    def EnumKey(self, key, index):
+        self.calls["EnumKey"] += 1
+        names = list(key.node["keys"])
+        if index >= len(names):
+            raise OSError(259, "No more data is available")
+        return names[index]
+
+    def QueryInfoKey(self, key):
+        self.calls["QueryInfoKey"] += 1
+        return len(key.node["keys"]), len(key.node["values"]), key.node.get("modified", 0)
+
+    def QueryValue(self, key, sub_key):
+        self.calls["QueryValue"] += 1
+        return self._find(key, sub_key)["values"].get("", "")
+
+    def QueryValueEx(self, key, value_name):
+        self.calls["QueryValueEx"] += 1
+        if value_name not in key.node["values"]:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        return key.node["values"][value_name], self.REG_SZ
+
+
+# fake registry of a 64 bit windows, executables are empty files and their versions are not read by win32api
+@pytest.fixture
+def fake_winreg(monkeypatch):
+    registry = FakeWinreg()
+    monkeypatch.setattr(installed_browsers.windows, "winreg", registry, raising=False)
+    monkeypatch.setattr(installed_browsers.windows.platform, "architecture", lambda *args: ("64bit", "WindowsPE"))
+    installed_browsers.windows.clear_cache()
+    yield registry
+    installed_browsers.windows.clear_cache()
+
+
+# register a browser in StartMenuInternet of a hive, the executable must exist
+def _register_windows_browser(registry: FakeWinreg, hive: int, subkey: str, description: str, location: Path | str):
+    registry.add(hive, rf"Software\Clients\StartMenuInternet\{subkey}", description)
+    registry.add(hive, rf"Software\Clients\StartMenuInternet\{subkey}\shell\open\command", f'"{location}"')
+
+
+# register duckduckgo as an AppX package of the current user
+def _register_windows_duckduckgo(registry: FakeWinreg, location: Path | str):
+    prog_id = "AppXxj5p0ah8bqw3ys3c1kjsffb6bdsrt4ws"
+    registry.add(registry.HKEY_CURRENT_USER, rf"Software\Classes\{prog_id}", prog_id)
+    registry.add(registry.HKEY_CURRENT_USER, rf"Software\Classes\{prog_id}\Application",
+                 AppUserModelID=f"DuckDuckGo.{DESKTOP_BROWSER}_ya2fgkz3nks94!DuckDuckGo.Browser",
+                 ApplicationName=DEFAULT_BROWSER_WINDOWS_DUCK)
+    registry.add(registry.HKEY_CURRENT_USER, rf"Software\Classes\{prog_id}\shell\open\command", f'"{location}"')
+    registry.add(registry.HKEY_CURRENT_USER, rf"{installed_browsers.windows.APPX_PACKAGES}"
+                 rf"\DuckDuckGo.{DESKTOP_BROWSER}_0.134.4.0_x64__ya2fgkz3nks94\App\Capabilities\URLAssociations",
+                 http=prog_id, https=prog_id)
+    return prog_id
+
+
+# check that both hives are enumerated once and merged without duplicates
+class TestWindowsUniqueBrowsers:
+    @pytest.fixture
+    def mock_version(self):
+        with patch("installed_browsers.windows._create_browser_version", return_value="124.0.6367.60") as mock_version:
+            yield mock_version
+
+    @pytest.fixture(autouse=True)
+    def registry(self, fake_winreg, tmp_path):
+        chrome = tmp_path / "Google" / "Chrome" / "Application" / "chrome.exe"
+        for location in (chrome, tmp_path / "Mozilla Firefox" / "firefox.exe",
+                         tmp_path / "Microsoft" / "Edge" / "Application" / "msedge.exe"):
+            location.parent.mkdir(parents=True, exist_ok=True)
+            location.touch()
+        _register_windows_browser(fake_winreg, fake_winreg.HKEY_CURRENT_USER, "Google Chrome", "Google Chrome", chrome)
+        _register_windows_browser(fake_winreg, fake_winreg.HKEY_CURRENT_USER, "FIREFOX.EXE", "Mozilla Firefox",
+                                  tmp_path / "Mozilla Firefox" / "firefox.exe")
+        # the same chrome registered for the local machine as well
+        _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, "Google Chrome", "Google Chrome",
+                                  Path(str(chrome).replace("Chrome", "CHROME")) if sys.platform == "win32" else chrome)
+        _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, "Microsoft Edge", "Microsoft Edge",
+                                  tmp_path / "Microsoft" / "Edge" / "Application" / "msedge.exe")
+        # a second registration of the same executable
+        _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, "Chromium", "Chromium", chrome)
+        return fake_winreg
+
+    def test_hives_are_merged(self, registry, mock_version):
+        found = list(installed_browsers.windows.browsers())
+        assert [browser["name"] for browser in found] == ["chrome", "firefox", "msedge", "chromium"]
+        assert {browser["version"] for browser in found} == {"124.0.6367.60"}
+        # every hive is enumerated once and every executable is read once
+        assert registry.calls["OpenKey", r"Software\Clients\StartMenuInternet"] == 2
+        assert mock_version.call_count == 3
+
+    def test_without_versions(self, mock_version):
+        found = list(installed_browsers.windows.browsers(with_versions=False))
+        assert len(found) == 4 and {browser["version"] for browser in found} == {""}
+        mock_version.assert_not_called()
+
+    def test_names(self, registry, mock_version):
+        found = list(installed_browsers.windows.browsers(names=["msedge"]))
+        assert [browser["name"] for browser in found] == ["msedge"]
+        assert mock_version.call_count == 1
+
+
+# check that windows queries are answered from one registry snapshot
+class TestWindowsRegistrySnapshot:
+    @pytest.fixture(autouse=True)
+    def registry(self, fake_winreg, tmp_path):
+        for subkey, description in (("Google Chrome", "Google Chrome"), ("Microsoft Edge", "Microsoft Edge")):
+            location = tmp_path / f"{subkey}.exe"
+            location.touch()
+            _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, subkey, description, location)
+        return fake_winreg
+
+    @pytest.fixture
+    def mock_version(self):
+        with patch("installed_browsers.windows._create_browser_version", return_value="124.0.6367.60") as mock_version:
+            yield mock_version
+
+    def test_queries_share_the_snapshot(self, registry, mock_version, monkeypatch):
+        mock_architecture = Mock(return_value=("64bit", "WindowsPE"))
+        monkeypatch.setattr(installed_browsers.windows.platform, "architecture", mock_architecture)
+        windows = installed_browsers.windows
+        assert windows.do_i_have_installed("chrome")
+        assert not windows.do_i_have_installed("firefox")
+        assert not windows.do_i_have_installed("dummy_browser")
+        assert [list(found) for found in windows.get_details_of("msedge")] == [[
+            {"name": "msedge", "description": "Microsoft Edge", "version": "124.0.6367.60",
+             "location": ANY}
+        ]]
+        assert [list(found) for found in windows.get_version_of("msedge")] == [[{"version": "124.0.6367.60"}]]
+        assert [list(found) for found in windows.get_version_of("firefox")] == [[]]
+        assert registry.calls["OpenKey", r"Software\Clients\StartMenuInternet"] == 2
+        assert mock_architecture.call_count == 1
+        assert mock_version.call_count == 1
+
+    def test_snapshot_expires(self, registry, tmp_path, monkeypatch):
+        assert not installed_browsers.windows.do_i_have_installed("firefox")
+        (tmp_path / "firefox.exe").touch()
+        _register_windows_browser(registry, registry.HKEY_CURRENT_USER, "Firefox-308046B0AF4A39CB",
+                                  "Mozilla Firefox", tmp_path / "firefox.exe")
+        assert not installed_browsers.windows.do_i_have_installed("firefox")
+        monkeypatch.setattr(installed_browsers.windows, "SNAPSHOT_TTL", 0.0)
+        assert installed_browsers.windows.do_i_have_installed("firefox")
+
+    def test_snapshot_is_invalidated(self, registry, tmp_path):
+        assert installed_browsers.windows.do_i_have_installed("chrome")
+        registry.delete(registry.HKEY_LOCAL_MACHINE, r"Software\Clients\StartMenuInternet\Google Chrome")
+        assert installed_browsers.windows.do_i_have_installed("chrome")
+        installed_browsers.windows.clear_cache()
+        assert not installed_browsers.windows.do_i_have_installed("chrome")
+
+
+# check that duckduckgo is looked up through its AppX package without enumerating every class
+class TestWindowsDuckDuckGo:
+    @pytest.fixture(autouse=True)
+    def registry(self, fake_winreg, tmp_path):
+        location = tmp_path / "DuckDuckGo.exe"
+        location.touch()
+        for index in range(50):
+            fake_winreg.add(fake_winreg.HKEY_CURRENT_USER, rf"Software\Classes\.ext{index}", f"ext{index}file")
+        fake_winreg.add(fake_winreg.HKEY_CURRENT_USER, rf"{installed_browsers.windows.APPX_PACKAGES}"
+                        r"\Microsoft.WindowsCalculator_11.2401.0.0_x64__8wekyb3d8bbwe\App", "Calculator")
+        _register_windows_duckduckgo(fake_winreg, location)
+        return fake_winreg
+
+    @pytest.fixture
+    def mock_version(self):
+        with patch("installed_browsers.windows._create_browser_version", return_value="0.134.4.0") as mock_version:
+            yield mock_version
+
+    def test_duckduckgo_is_found(self, registry, mock_version, tmp_path):
+        assert list(installed_browsers.windows.browsers(names=["duckduckgo"])) == [
+            {"name": "duckduckgo", "description": "DuckDuckGo", "version": "0.134.4.0",
+             "location": str(tmp_path / "DuckDuckGo.exe")}
+        ]
+        assert installed_browsers.windows.do_i_have_installed("duckduckgo")
+        # only the packages are enumerated, classes are opened by their ProgId
+        assert registry.calls["OpenKey", r"Software\Classes"] == 0
+        assert registry.calls["EnumKey"] < 10
+
+    def test_search_is_cached(self, registry, mock_version):
+        list(installed_browsers.windows._search_for_duckduckgo())
+        calls = sum(registry.calls.values())
+        assert len(list(installed_browsers.windows._search_for_duckduckgo())) == 1
+        assert sum(registry.calls.values()) == calls
+        installed_browsers.windows.clear_cache()
+        list(installed_browsers.windows._search_for_duckduckgo())
+        assert sum(registry.calls.values()) > calls
+
+    def test_other_packages_are_ignored(self, registry, mock_version):
+        registry.delete(registry.HKEY_CURRENT_USER, rf"{installed_browsers.windows.APPX_PACKAGES}"
+                        rf"\DuckDuckGo.{DESKTOP_BROWSER}_0.134.4.0_x64__ya2fgkz3nks94")
+        assert not installed_browsers.windows.do_i_have_installed("duckduckgo")
+
+
+# create a 64 bit windows executable with a version resource only
+def _create_pe_executable(path: Path, version: str) -> Path:
+    import struct
+    major, minor, build, patch_level = map(int, version.split("."))
+    fixed_file_info = struct.pack("<13I", 0xFEEF04BD, 0x10000, major << 16 | minor, build << 16 | patch_level,
+                                  major << 16 | minor, build << 16 | patch_level, 0x3F, 0, 0x40004, 1, 0, 0, 0)
+    key = "VS_VERSION_INFO\0".encode("utf-16-le")
+    version_info = struct.pack("<HHH", 6 + len(key) + 2 + len(fixed_file_info), len(fixed_file_info), 0) + key + \
+        bytes(2) + fixed_file_info
+    # resource directories of type, name and language followed by the data entry and the version information
+    section_rva, section_offset = 0x1000, 0x200
+    resources = struct.pack("<IIHHHHII", 0, 0, 0, 0, 0, 1, 16, 0x80000000 | 24)
+    resources += struct.pack("<IIHHHHII", 0, 0, 0, 0, 0, 1, 1, 0x80000000 | 48)
+    resources += struct.pack("<IIHHHHII", 0, 0, 0, 0, 0, 1, 0x409, 72)
+    resources += struct.pack("<IIII", section_rva + 88, len(version_info), 0, 0)
+    resources += version_info
+    optional_header = bytearray(240)
+    struct.pack_into("<H", optional_header, 0, 0x20B)
+    struct.pack_into("<I", optional_header, 108, 16)
+    struct.pack_into("<II", optional_header, 112 + 2 * 8, section_rva, len(resources))
+    section = struct.pack("<8sIIIIIIHHI", b".rsrc", len(resources), section_rva, len(resources), section_offset,
+                          0, 0, 0, 0, 0x40000040)
+    headers = bytearray(b"MZ" + bytes(0x3A) + struct.pack("<I", 0x40))
+    headers += b"PE\0\0" + struct.pack("<HHIIIHH", 0x8664, 1, 0, 0, 0, len(optional_header), 0x22)
+    headers += optional_header + section
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(bytes(headers) + bytes(section_offset - len(headers)) + resources)
+    return path
+
+
+# check that versions of windows executables are read without win32api
+class TestPEVersion:
+    def test_version_is_read(self, tmp_path):
+        from installed_browsers import peversion
+        executable = _create_pe_executable(tmp_path / "chrome.exe", "124.0.6367.60")
+        assert peversion.get_file_version(str(executable)) == "124.0.6367.60"
+
+    @pytest.mark.parametrize(
+        "content",
+        (
+            pytest.param(b"", id="empty"),
+            pytest.param(b"#!/bin/sh\n", id="script"),
+            pytest.param(b"MZ" + bytes(0x3A) + b"\xff\xff\x00\x00", id="truncated"),
+        ),
+    )
+    def test_no_version(self, tmp_path, content):
+        from installed_browsers import peversion
+        (tmp_path / "browser.exe").write_bytes(content)
+        assert peversion.get_file_version(str(tmp_path / "browser.exe")) is None
+        assert peversion.get_file_version(str(tmp_path / "missing.exe")) is None
+
+    def test_version_is_cached_until_modified(self, tmp_path):
+        from installed_browsers import peversion
+        executable = _create_pe_executable(tmp_path / "msedge.exe", "124.0.2478.51")
+        with patch("mmap.mmap", wraps=__import__("mmap").mmap) as mock_mmap:
+            assert peversion.get_file_version(str(executable)) == "124.0.2478.51"
+            assert peversion.get_file_version(str(executable)) == "124.0.2478.51"
+            assert mock_mmap.call_count == 1
+            _create_pe_executable(executable, "124.0.2478.67")
+            os.utime(executable, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+            assert peversion.get_file_version(str(executable)) == "124.0.2478.67"
+
+    def test_windows_browser_version_without_win32api(self, fake_winreg, tmp_path):
+        executable = _create_pe_executable(tmp_path / "Google" / "Chrome" / "chrome.exe", "124.0.6367.60")
+        _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, "Google Chrome", "Google Chrome",
+                                  executable)
+        with patch.dict("sys.modules", win32api=None):
+            assert [browser["version"] for browser in installed_browsers.windows.browsers()] == ["124.0.6367.60"]
+
+
+# check that versions of chrome, edge and brave are read from the registry before their executables
+class TestWindowsRegistryVersion:
+    @pytest.fixture
+    def chrome(self, fake_winreg, tmp_path):
+        executable = _create_pe_executable(tmp_path / "Google" / "Chrome" / "chrome.exe", "124.0.6367.60")
+        _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, "Google Chrome", "Google Chrome",
+                                  executable)
+        return executable
+
+    def test_version_from_beacon(self, fake_winreg, chrome):
+        (chrome.parent / "124.0.6367.91").mkdir()
+        fake_winreg.add(fake_winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon", version="124.0.6367.91")
+        fake_winreg.add(fake_winreg.HKEY_LOCAL_MACHINE, rf"{installed_browsers.windows.UNINSTALL}\Google Chrome",
+                        DisplayVersion="124.0.6367.60")
+        with patch("installed_browsers.peversion.get_file_version") as mock_file_version:
+            assert [browser["version"] for browser in installed_browsers.windows.browsers()] == ["124.0.6367.91"]
+            assert [list(found) for found in installed_browsers.windows.get_version_of("chrome")] == [[
+                {"version": "124.0.6367.91"}]]
+            mock_file_version.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "registry_path, value_name",
+        (
+            pytest.param(rf"{installed_browsers.windows.GOOGLE_CLIENTS}\{{8A69D345-D564-463c-AFF1-A69D9E530F96}}",
+                         "pv", id="updater"),
+            pytest.param(rf"{installed_browsers.windows.UNINSTALL}\Google Chrome", "DisplayVersion", id="uninstall"),
+        ),
+    )
+    def test_version_from_local_machine(self, fake_winreg, chrome, registry_path, value_name):
+        (chrome.parent / "124.0.6367.78").mkdir()
+        fake_winreg.add(fake_winreg.HKEY_LOCAL_MACHINE, registry_path, **{value_name: "124.0.6367.78"})
+        with patch("installed_browsers.peversion.get_file_version") as mock_file_version:
+            assert [browser["version"] for found in installed_browsers.windows.get_details_of("chrome")
+                    for browser in found] == ["124.0.6367.78"]
+            mock_file_version.assert_not_called()
+
+    def test_version_of_another_installation(self, fake_winreg, chrome):
+        # the beacon of the current user belongs to a per-user installation, not to the system installation
+        (chrome.parent / "124.0.6367.60").mkdir()
+        fake_winreg.add(fake_winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon", version="124.0.6367.91")
+        fake_winreg.add(fake_winreg.HKEY_LOCAL_MACHINE, rf"{installed_browsers.windows.UNINSTALL}\Google Chrome",
+                        DisplayVersion="124.0.6367.60")
+        with patch("installed_browsers.peversion.get_file_version") as mock_file_version:
+            assert [list(found) for found in installed_browsers.windows.get_version_of("chrome")] == [[
+                {"version": "124.0.6367.60"}]]
+            mock_file_version.assert_not_called()
+        (chrome.parent / "124.0.6367.60").rmdir()
+        _create_pe_executable(chrome, "124.0.6367.61")
+        installed_browsers.windows.clear_cache()
+        assert [list(found) for found in installed_browsers.windows.get_version_of("chrome")] == [[
+            {"version": "124.0.6367.61"}]]
+
+    @pytest.mark.parametrize("version", ("", "unknown"))
+    def test_version_from_executable(self, fake_winreg, chrome, version):
+        fake_winreg.add(fake_winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon", version=version)
+        assert [list(found) for found in installed_browsers.windows.get_version_of("chrome")] == [[
+            {"version": "124.0.6367.60"}]]
+
+    def test_browser_without_registry_version(self, fake_winreg, tmp_path):
+        executable = _create_pe_executable(tmp_path / "Mozilla Firefox" / "firefox.exe", "125.0.1.8842")
+        _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, "FIREFOX.EXE", "Mozilla Firefox",
+                                  executable)
+        assert [list(found) for found in installed_browsers.windows.get_version_of("firefox")] == [[
+            {"version": "125.0.1.8842"}]]
+        assert not any(call[1].endswith("BLBeacon") for call in fake_winreg.calls if call[0] == "OpenKey")
+
+
+# isolated persistent cache, it is disabled unless enabled by the test
+@pytest.fixture
+def disk_cache_dir(tmp_path, monkeypatch):
+    from installed_browsers import disk_cache
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.delenv(disk_cache.CACHE_ENVIRONMENT_VARIABLE, raising=False)
+    return tmp_path / "cache" / disk_cache.CACHE_DIR_NAME
+
+
+# modify a file with a later modification time, file systems with a coarse resolution notice it too
+def _touch_later(path: Path):
+    os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns + 10 ** 9))
+
+
+# check that browsers are kept in a persistent cache shared by processes
+@pytest.mark.skipif(sys.platform != "linux", reason="linux-only")
+class TestLinuxDiskCache:
+    @pytest.fixture
+    def firefox(self, linux_applications, disk_cache_dir):
+        return _create_linux_browser(linux_applications, "firefox", "Firefox", "124.0")
+
+    def test_disabled_by_default(self, firefox, disk_cache_dir):
+        assert [browser["version"] for browser in installed_browsers.browsers()] == ["124.0"]
+        assert not disk_cache_dir.exists()
+
+    @pytest.mark.parametrize("enabled_by", ("parameter", "environment"))
+    def test_browsers_are_cached(self, firefox, disk_cache_dir, monkeypatch, enabled_by):
+        options = {"cache": True} if enabled_by == "parameter" else {}
+        if enabled_by == "environment":
+            monkeypatch.setenv(installed_browsers.disk_cache.CACHE_ENVIRONMENT_VARIABLE, "1")
+        found = list(installed_browsers.browsers(**options))
+        assert [browser["version"] for browser in found] == ["124.0"]
+        assert len(list(disk_cache_dir.glob("browsers-*.json"))) == 1
+        with patch("installed_browsers.linux.browsers") as mock_browsers:
+            assert list(installed_browsers.browsers(**options)) == found
+            mock_browsers.assert_not_called()
+        assert list(installed_browsers.browsers(cache=False)) == found
+
+    def test_arguments_are_cached_separately(self, firefox, linux_applications, disk_cache_dir):
+        _create_linux_browser(linux_applications, "min", "Min", "1.32.1")
+        assert len(list(installed_browsers.browsers(cache=True))) == 2
+        assert [browser["name"] for browser in installed_browsers.browsers(names="min", cache=True)] == ["min"]
+        assert [browser["version"] for browser in installed_browsers.browsers(with_versions=False, cache=True)] == [
+            "", ""
+        ]
+        assert len(list(disk_cache_dir.glob("browsers-*.json"))) == 3
+        assert [browser["name"] for browser in installed_browsers.browsers(names=["min"], cache=True)] == ["min"]
+        assert len(list(disk_cache_dir.glob("browsers-*.json"))) == 3
+
+    def test_updated_browser_is_scanned_again(self, firefox, disk_cache_dir):
+        assert [browser["version"] for browser in installed_browsers.browsers(cache=True)] == ["124.0"]
+        firefox.write_text("#!/bin/sh\necho 'Firefox 125.0.1'\n")
+        _touch_later(firefox)
+        assert [browser["version"] for browser in installed_browsers.browsers(cache=True)] == ["125.0.1"]
+
+    def test_installed_browser_is_scanned_again(self, firefox, linux_applications, disk_cache_dir):
+        assert [browser["name"] for browser in installed_browsers.browsers(cache=True)] == ["firefox"]
+        _create_linux_browser(linux_applications, "min", "Min", "1.32.1")
+        _touch_later(linux_applications)
+        assert sorted(browser["name"] for browser in installed_browsers.browsers(cache=True)) == ["firefox", "min"]
+
+    @pytest.mark.parametrize("content", ("", "{", '{"format": 0}', '{"format": 1, "sources": []}'))
+    def test_invalid_cache_is_scanned_again(self, firefox, disk_cache_dir, content):
+        assert list(installed_browsers.browsers(cache=True))
+        cache_file, = disk_cache_dir.glob("browsers-*.json")
+        cache_file.write_text(content)
+        assert [browser["version"] for browser in installed_browsers.browsers(cache=True)] == ["124.0"]
+        assert json.loads(cache_file.read_text())["format"] == installed_browsers.disk_cache.CACHE_FORMAT
+
+    def test_superseded_files_are_pruned(self, firefox, linux_applications, disk_cache_dir):
+        assert list(installed_browsers.browsers(cache=True))
+        assert list(installed_browsers.browsers(names="firefox", cache=True))
+        assert len(list(disk_cache_dir.glob("browsers-*.json"))) == 2
+        (disk_cache_dir / "browsers-0123456789abcdef.json1a2b3c4d.tmp").write_text("{")
+        _create_linux_browser(linux_applications, "min", "Min", "1.32.1")
+        _touch_later(linux_applications)
+        assert len(list(installed_browsers.browsers(cache=True))) == 2
+        assert len(list(disk_cache_dir.glob("browsers-*.json"))) == 1
+        assert not list(disk_cache_dir.glob("*.tmp"))
+
+    def test_clear_cache(self, firefox, disk_cache_dir):
+        assert list(installed_browsers.browsers(cache=True))
+        installed_browsers.disk_cache.clear_cache()
+        assert [path.name for path in disk_cache_dir.iterdir()] == [installed_browsers.disk_cache.LOCK_FILE]
+
+    def test_unwritable_cache(self, firefox, disk_cache_dir):
+        disk_cache_dir.parent.mkdir()
+        disk_cache_dir.write_text("not a directory")
+        assert [browser["version"] for browser in installed_browsers.browsers(cache=True)] == ["124.0"]
+
+    def test_processes_share_the_cache(self, tmp_path, disk_cache_dir, monkeypatch):
+        # the browser logs every run, only the first process should run it
+        executable = _create_linux_browser(tmp_path / "data" / "applications", "firefox", "Firefox", "124.0")
+        executable.write_text(f"#!/bin/sh\necho run >> {tmp_path / 'runs.log'}\nsleep 0.2\necho 'Firefox 124.0'\n")
+        monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+        monkeypatch.delenv("XDG_DATA_DIRS", raising=False)
+        script = ("import installed_browsers, installed_browsers.linux as linux; linux.BROWSER_LOCATIONS = (); "
+                  "print([browser['version'] for browser in installed_browsers.browsers(cache=True)])")
+        processes = [subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True,
+                                      cwd=Path(installed_browsers.__file__).parent.parent) for _ in range(4)]
+        assert [process.communicate(timeout=30)[0].strip() for process in processes] == ["['124.0']"] * 4
+        assert (tmp_path / "runs.log").read_text().splitlines() == ["run"]
+        assert not list(disk_cache_dir.glob("*.tmp"))
+
+
+# check that mac browsers are cached until their Info.plist changes
+@pytest.mark.skipif(sys.platform == "win32", reason="unix-only")
+def test_mac_disk_cache(fake_mdfind, mac_cache, disk_cache_dir):
+    bundle = _create_mac_application(fake_mdfind, "Firefox", {
+        "CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox", "CFBundleName": "Firefox",
+        "CFBundleShortVersionString": "124.0"
+    })
+    for _ in range(2):
+        assert [browser["version"] for browser in installed_browsers.disk_cache.get_browsers(
+            installed_browsers.mac)] == ["124.0"]
+    assert len(_get_mdfind_queries(fake_mdfind)) == 1
+    with open(bundle / "Contents" / "Info.plist", "wb") as file:
+        plistlib.dump({"CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox",
+                       "CFBundleName": "Firefox", "CFBundleShortVersionString": "125.0.1"}, file)
+    _touch_later(bundle / "Contents" / "Info.plist")
+    assert [browser["version"] for browser in installed_browsers.disk_cache.get_browsers(installed_browsers.mac)] == [
+        "125.0.1"
+    ]
+    assert len(_get_mdfind_queries(fake_mdfind)) == 2
+
+
+# check that mac browsers are scanned again after a bundle is installed next to a found one or one directory deeper
+@pytest.mark.skipif(sys.platform == "win32", reason="unix-only")
+def test_mac_disk_cache_sources(fake_mdfind, mac_cache, disk_cache_dir, tmp_path, monkeypatch):
+    (tmp_path / "System" / "Browsers").mkdir(parents=True)
+    monkeypatch.setattr(installed_browsers.mac, "APPLICATION_DIRS", (str(tmp_path / "System"),))
+    _create_mac_application(fake_mdfind, "Firefox", {
+        "CFBundleIdentifier": "org.mozilla.firefox", "CFBundleExecutable": "firefox", "CFBundleName": "Firefox",
+        "CFBundleShortVersionString": "124.0"
+    })
+    for _ in range(2):
+        assert len(installed_browsers.disk_cache.get_browsers(installed_browsers.mac)) == 1
+    assert len(_get_mdfind_queries(fake_mdfind)) == 1
+    # spotlight found firefox outside of the application directories, chrome is installed next to it
+    _create_mac_application(fake_mdfind, "Google Chrome", {
+        "CFBundleIdentifier": "com.google.Chrome", "CFBundleExecutable": "Google Chrome",
+        "CFBundleName": "Google Chrome", "KSVersion": "124.0.6367.60"
+    })
+    _touch_later(fake_mdfind)
+    assert len(installed_browsers.disk_cache.get_browsers(installed_browsers.mac)) == 2
+    assert len(_get_mdfind_queries(fake_mdfind)) == 2
+    _create_mac_application(tmp_path / "System" / "Browsers", "Safari", {
+        "CFBundleIdentifier": "com.apple.Safari", "CFBundleExecutable": "Safari", "CFBundleName": "Safari",
+        "CFBundleShortVersionString": "17.4"
+    })
+    _touch_later(tmp_path / "System" / "Browsers")
+    assert len(installed_browsers.disk_cache.get_browsers(installed_browsers.mac)) == 2
+    assert len(_get_mdfind_queries(fake_mdfind)) == 3
+
+
+# check that windows browsers are cached until the registry keys they are registered in are written
+def test_windows_disk_cache(fake_winreg, disk_cache_dir, tmp_path):
+    windows = installed_browsers.windows
+    chrome = _create_pe_executable(tmp_path / "Google" / "Chrome" / "chrome.exe", "124.0.6367.60")
+    _register_windows_browser(fake_winreg, fake_winreg.HKEY_LOCAL_MACHINE, "Google Chrome", "Google Chrome", chrome)
+    assert [browser["name"] for browser in installed_browsers.disk_cache.get_browsers(windows)] == ["chrome"]
+    with patch("installed_browsers.windows.browsers") as mock_browsers:
+        assert [browser["name"] for browser in installed_browsers.disk_cache.get_browsers(windows)] == ["chrome"]
+        mock_browsers.assert_not_called()
+    firefox = _create_pe_executable(tmp_path / "Mozilla Firefox" / "firefox.exe", "125.0.1.8842")
+    _register_windows_browser(fake_winreg, fake_winreg.HKEY_CURRENT_USER, "FIREFOX.EXE", "Mozilla Firefox", firefox)
+    found = installed_browsers.disk_cache.get_browsers(windows)
+    assert [(browser["name"], browser["version"]) for browser in found] == [
+        ("firefox", "125.0.1.8842"), ("chrome", "124.0.6367.60")
+    ]